@@ -0,0 +1,194 @@
+"""
+Provider palsu (offline) untuk src.collectors.providers.
+
+FakeYahoo dan FakeRss mengembalikan bentuk data yang sama dengan yfinance / Google News RSS,
+dibangkitkan dari src.benchmarks.synthetic. Histori tiap ticker deterministik, jadi dua
+download dengan window berbeda selalu konsisten di tanggal yang overlap.
+
+FakeYahoo(splits={"SYN0001.JK": [(date, 2.0)]}) mensimulasikan split: harga sebelum tanggal
+split disesuaikan mundur seperti Yahoo, dan download(actions=True) membawa kolom
+"Dividends" / "Stock Splits".
+
+download(interval="15m"/"60m") mengembalikan bar intraday (index Datetime WIB) yang
+roll-up hariannya sama persis dengan bar harian ticker itu.
+
+Contoh:
+  from src.collectors.providers import use_providers
+  with use_providers(yahoo=FakeYahoo(), rss=FakeRss()):
+      fetch_and_store("SYN0001.JK")
+"""
+import threading
+import time
+import urllib.parse
+from datetime import date, datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+import pandas as pd
+
+from src.benchmarks import synthetic
+
+# Interval intraday yfinance -> menit
+INTRADAY_MINUTES = {"15m": 15, "30m": 30, "60m": 60, "1h": 60}
+
+# Jumlah hari kerja per period string yfinance
+PERIOD_DAYS = {"1d": 1, "5d": 5, "7d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252,
+               "2y": 504, "5y": 1260, "10y": 2520}
+
+SECTORS = ["Financial Services", "Consumer Defensive", "Energy", "Basic Materials",
+           "Industrials", "Communication Services", "Real Estate", "Healthcare"]
+
+
+class FakeYahoo:
+    def __init__(self, history_days: int = 2520, latency: float = 0.0, seed: int = 42,
+                 quarters: int = 12, end: date | None = None,
+                 splits: dict[str, list[tuple[date, float]]] | None = None):
+        self.history_days = history_days
+        self.latency = latency
+        self.seed = seed
+        self.quarters = quarters
+        self.end = end
+        self.splits = splits or {}
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def _tick(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def history(self, ticker: str) -> pd.DataFrame:
+        with self._lock:
+            df = self._cache.get(ticker)
+        if df is None:
+            df = self._apply_splits(ticker, synthetic.ohlcv(ticker, self.history_days, end=self.end, seed=self.seed))
+            with self._lock:
+                self._cache[ticker] = df
+        return df
+
+    def _apply_splits(self, ticker: str, df: pd.DataFrame) -> pd.DataFrame:
+        df["Dividends"] = 0.0
+        df["Stock Splits"] = 0.0
+        for split_date, ratio in self.splits.get(ticker, []):
+            before = df.index < pd.Timestamp(split_date)
+            df.loc[before, ["Open", "High", "Low", "Close", "Adj Close"]] /= ratio
+            df.loc[before, "Volume"] = (df.loc[before, "Volume"] * ratio).round()
+            on_or_after = df.index[~before]
+            if len(on_or_after):
+                df.loc[on_or_after[0], "Stock Splits"] = ratio
+        return df
+
+    def _window(self, ticker: str, period=None, start=None, end=None, actions=False) -> pd.DataFrame:
+        df = self.history(ticker)
+        if not actions:
+            df = df.drop(columns=["Dividends", "Stock Splits"])
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df.index < pd.Timestamp(end)]
+        if start is None and period not in (None, "max"):
+            df = df.tail(PERIOD_DAYS.get(period, 5))
+        return df.copy()
+
+    def _intraday(self, ticker: str, interval_min: int, period=None, start=None, end=None) -> pd.DataFrame:
+        # Window dihitung di level hari, lalu dipotong di level bar (start bisa berupa timestamp)
+        day_start = pd.Timestamp(start).tz_localize(None).normalize() if start is not None else None
+        daily = self._window(ticker, period, day_start, end)
+        df = synthetic.intraday_bars(ticker, daily, interval_min, seed=self.seed)
+        if start is not None:
+            ts = pd.Timestamp(start)
+            df = df[df.index >= (ts.tz_convert(df.index.tz) if ts.tzinfo else ts.tz_localize(df.index.tz))]
+        return df
+
+    def download(self, tickers, period=None, start=None, end=None, group_by=None, actions=False,
+                 interval="1d", **kwargs) -> pd.DataFrame:
+        self._tick()
+        if interval in INTRADAY_MINUTES:
+            fetch = lambda t: self._intraday(t, INTRADAY_MINUTES[interval], period, start, end)
+        else:
+            fetch = lambda t: self._window(t, period, start, end, actions)
+        if isinstance(tickers, str):
+            return fetch(tickers)
+        frames = {t: fetch(t) for t in tickers}
+        if group_by == "ticker":
+            return pd.concat(frames, axis=1)
+        # Default yfinance: level 0 = field, level 1 = ticker
+        return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1)
+
+    def info(self, ticker: str) -> dict:
+        self._tick()
+        seed = synthetic.ticker_seed(ticker, self.seed)
+        return {
+            "longName": synthetic.company_name(ticker),
+            "sector": SECTORS[seed % len(SECTORS)],
+            "industry": "Synthetic",
+            "currency": "IDR",
+        }
+
+    def quarterly_statements(self, ticker: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+        self._tick()
+        return synthetic.quarterly_statements(ticker, self.quarters, seed=self.seed)
+
+
+class FakeRss:
+    def __init__(self, items_per_feed: int = 10, latency: float = 0.0, seed: int = 42):
+        self.items_per_feed = items_per_feed
+        self.latency = latency
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str) -> bytes:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(url).query).get("q", [url])[0]
+        return render_rss(query, synthetic.headlines_for(query, self.items_per_feed, seed=self.seed))
+
+
+def render_rss(query: str, items: list[tuple[str, date]]) -> bytes:
+    entries = "".join(
+        "<item><title>{}</title><link>https://example.invalid/{}</link><pubDate>{}</pubDate></item>".format(
+            escape(title), i,
+            format_datetime(datetime(d.year, d.month, d.day, 9, tzinfo=timezone.utc)),
+        )
+        for i, (title, d) in enumerate(items)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>{escape(query)}</title>{entries}</channel></rss>"
+    ).encode("utf-8")
+
+
+class SimulatedSentimentEngine:
+    """
+    Pengganti SentimentEngine untuk simulasi: skor dari kamus kata (collector sentimen) dan
+    biaya waktu sintetis per batch, supaya bentuk antrean stage cpu tetap realistis tanpa model.
+    """
+
+    def __init__(self, batch_overhead_ms: float = 20.0, per_text_ms: float = 8.0):
+        self.batch_overhead_ms = batch_overhead_ms
+        self.per_text_ms = per_text_ms
+        self.model = "simulated"
+
+    def predict(self, text: str) -> float:
+        return self.predict_batch([text])[0]
+
+    def predict_batch(self, texts: list[str]) -> list[float]:
+        from src.collectors.sentiment import POSITIVE_WORDS, NEGATIVE_WORDS
+        from src.monitoring.metrics import RUN_METRICS
+
+        if not texts:
+            return []
+        start = time.perf_counter()
+        time.sleep((self.batch_overhead_ms + self.per_text_ms * len(texts)) / 1000)
+        scores = []
+        for text in texts:
+            lower = text.lower()
+            score = sum(w in lower for w in POSITIVE_WORDS) - sum(w in lower for w in NEGATIVE_WORDS)
+            scores.append(float(max(min(score, 1), -1)))
+        RUN_METRICS.observe_inference(len(texts), time.perf_counter() - start)
+        return scores
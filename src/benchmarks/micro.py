@@ -0,0 +1,331 @@
+"""
+Micro-benchmark hot path pipeline, sepenuhnya offline (data sintetis + provider palsu).
+
+Yang diukur:
+  indicators      calculate_indicators()            -> baris/detik (CPU murni)
+  inference       SentimentEngine.predict_batch()   -> headline/detik per ukuran batch
+                  (dilewati jika torch / model tidak tersedia)
+  prices_direct   fetch_and_store() tanpa buffer    -> baris/detik ke Postgres
+  prices_buffered fetch_and_store() + WriteBuffer   -> baris/detik (termasuk flush)
+  indicators_db   update_indicators_for_ticker()    -> ticker/detik (baca histori + upsert)
+  fundamentals    collect_quarterly()               -> ticker/detik
+
+Benchmark DB memakai koneksi DB_* yang sama dengan pipeline, tapi hanya boleh ke host lokal
+(kecuali --allow-remote). Ticker memakai prefix BENCH dan dihapus lagi setelah selesai.
+
+Baseline & regresi:
+  python -m src.benchmarks.micro --save-baseline       # simpan hasil sebagai baseline
+  python -m src.benchmarks.micro --compare             # exit 1 jika ada yang turun > tolerance
+
+Contoh:
+  DB_HOST=localhost DB_NAME=stock_test python -m src.benchmarks.micro --tickers 20 --days 1500
+  python -m src.benchmarks.micro --only indicators,inference --no-db
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+from src.benchmarks import synthetic
+from src.benchmarks.fakes import FakeYahoo, FakeRss
+from src.collectors.providers import use_providers
+from src.config import override
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+
+OUTPUT_PATH = os.path.join(PROJECT_ROOT, "data", "logs", "bench_micro.json")
+# Baseline bergantung mesin -> disimpan di data/ (tidak di-commit), bisa di-override --baseline
+BASELINE_PATH = os.path.join(PROJECT_ROOT, "data", "benchmarks", "micro_baseline.json")
+
+BENCH_PREFIX = "BENCH"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1", ""}
+DEFAULT_TOLERANCE = 0.10
+INFERENCE_BATCH_SIZES = [1, 8, 32]
+
+CPU_BENCHES = ["indicators", "inference"]
+DB_BENCHES = ["prices_direct", "prices_buffered", "indicators_db", "fundamentals"]
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    """Collector mencetak progres per ticker; jangan ikut diukur sebagai noise di terminal."""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def timed(fn, repeat: int) -> tuple[float, list[float]]:
+    """Jalankan fn() `repeat` kali; return (detik terbaik, semua detik). Terbaik = paling tidak bising."""
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return min(runs), runs
+
+
+def result(unit: str, amount: int, best: float, runs: list[float], **extra) -> dict:
+    return {
+        "unit": unit,
+        "amount": amount,
+        "best_s": round(best, 4),
+        "median_s": round(statistics.median(runs), 4),
+        "throughput": round(amount / best, 2) if best > 0 else 0.0,
+        **extra,
+    }
+
+
+# CPU
+
+def bench_indicators(args) -> dict:
+    from src.features.technical import calculate_indicators
+
+    frames = [synthetic.indicator_input(t, args.days) for t in synthetic.synthetic_tickers(args.tickers, BENCH_PREFIX)]
+
+    def run():
+        for df in frames:
+            calculate_indicators(df)
+
+    best, runs = timed(run, args.repeat)
+    return result("rows/s", sum(len(f) for f in frames), best, runs, tickers=len(frames), days=args.days)
+
+
+def bench_inference(args) -> dict:
+    from src.modeling.indobert import get_engine
+
+    with quiet(args.quiet):
+        engine = get_engine()
+    if engine.model is None:
+        return {"skipped": "model unavailable (torch missing or weights not cached)"}
+
+    corpus = synthetic.headline_corpus(max(INFERENCE_BATCH_SIZES) * 4)
+    engine.predict_batch(corpus[:4])  # warm-up (alokasi pertama torch)
+
+    out = {"unit": "headlines/s", "batches": {}}
+    for size in INFERENCE_BATCH_SIZES:
+        batches = [corpus[i:i + size] for i in range(0, len(corpus), size)]
+
+        def run():
+            for b in batches:
+                engine.predict_batch(b)
+
+        best, runs = timed(run, args.repeat)
+        out["batches"][str(size)] = result("headlines/s", len(corpus), best, runs)
+    # Angka utama untuk regresi: batch terbesar (pola dipakai collector sentimen)
+    out["throughput"] = out["batches"][str(max(INFERENCE_BATCH_SIZES))]["throughput"]
+    return out
+
+
+# DB
+
+def bench_engine(args):
+    from src.database.connection import DB_HOST, get_db_engine
+    from src.database.schema import migrate
+
+    if DB_HOST not in LOCAL_HOSTS and not args.allow_remote:
+        raise SystemExit(f"Refusing to benchmark against non-local DB_HOST={DB_HOST} (use --allow-remote)")
+    engine = get_db_engine()
+    if engine is None:
+        raise SystemExit("No database connection")
+    with quiet(args.quiet):
+        migrate(engine)
+    return engine
+
+
+def cleanup(engine):
+    from sqlalchemy import text
+
+    # FK ON DELETE CASCADE membersihkan harga, indikator, sentimen, dan fundamental
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM stocks WHERE ticker LIKE :p"), {"p": f"{BENCH_PREFIX}%"})
+
+
+def bench_prices(args, engine, buffered: bool) -> dict:
+    from src.collectors import prices
+    from src.database.write_buffer import WriteBuffer
+
+    tickers = synthetic.synthetic_tickers(args.tickers, BENCH_PREFIX)
+    total_rows = []
+
+    def run():
+        cleanup(engine)
+        with quiet(args.quiet):
+            # stocks sudah ada -> yang terukur hanya download palsu + upsert harga
+            for t in tickers:
+                prices.get_or_create_stock(t)
+            t0 = time.perf_counter()
+            if buffered:
+                buffer = WriteBuffer(engine)
+                rows = sum(prices.fetch_and_store(t, period=args.period, buffer=buffer) for t in tickers)
+                buffer.flush()
+            else:
+                rows = sum(prices.fetch_and_store(t, period=args.period) for t in tickers)
+        total_rows.append(rows)
+        return time.perf_counter() - t0
+
+    runs = [run() for _ in range(args.repeat)]
+    return result("rows/s", total_rows[-1], min(runs), runs, tickers=len(tickers), period=args.period)
+
+
+def bench_indicators_db(args, engine) -> dict:
+    from src.features.technical import update_indicators_for_ticker
+
+    # Dijalankan setelah bench_prices: histori BENCH* sudah ada di DB
+    tickers = synthetic.synthetic_tickers(args.tickers, BENCH_PREFIX)
+
+    def run():
+        with quiet(args.quiet):
+            for t in tickers:
+                update_indicators_for_ticker(t)
+
+    best, runs = timed(run, args.repeat)
+    return result("tickers/s", len(tickers), best, runs)
+
+
+def bench_fundamentals(args, engine) -> dict:
+    from src.collectors.fundamental import FundamentalCollector
+
+    tickers = synthetic.synthetic_tickers(args.tickers, BENCH_PREFIX)
+    with quiet(args.quiet):
+        collector = FundamentalCollector(engine)
+    saved = []
+
+    def run():
+        with quiet(args.quiet):
+            saved.append(sum(collector.collect_quarterly(t) for t in tickers))
+
+    best, runs = timed(run, args.repeat)
+    return result("tickers/s", len(tickers), best, runs, rows=saved[-1])
+
+
+# BASELINE
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Daftar benchmark yang throughput-nya turun lebih dari `tolerance` relatif ke baseline."""
+    regressions = []
+    print(f"\n{'benchmark':<18}{'unit':>14}{'baseline':>12}{'current':>12}{'delta':>9}")
+    for name, base in baseline.get("results", {}).items():
+        cur = current["results"].get(name)
+        if not cur or "throughput" not in cur or "throughput" not in base:
+            continue
+        before, after = base["throughput"], cur["throughput"]
+        delta = (after - before) / before if before else 0.0
+        flag = ""
+        if delta < -tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<18}{cur.get('unit', ''):>14}{before:>12}{after:>12}{delta:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser("Micro Benchmarks")
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--days", type=int, default=1500, help="Panjang histori sintetis (hari kerja)")
+    parser.add_argument("--period", default="1y", help="Period download palsu untuk bench harga")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="Subset benchmark, dipisah koma (mis. indicators,prices_direct)")
+    parser.add_argument("--no-db", action="store_true", help="Lewati benchmark yang butuh Postgres")
+    parser.add_argument("--allow-remote", action="store_true", help="Izinkan DB_HOST non-lokal")
+    parser.add_argument("--with-mirror", action="store_true", help="Ikutkan tulis mirror Parquet")
+    parser.add_argument("--verbose", action="store_true", help="Tampilkan output collector")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+    args.quiet = not args.verbose
+
+    selected = CPU_BENCHES + ([] if args.no_db else DB_BENCHES)
+    if args.only:
+        wanted = [s.strip() for s in args.only.split(",")]
+        unknown = set(wanted) - set(CPU_BENCHES + DB_BENCHES)
+        if unknown:
+            parser.error(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+        selected = [b for b in selected if b in wanted]
+
+    from src.storage import parquet_mirror
+    parquet_mirror.set_enabled(None if args.with_mirror else False)
+
+    print("\n" + "=" * 50)
+    print(f"MICRO BENCHMARKS | {args.tickers} tickers x {args.days} days | repeat={args.repeat}")
+    print("=" * 50)
+
+    results = {}
+    yahoo = FakeYahoo(history_days=args.days)
+    # Pacing / retry ke Yahoo tidak relevan untuk provider palsu in-process
+    override("rate_limit.yahoo.enabled", False)
+    override("rate_limit.rss.enabled", False)
+    with use_providers(yahoo=yahoo, rss=FakeRss()):
+        if "indicators" in selected:
+            results["indicators"] = bench_indicators(args)
+        if "inference" in selected:
+            results["inference"] = bench_inference(args)
+
+        db_selected = [b for b in DB_BENCHES if b in selected]
+        if db_selected:
+            engine = bench_engine(args)
+            try:
+                if "prices_direct" in db_selected:
+                    results["prices_direct"] = bench_prices(args, engine, buffered=False)
+                if "prices_buffered" in db_selected:
+                    results["prices_buffered"] = bench_prices(args, engine, buffered=True)
+                if "indicators_db" in db_selected:
+                    if not {"prices_direct", "prices_buffered"} & set(results):
+                        bench_prices(args, engine, buffered=True)  # isi histori dulu
+                    results["indicators_db"] = bench_indicators_db(args, engine)
+                if "fundamentals" in db_selected:
+                    results["fundamentals"] = bench_fundamentals(args, engine)
+            finally:
+                cleanup(engine)
+
+    print(f"\n{'benchmark':<18}{'unit':>14}{'throughput':>14}{'best_s':>10}")
+    for name, r in results.items():
+        if "skipped" in r:
+            print(f"{name:<18}{'skipped':>14}  {r['skipped']}")
+            continue
+        print(f"{name:<18}{r['unit']:>14}{r['throughput']:>14}{r.get('best_s', ''):>10}")
+        for size, b in r.get("batches", {}).items():
+            print(f"  batch={size:<10}{b['unit']:>14}{b['throughput']:>14}{b['best_s']:>10}")
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "params": {"tickers": args.tickers, "days": args.days, "period": args.period, "repeat": args.repeat},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {OUTPUT_PATH}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"[WARN] No baseline at {args.baseline}; run with --save-baseline first")
+            return
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != report["params"]:
+            print(f"[WARN] Baseline params differ: {baseline.get('params')}")
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n[FAIL] Regression > {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n[OK] No regression beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
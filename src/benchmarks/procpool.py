@@ -0,0 +1,105 @@
+"""
+Benchmark speedup process pool (fork) untuk kerja CPU pipeline.
+
+Untuk setiap jumlah worker: calculate_indicators atas panel sintetis dan (jika model
+tersedia) inferensi IndoBERT per batch headline, di-dispatch dari N thread lewat run_cpu()
+-- pola yang sama dengan stage DAG. workers=1 = in-process (baseline, tanpa fork).
+Memori per worker (private vs shared, dari smaps_rollup) menunjukkan bobot model yang
+dibagi copy-on-write.
+
+Speedup hanya bermakna sampai jumlah core fisik; jalankan di mesin 2/4/8 core:
+  python -m src.benchmarks.procpool --workers 1,2,4,8 --tickers 200 --days 1500
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.benchmarks import synthetic
+from src.features.technical import calculate_indicators
+from src.pipeline import procpool
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+
+OUTPUT_PATH = os.path.join(PROJECT_ROOT, "data", "logs", "bench_procpool.json")
+NEWS_PER_BATCH = 10  # collector sentimen: 10 headline terbaru per ticker
+
+
+def dispatch(fn, items: list, threads: int) -> float:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        list(ex.map(lambda item: procpool.run_cpu(fn, item), items))
+    return time.perf_counter() - t0
+
+
+def load_model():
+    from src.modeling.indobert import get_engine
+    engine = get_engine()
+    return engine if engine.model is not None else None
+
+
+def _predict_local(texts: list[str]) -> list[float]:
+    from src.modeling.indobert import get_engine
+    return get_engine().predict_batch(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser("Process Pool Benchmark")
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--days", type=int, default=1500)
+    parser.add_argument("--headlines", type=int, default=400)
+    parser.add_argument("--no-inference", action="store_true")
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    frames = [synthetic.indicator_input(t, args.days) for t in synthetic.synthetic_tickers(args.tickers, "BENCH")]
+    corpus = synthetic.headline_corpus(args.headlines)
+    batches = [corpus[i:i + NEWS_PER_BATCH] for i in range(0, len(corpus), NEWS_PER_BATCH)]
+
+    model = None if args.no_inference else load_model()
+    if model is None and not args.no_inference:
+        print("[WARN] Sentiment model unavailable (torch / weights), inference benchmark skipped")
+
+    print("\n" + "=" * 50)
+    print(f"PROCESS POOL BENCHMARK | cpu_count={os.cpu_count()} | workers {worker_counts}")
+    print("=" * 50)
+
+    report = {"cpu_count": os.cpu_count(), "tickers": args.tickers, "days": args.days,
+              "headlines": len(corpus), "runs": {}}
+    for w in worker_counts:
+        pool = procpool.ProcessPool(w, preload=[load_model] if model else []) if w > 1 else None
+        if pool:
+            pool.start()
+        try:
+            run = {"indicators_s": round(dispatch(calculate_indicators, frames, w), 3)}
+            if model is not None:
+                run["inference_s"] = round(dispatch(_predict_local, batches, w), 3)
+            if pool:
+                run["memory"] = {str(pid): m for pid, m in procpool.memory_breakdown([os.getpid()] + pool.pids).items()}
+        finally:
+            if pool:
+                pool.stop()
+        report["runs"][str(w)] = run
+        print(f"  workers={w}: {run}")
+
+    base = report["runs"].get("1") or report["runs"][str(worker_counts[0])]
+    print(f"\n{'workers':<10}{'indicators_s':>14}{'speedup':>9}{'inference_s':>14}{'speedup':>9}")
+    for w, run in report["runs"].items():
+        run["indicators_speedup"] = round(base["indicators_s"] / run["indicators_s"], 2)
+        line = f"{w:<10}{run['indicators_s']:>14}{run['indicators_speedup']:>9}"
+        if "inference_s" in run:
+            run["inference_speedup"] = round(base["inference_s"] / run["inference_s"], 2)
+            line += f"{run['inference_s']:>14}{run['inference_speedup']:>9}"
+        print(line)
+
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
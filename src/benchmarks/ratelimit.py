@@ -0,0 +1,212 @@
+"""
+Validasi rate controller (collectors.ratelimit) terhadap StandinServer lokal, offline.
+
+Skenario:
+  throttle  stand-in Yahoo dengan kuota --server-rate req/detik (429 di atasnya, Retry-After 1).
+            --threads thread memanggil ticker_info() lewat seam providers:
+              naive     controller dimatikan (tanpa pacing / retry)
+              adaptive  AIMD + backoff; diharapkan goodput ~kuota dengan 429 jauh lebih sedikit
+  outage    Yahoo mengembalikan 500 untuk semua request sementara RSS sehat, panggilan
+            dicampur. Diharapkan breaker Yahoo terbuka (panggilan berikutnya gagal cepat) dan
+            RSS tetap sukses tanpa ikut melambat.
+  swallowed kuota seperti throttle dengan rate awal 4x kuota, tapi provider meniru
+            yf.download: 429 ditelan menjadi frame kosong. download_prices() untuk ticker yang sudah punya histori:
+              blind     expect_rows=False -> frame kosong tercatat sukses, rate terus naik
+              detected  expect_rows=True  -> frame kosong = soft failure, di-retry + rate turun
+
+Contoh:
+  python -m src.benchmarks.ratelimit --server-rate 10 --requests 150 --threads 8
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.benchmarks.fakes import FakeYahoo, FakeRss
+from src.benchmarks.standins import FaultProfile, StandinServer, HttpYahoo, HttpRss
+from src.collectors.providers import use_providers, ticker_info, fetch_rss, download_prices
+from src.collectors.ratelimit import controller_stats
+from src.config import override, clear_overrides
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+
+OUTPUT_PATH = os.path.join(PROJECT_ROOT, "data", "logs", "bench_ratelimit.json")
+RSS_URL = "https://news.google.com/rss/search?q=IHSG&hl=id-ID&gl=ID&ceid=ID:id"
+
+
+def timed(fn) -> tuple[bool, float]:
+    start = time.perf_counter()
+    try:
+        ok = fn() is not None
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def run_calls(calls: list, threads: int) -> tuple[list[tuple[str, bool, float]], float]:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda c: (c[0], *timed(c[1])), calls))
+    return results, time.perf_counter() - start
+
+
+def throttle_scenario(args, adaptive: bool) -> dict:
+    faults = FaultProfile(latency_ms=args.latency_ms, rate_limit=args.server_rate, seed=args.seed)
+    override("rate_limit.yahoo.enabled", adaptive)
+    server = StandinServer(FakeYahoo(), FakeRss(), yahoo_faults=faults)
+    with server, use_providers(yahoo=HttpYahoo(server.base_url)):
+        calls = [("yahoo", lambda i=i: ticker_info(f"RL{i:04d}.JK")) for i in range(args.requests)]
+        results, wall = run_calls(calls, args.threads)
+        rate = controller_stats().get("yahoo", {})
+        responses = server.stats().get("yahoo", {})
+    ok = sum(1 for _, success, _ in results if success)
+    return {
+        "mode": "adaptive" if adaptive else "naive",
+        "wall_s": round(wall, 2),
+        "succeeded": ok,
+        "failed": len(results) - ok,
+        "goodput_per_s": round(ok / wall, 2) if wall else 0.0,
+        "server_429": responses.get("429", 0),
+        "server_responses": responses,
+        "controller": rate,
+    }
+
+
+def swallowed_scenario(args, expect_rows: bool) -> dict:
+    # Rate awal jauh di atas kuota (kuota provider baru saja turun): controller harus turun sendiri
+    override("rate_limit.yahoo.enabled", True)
+    override("rate_limit.yahoo.initial_rate", args.server_rate * 4)
+    override("rate_limit.yahoo.max_rate", args.server_rate * 5)
+    override("rate_limit.yahoo.backoff_base", 0.05)
+    faults = FaultProfile(latency_ms=args.latency_ms, rate_limit=args.server_rate, seed=args.seed)
+    server = StandinServer(FakeYahoo(), FakeRss(), yahoo_faults=faults)
+    with server, use_providers(yahoo=HttpYahoo(server.base_url, swallow_errors=True)):
+        def call(i):
+            df = download_prices(f"RL{i:04d}.JK", expect_rows=expect_rows, period="5d", progress=False)
+            return None if df is None or df.empty else df
+        calls = [("yahoo", lambda i=i: call(i)) for i in range(args.requests)]
+        results, wall = run_calls(calls, args.threads)
+        rate = controller_stats().get("yahoo", {})
+        responses = server.stats().get("yahoo", {})
+    ok = sum(1 for _, success, _ in results if success)
+    return {
+        "mode": "detected" if expect_rows else "blind",
+        "wall_s": round(wall, 2),
+        "with_data": ok,
+        "without_data": len(results) - ok,
+        "server_429": responses.get("429", 0),
+        "controller": rate,
+    }
+
+
+def outage_scenario(args) -> dict:
+    override("rate_limit.yahoo.enabled", True)
+    override("rate_limit.yahoo.breaker_threshold", args.breaker_threshold)
+    override("rate_limit.yahoo.breaker_open_seconds", args.breaker_open)
+    override("rate_limit.yahoo.backoff_base", 0.05)
+    override("rate_limit.rss.max_rate", 50.0)
+    yahoo_faults = FaultProfile(latency_ms=args.latency_ms, error_rate=1.0, seed=args.seed)
+    rss_faults = FaultProfile(latency_ms=args.latency_ms, seed=args.seed + 1)
+    server = StandinServer(FakeYahoo(), FakeRss(), yahoo_faults=yahoo_faults, rss_faults=rss_faults)
+    with server, use_providers(yahoo=HttpYahoo(server.base_url), rss=HttpRss(server.base_url)):
+        calls = []
+        for i in range(args.requests):
+            calls.append(("yahoo", lambda i=i: ticker_info(f"RL{i:04d}.JK")))
+            calls.append(("rss", lambda: fetch_rss(RSS_URL)))
+        results, wall = run_calls(calls, args.threads)
+        stats = controller_stats()
+        responses = server.stats()
+
+    def summary(provider):
+        rows = [(ok, s) for p, ok, s in results if p == provider]
+        return {
+            "calls": len(rows),
+            "succeeded": sum(1 for ok, _ in rows if ok),
+            "median_s": round(statistics.median(s for _, s in rows), 4) if rows else 0.0,
+        }
+
+    return {
+        "wall_s": round(wall, 2),
+        "yahoo": summary("yahoo"),
+        "rss": summary("rss"),
+        "server_responses": responses,
+        "controller": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser("Rate Controller Benchmark")
+    parser.add_argument("--server-rate", type=float, default=10.0, help="Kuota stand-in Yahoo (req/detik)")
+    parser.add_argument("--requests", type=int, default=150)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--breaker-threshold", type=int, default=5)
+    parser.add_argument("--breaker-open", type=float, default=2.0, help="Detik breaker terbuka (skenario outage)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print("\n" + "=" * 50)
+    print(f"RATE CONTROLLER | quota {args.server_rate} req/s | {args.requests} requests x {args.threads} threads")
+    print("=" * 50)
+
+    # Output collector / provider (retry, breaker) tetap tampil: itu yang sedang divalidasi
+    try:
+        naive = throttle_scenario(args, adaptive=False)
+        adaptive = throttle_scenario(args, adaptive=True)
+        outage = outage_scenario(args)
+        clear_overrides()
+        blind = swallowed_scenario(args, expect_rows=False)
+        clear_overrides()
+        detected = swallowed_scenario(args, expect_rows=True)
+    finally:
+        clear_overrides()
+
+    print(f"\n{'mode':<10}{'ok':>6}{'failed':>8}{'429s':>7}{'goodput/s':>11}{'wall_s':>8}{'final_rate':>12}")
+    for r in (naive, adaptive):
+        print(f"{r['mode']:<10}{r['succeeded']:>6}{r['failed']:>8}{r['server_429']:>7}"
+              f"{r['goodput_per_s']:>11}{r['wall_s']:>8}{r['controller'].get('rate', '-'):>12}")
+    yc = outage["controller"].get("yahoo", {})
+    print(f"\noutage: yahoo ok {outage['yahoo']['succeeded']}/{outage['yahoo']['calls']} "
+          f"(median {outage['yahoo']['median_s']}s, breaker trips {yc.get('breaker_trips')}, "
+          f"rejected {yc.get('rejected')}) | rss ok {outage['rss']['succeeded']}/{outage['rss']['calls']} "
+          f"(median {outage['rss']['median_s']}s)")
+
+    print(f"\n{'swallowed':<10}{'data':>6}{'empty':>8}{'429s':>7}{'failures':>10}{'final_rate':>12}")
+    for r in (blind, detected):
+        c = r["controller"]
+        print(f"{r['mode']:<10}{r['with_data']:>6}{r['without_data']:>8}{r['server_429']:>7}"
+              f"{c.get('failures', 0):>10}{c.get('rate', '-'):>12}")
+
+    checks = {
+        "adaptive_fewer_429": adaptive["server_429"] < naive["server_429"],
+        "adaptive_all_succeeded": adaptive["failed"] == 0,
+        "breaker_tripped": (yc.get("breaker_trips") or 0) > 0 and (yc.get("rejected") or 0) > 0,
+        "rss_unaffected": outage["rss"]["succeeded"] == outage["rss"]["calls"],
+        "swallowed_429_detected": detected["controller"].get("failures", 0) > 0
+                                  and blind["controller"].get("failures", 0) == 0,
+        "swallowed_fewer_empty": detected["without_data"] < blind["without_data"],
+    }
+    print("checks: " + ", ".join(f"{k}={'PASS' if v else 'FAIL'}" for k, v in checks.items()))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": vars(args),
+        "throttle": {"naive": naive, "adaptive": adaptive},
+        "outage": outage,
+        "swallowed": {"blind": blind, "detected": detected},
+        "checks": checks,
+    }
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {OUTPUT_PATH}")
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Simulasi end-to-end mine_daily terhadap universe sintetis, sepenuhnya offline.
+
+Yang berjalan sungguhan: run_daily_mining (DAG, write buffer, ledger, work queue), semua
+collector, dan Postgres lokal (atau file DuckDB dengan --backend duckdb). Yang diganti:
+  - Yahoo / Google News  -> StandinServer HTTP lokal (latensi, 429, 5xx dapat diatur)
+  - IndoBERT             -> SimulatedSentimentEngine (biaya waktu per batch sintetis)
+  - tickers.json         -> universe SIM0001.JK ... dengan histori harga yang sudah di-seed
+
+Rate controller per provider (rate_limit.* di settings.yaml) tetap berlaku, karena pacing,
+retry, dan circuit breaker adalah bagian dari perilaku run yang ingin diukur.
+--yahoo-rate-limit / --rss-rate-limit memberi stand-in kuota req/detik (429 di atasnya).
+
+Contoh:
+  DB_HOST=localhost DB_NAME=stock_test python -m src.benchmarks.simulate \\
+      --tickers 900 --latency-ms 250 --jitter-ms 100 --throttle-rate 0.02 --error-rate 0.01
+"""
+import argparse
+import json
+import os
+import resource
+import threading
+import time
+
+from sqlalchemy import text
+
+from src.benchmarks import synthetic
+from src.benchmarks.fakes import FakeYahoo, FakeRss, SimulatedSentimentEngine
+from src.benchmarks.standins import FaultProfile, StandinServer, HttpYahoo, HttpRss
+from src.collectors.providers import use_providers
+from src.collectors.ratelimit import controller_stats
+from src.database.bulk import bulk_upsert, frame_to_rows
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+
+OUTPUT_PATH = os.path.join(PROJECT_ROOT, "data", "logs", "simulate_{n}.json")
+
+SIM_PREFIX = "SIM"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1", ""}
+# Hari terakhir yang sengaja tidak di-seed: run harian benar-benar menyisipkan baris baru
+UNSEEDED_DAYS = 3
+
+
+class MemorySampler:
+    """Sampling RSS proses (/proc/self/statm) di background -> puncak memori selama run saja."""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _rss(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page
+        except OSError:
+            # Non-Linux: ru_maxrss (puncak seumur proses, KB di Linux / byte di macOS)
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self._rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.start_bytes = self._rss()
+        self._thread = threading.Thread(target=self._loop, name="mem-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._rss())
+
+
+def sim_engine(allow_remote: bool):
+    from src.database.connection import DB_HOST, get_db_engine, backend
+    from src.database.schema import migrate
+
+    if backend() == "postgres" and DB_HOST not in LOCAL_HOSTS and not allow_remote:
+        raise SystemExit(f"Refusing to simulate against non-local DB_HOST={DB_HOST} (use --allow-remote)")
+    engine = get_db_engine()
+    if engine is None:
+        raise SystemExit("No database connection")
+    migrate(engine)
+    return engine
+
+
+def cleanup(engine):
+    from src.database.schema import SCHEMA
+
+    p = {"p": f"{SIM_PREFIX}%"}
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM run_ledger WHERE ticker LIKE :p"), p)
+        conn.execute(text("DELETE FROM work_queue WHERE ticker LIKE :p"), p)
+        # Eksplisit per tabel, bukan FK ON DELETE CASCADE: backend DuckDB tidak punya FK
+        for table, spec in SCHEMA.items():
+            if table != "stocks" and any(c[0] == "stock_id" for c in spec["columns"]):
+                conn.execute(text(f"DELETE FROM {table} WHERE stock_id IN "
+                                  "(SELECT id FROM stocks WHERE ticker LIKE :p)"), p)
+        conn.execute(text("DELETE FROM stocks WHERE ticker LIKE :p"), p)
+
+
+def seed_universe(engine, universe: list[dict], yahoo: FakeYahoo) -> int:
+    """Daftarkan stocks + histori harga, seperti DB produksi yang sudah berjalan lama."""
+    with engine.begin() as conn:
+        bulk_upsert(conn, "stocks", [
+            {"ticker": u["ticker"], "company_name": u["name"], "sector": "Synthetic",
+             "industry": "Synthetic", "currency": "IDR"}
+            for u in universe
+        ], conflict_cols=["ticker"])
+        ids = dict(conn.execute(
+            text("SELECT ticker, id FROM stocks WHERE ticker LIKE :p"), {"p": f"{SIM_PREFIX}%"}
+        ).fetchall())
+
+    total = 0
+    for u in universe:
+        df = yahoo.history(u["ticker"]).iloc[:-UNSEEDED_DAYS].reset_index()
+        df = df.rename(columns={"Date": "date", "Open": "open", "High": "high", "Low": "low",
+                                "Close": "close", "Adj Close": "adj_close", "Volume": "volume"})
+        df["date"] = df["date"].dt.date
+        df["stock_id"] = ids[u["ticker"]]
+        df["data_source"] = "synthetic"
+        rows = frame_to_rows(df, ["stock_id", "date", "open", "high", "low", "close",
+                                  "adj_close", "volume", "data_source"])
+        with engine.begin() as conn:
+            total += bulk_upsert(conn, "technical_prices", rows, conflict_cols=["stock_id", "date"])
+    return total
+
+
+def stage_throughput(snapshot: dict, wall_s: float) -> dict:
+    out = {}
+    for stage, c in snapshot["stages"].items():
+        if not c["calls"]:
+            continue
+        out[stage] = {
+            "calls": c["calls"],
+            "errors": c["errors"],
+            "per_s": round(c["calls"] / wall_s, 3) if wall_s else 0.0,
+            "mean_s": round(c["wall_s"] / c["calls"], 3),
+            "requests": c["requests"],
+            "request_errors": c["request_errors"],
+            "rows_written": c["rows_written"],
+            "db_round_trips": c["db_round_trips"],
+        }
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser("Offline Load Simulator")
+    parser.add_argument("--tickers", type=int, default=900)
+    parser.add_argument("--history-days", type=int, default=300, help="Histori harga yang di-seed per ticker")
+    parser.add_argument("--mode", default="stocks", choices=["stocks", "all"],
+                        help="'all' ikut menulis data makro sintetis ke macro_economic")
+    parser.add_argument("--queue", action="store_true", help="Pakai work_queue seperti runner --queue")
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Peluang 429 per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Peluang 500 per request")
+    parser.add_argument("--yahoo-rate-limit", type=float, help="Kuota stand-in Yahoo (req/detik, 429 di atasnya)")
+    parser.add_argument("--rss-rate-limit", type=float, help="Kuota stand-in RSS (req/detik, 429 di atasnya)")
+    parser.add_argument("--rss-latency-ms", type=float, help="Default: sama dengan --latency-ms")
+    parser.add_argument("--news-per-feed", type=int, default=10)
+    parser.add_argument("--inference-ms-per-text", type=float, default=8.0)
+    parser.add_argument("--processes", type=int, help="Fork worker CPU (override performance.process_workers)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--allow-remote", action="store_true", help="Izinkan DB_HOST non-lokal")
+    parser.add_argument("--keep", action="store_true", help="Jangan hapus data SIM* setelah selesai")
+    parser.add_argument("--profile", action="store_true", help="Teruskan --profile ke run_daily_mining")
+    parser.add_argument("--backend", choices=["postgres", "duckdb"], help="Override database.backend")
+    args = parser.parse_args()
+
+    if args.backend:
+        from src.database.connection import set_backend
+        set_backend(args.backend)
+
+    from src.modeling import indobert
+    from src.storage import parquet_mirror
+    from src.monitoring.metrics import RUN_METRICS
+    from src.scripts.mine_daily import run_daily_mining
+    from src.pipeline.ledger import FRESH
+
+    # Data sintetis tidak boleh masuk mirror Parquet produksi
+    parquet_mirror.set_enabled(False)
+
+    tickers = synthetic.synthetic_tickers(args.tickers, SIM_PREFIX)
+    universe = [{"ticker": t, "name": synthetic.company_name(t)} for t in tickers]
+    yahoo = FakeYahoo(history_days=args.history_days + UNSEEDED_DAYS, seed=args.seed)
+
+    print("\n" + "=" * 50)
+    print(f"LOAD SIMULATION | {args.tickers} tickers | mode={args.mode}{' +queue' if args.queue else ''}")
+    print("=" * 50)
+
+    engine = sim_engine(args.allow_remote)
+    cleanup(engine)
+    t0 = time.perf_counter()
+    seeded = seed_universe(engine, universe, yahoo)
+    print(f"[SIM] Seeded {len(universe)} stocks, {seeded} price rows in {time.perf_counter() - t0:.1f}s")
+
+    yahoo_faults = FaultProfile(args.latency_ms, args.jitter_ms, args.throttle_rate, args.error_rate, args.seed,
+                                rate_limit=args.yahoo_rate_limit)
+    rss_faults = FaultProfile(
+        args.latency_ms if args.rss_latency_ms is None else args.rss_latency_ms,
+        args.jitter_ms, args.throttle_rate, args.error_rate, args.seed + 1, rate_limit=args.rss_rate_limit
+    )
+    server = StandinServer(yahoo, FakeRss(args.news_per_feed, seed=args.seed), yahoo_faults, rss_faults)
+
+    exit_code = 0
+    previous_engine = indobert.set_engine(SimulatedSentimentEngine(per_text_ms=args.inference_ms_per_text))
+    try:
+        with server, use_providers(yahoo=HttpYahoo(server.base_url), rss=HttpRss(server.base_url)):
+            with MemorySampler() as mem:
+                start = time.perf_counter()
+                try:
+                    run_daily_mining(mode=args.mode, use_queue=args.queue, strategy=FRESH, universe=universe,
+                                     processes=args.processes, force_session=True, profile=args.profile)
+                except SystemExit as e:
+                    exit_code = e.code or 0
+                wall_s = time.perf_counter() - start
+            server_stats = server.stats()
+            rate_stats = controller_stats()
+    finally:
+        indobert.set_engine(previous_engine)
+        if not args.keep:
+            cleanup(engine)
+
+    snapshot = RUN_METRICS.snapshot()
+    report = {
+        "params": vars(args),
+        "faults": {"yahoo": yahoo_faults.as_dict(), "rss": rss_faults.as_dict()},
+        "exit_code": exit_code,
+        "wall_s": round(wall_s, 2),
+        "tickers_per_s": round(args.tickers / wall_s, 3) if wall_s else 0.0,
+        "memory_mb": {
+            "start": round(mem.start_bytes / 2 ** 20, 1),
+            "peak": round(mem.peak_bytes / 2 ** 20, 1),
+        },
+        "stages": stage_throughput(snapshot, wall_s),
+        "providers": snapshot["providers"],
+        "standin_responses": server_stats,
+        "rate_limit": rate_stats,
+        "inference": snapshot["inference"],
+    }
+
+    print(f"\n{'stage':<18}{'calls':>8}{'errors':>8}{'per_s':>9}{'mean_s':>9}{'requests':>10}{'req_err':>9}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<18}{s['calls']:>8}{s['errors']:>8}{s['per_s']:>9}{s['mean_s']:>9}"
+              f"{s['requests']:>10}{s['request_errors']:>9}")
+    print(f"\nWall time : {report['wall_s']}s ({report['tickers_per_s']} tickers/s) | exit={exit_code}")
+    print(f"Memory    : start {report['memory_mb']['start']} MB, peak {report['memory_mb']['peak']} MB")
+    print(f"Stand-ins : {server_stats}")
+    for name, s in rate_stats.items():
+        print(f"Rate {name:<5}: {s['rate']} req/s (min {s['min_rate_seen']}, max {s['max_rate_seen']}) | "
+              f"throttled {s['throttled']}, retries {s['retries']}, breaker trips {s['breaker_trips']}")
+
+    path = OUTPUT_PATH.format(n=args.tickers)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nReport saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
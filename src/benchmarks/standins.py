@@ -0,0 +1,272 @@
+"""
+Stand-in HTTP lokal untuk Yahoo Finance dan Google News, dengan fault injection.
+
+Server (ThreadingHTTPServer di 127.0.0.1, port acak) menyajikan data FakeYahoo/FakeRss lewat
+HTTP sungguhan, lalu HttpYahoo / HttpRss dipasang sebagai provider. Jadi socket, latensi,
+serialisasi, dan kegagalan (429 / 5xx) benar-benar dilalui collector -- yang tidak ikut
+terukur hanya parsing internal yfinance.
+
+Perilaku saat gagal mengikuti library aslinya:
+  - download harga: 429 / 5xx dilempar seperti YahooProvider (Ticker.history dengan
+    raise_errors); HttpYahoo(swallow_errors=True) meniru yf.download yang menelan semua error
+    per ticker menjadi frame kosong
+  - info / laporan kuartalan: exception / frame kosong
+  - RSS: HTTPError -> fetch_rss mencatat error dan collector melihat feed kosong
+"""
+import io
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import requests
+
+from src.benchmarks.fakes import FakeYahoo, FakeRss
+
+HTTP_TIMEOUT = 30
+
+
+class FaultProfile:
+    """
+    Latensi (ms, + jitter uniform) dan peluang 429 / 500 per request.
+    rate_limit (req/detik, token bucket dengan burst = 1 detik): request di atas kuota
+    server dijawab 429 -- throttling deterministik seperti Yahoo, bukan acak.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 throttle_rate: float = 0.0, error_rate: float = 0.0, seed: int = 42,
+                 rate_limit: float | None = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._tokens = rate_limit or 0.0
+        self._refilled = time.monotonic()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+        self._refilled = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def draw(self) -> tuple[float, int]:
+        """(detik tunda, status HTTP) untuk satu request."""
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            roll = self._rng.random()
+            over_quota = self.rate_limit is not None and not self._take_token()
+        if over_quota or roll < self.throttle_rate:
+            return delay, 429
+        if roll < self.throttle_rate + self.error_rate:
+            return delay, 500
+        return delay, 200
+
+    def as_dict(self) -> dict:
+        return {"latency_ms": self.latency_ms, "jitter_ms": self.jitter_ms,
+                "throttle_rate": self.throttle_rate, "error_rate": self.error_rate,
+                "rate_limit": self.rate_limit}
+
+
+def _frame_payload(df: pd.DataFrame) -> str:
+    return df.to_json(orient="split", date_format="iso")
+
+
+def _read_frame(payload: str) -> pd.DataFrame:
+    return pd.read_json(io.StringIO(payload), orient="split")
+
+
+class StandinServer:
+    """
+    Routes:
+      /yahoo/chart/<ticker>?period=&start=&actions=   OHLCV (DataFrame JSON 'split')
+      /yahoo/info/<ticker>                   metadata
+      /yahoo/quarterly/<ticker>              {"income": ..., "balance": ...}
+      /rss/search?q=...                      RSS XML
+    Setiap service (yahoo / rss) punya FaultProfile sendiri.
+    """
+
+    def __init__(self, yahoo: FakeYahoo | None = None, rss: FakeRss | None = None,
+                 yahoo_faults: FaultProfile | None = None, rss_faults: FaultProfile | None = None):
+        self.yahoo = yahoo or FakeYahoo()
+        self.rss = rss or FakeRss()
+        self.faults = {"yahoo": yahoo_faults or FaultProfile(), "rss": rss_faults or FaultProfile()}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="standin-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {service: dict(codes) for service, codes in self._stats.items()}
+
+    def _count(self, service: str, status: int):
+        with self._lock:
+            codes = self._stats.setdefault(service, {})
+            codes[str(status)] = codes.get(str(status), 0) + 1
+
+    def _route(self, path: str, query: dict) -> tuple[str, str, bytes]:
+        """(service, content-type, body). Nama ticker/query sudah di-unquote."""
+        parts = [urllib.parse.unquote(p) for p in path.strip("/").split("/")]
+        if parts[0] == "rss":
+            q = query.get("q", [""])[0]
+            return "rss", "application/rss+xml", self.rss.fetch(f"/?{urllib.parse.urlencode({'q': q})}")
+        if parts[0] == "yahoo" and len(parts) == 3:
+            kind, ticker = parts[1], parts[2]
+            if kind == "chart":
+                df = self.yahoo.download(
+                    ticker, period=query.get("period", [None])[0], start=query.get("start", [None])[0],
+                    actions=query.get("actions", ["0"])[0] == "1",
+                )
+                return "yahoo", "application/json", _frame_payload(df).encode()
+            if kind == "info":
+                return "yahoo", "application/json", json.dumps(self.yahoo.info(ticker)).encode()
+            if kind == "quarterly":
+                income, balance = self.yahoo.quarterly_statements(ticker)
+                body = {"income": _frame_payload(income), "balance": _frame_payload(balance)}
+                return "yahoo", "application/json", json.dumps(body).encode()
+        raise KeyError(path)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                service = url.path.strip("/").split("/")[0]
+                if service not in server.faults:
+                    self.send_error(404)
+                    return
+                delay, status = server.faults[service].draw()
+                if delay:
+                    time.sleep(delay)
+                if status != 200:
+                    server._count(service, status)
+                    self.send_response(status)
+                    if status == 429:
+                        self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                try:
+                    _, ctype, body = server._route(url.path, urllib.parse.parse_qs(url.query))
+                except KeyError:
+                    server._count(service, 404)
+                    self.send_error(404)
+                    return
+                server._count(service, 200)
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # ratusan request per detik -> jangan banjiri stderr
+
+        return Handler
+
+
+class HttpYahoo:
+    """Provider Yahoo yang memanggil StandinServer lewat HTTP."""
+
+    def __init__(self, base_url: str, swallow_errors: bool = False):
+        self.base_url = base_url.rstrip("/")
+        self.swallow_errors = swallow_errors
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        # Session per thread: keep-alive seperti connection pool yfinance/requests
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _get(self, path: str, params: dict | None = None) -> requests.Response:
+        resp = self._session().get(f"{self.base_url}{path}", params=params, timeout=HTTP_TIMEOUT)
+        resp.raise_for_status()
+        return resp
+
+    def _chart(self, ticker: str, period=None, start=None, actions=False) -> pd.DataFrame:
+        params = {k: str(v) for k, v in {"period": period, "start": start}.items() if v is not None}
+        if actions:
+            params["actions"] = "1"
+        try:
+            df = _read_frame(self._get(f"/yahoo/chart/{urllib.parse.quote(ticker)}", params).text)
+        except requests.RequestException as e:
+            status = getattr(e.response, "status_code", None) or 0
+            if not self.swallow_errors and (status == 429 or status >= 500):
+                raise
+            print(f"  [standin] {ticker}: {e}")
+            return pd.DataFrame()
+        df.index = pd.DatetimeIndex(df.index, name="Date")
+        return df
+
+    def download(self, tickers, period=None, start=None, group_by=None, actions=False, **kwargs) -> pd.DataFrame:
+        if isinstance(tickers, str):
+            return self._chart(tickers, period, start, actions)
+        frames = {t: self._chart(t, period, start) for t in tickers}
+        frames = {t: f for t, f in frames.items() if not f.empty}
+        if not frames:
+            return pd.DataFrame()
+        out = pd.concat(frames, axis=1)
+        return out if group_by == "ticker" else out.swaplevel(0, 1, axis=1).sort_index(axis=1)
+
+    def info(self, ticker: str) -> dict:
+        return self._get(f"/yahoo/info/{urllib.parse.quote(ticker)}").json()
+
+    def quarterly_statements(self, ticker: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+        try:
+            body = self._get(f"/yahoo/quarterly/{urllib.parse.quote(ticker)}").json()
+        except requests.RequestException as e:
+            if getattr(e.response, "status_code", None) == 429:
+                raise
+            print(f"  [standin] {ticker}: {e}")
+            return pd.DataFrame(), pd.DataFrame()
+        frames = []
+        for key in ("income", "balance"):
+            df = _read_frame(body[key])
+            df.columns = pd.to_datetime(df.columns)
+            frames.append(df)
+        return frames[0], frames[1]
+
+
+class HttpRss:
+    """Provider RSS: URL Google News diarahkan ke StandinServer (query dipertahankan)."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    def fetch(self, url: str) -> bytes:
+        query = urllib.parse.urlparse(url).query
+        resp = requests.get(f"{self.base_url}/rss/search?{query}", timeout=HTTP_TIMEOUT)
+        resp.raise_for_status()
+        return resp.content
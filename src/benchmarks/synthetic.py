@@ -0,0 +1,178 @@
+"""
+Data sintetis deterministik untuk benchmark / simulator (tidak butuh jaringan).
+
+- price_panel(): OHLCV geometric brownian motion per ticker, hari kerja saja
+- intraday_bars(): bar intraday yang konsisten dengan bar harian (roll-up = OHLCV harian)
+- headline_corpus(): judul berita bahasa Indonesia dari template
+- quarterly_statements(): laporan kuartalan dengan key yang sama seperti yfinance
+  (sesuai fundamental.quarterly di settings.yaml)
+
+Seed diturunkan dari (seed, ticker) -> ticker yang sama selalu menghasilkan data yang sama,
+tidak tergantung urutan pemanggilan.
+"""
+import zlib
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+HEADLINE_TEMPLATES = [
+    "{name} catat laba bersih naik {pct}% pada kuartal {q}",
+    "Saham {code} menguat {pct}% didorong aksi beli asing",
+    "{name} bagikan dividen Rp{amount} per saham",
+    "Laba {name} turun {pct}% akibat beban bunga meningkat",
+    "Analis rekomendasikan beli saham {code} dengan target harga Rp{price}",
+    "{name} ekspansi ke pasar ekspor, investasi Rp{amount} miliar",
+    "Saham {code} anjlok {pct}% setelah rilis kinerja kuartal {q}",
+    "OJK soroti transaksi tidak wajar saham {code}",
+    "{name} raih kontrak baru senilai Rp{amount} miliar",
+    "Kinerja {name} stagnan, investor menunggu RUPS",
+    "{name} lakukan buyback saham hingga Rp{amount} miliar",
+    "IHSG melemah, saham {code} ikut tertekan",
+]
+
+NAME_PREFIXES = ["Bank", "Astra", "Indo", "Sarana", "Mitra", "Bumi", "Graha", "Surya", "Nusa", "Prima"]
+NAME_SUFFIXES = ["Makmur", "Sejahtera", "Abadi", "Perkasa", "Mandiri", "Utama", "Jaya", "Lestari"]
+
+# Key laporan keuangan yang dibaca FundamentalCollector (lihat config/settings.yaml)
+INCOME_KEYS = ["Total Revenue", "Net Income", "Diluted EPS"]
+BALANCE_KEYS = ["Total Assets", "Total Liabilities Net Minority Interest"]
+
+
+def ticker_seed(ticker: str, seed: int = 42) -> int:
+    return (zlib.crc32(ticker.encode()) ^ seed) & 0xFFFFFFFF
+
+
+def synthetic_tickers(n: int, prefix: str = "SYN") -> list[str]:
+    """'SYN0001.JK', ... -- kode 4 huruf ala IDX tidak perlu, yang penting unik & stabil."""
+    return [f"{prefix}{i:04d}.JK" for i in range(1, n + 1)]
+
+
+def company_name(ticker: str) -> str:
+    rng = np.random.default_rng(ticker_seed(ticker, 7))
+    return f"{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_SUFFIXES)} Tbk"
+
+
+def business_days(n_days: int, end: date | None = None) -> pd.DatetimeIndex:
+    end = end or date.today()
+    return pd.bdate_range(end=end, periods=n_days, name="Date")
+
+
+def ohlcv(ticker: str, n_days: int, end: date | None = None, seed: int = 42) -> pd.DataFrame:
+    """Frame OHLCV dengan nama kolom yfinance (Open, High, ..., Adj Close, Volume), index Date."""
+    rng = np.random.default_rng(ticker_seed(ticker, seed))
+    idx = business_days(n_days, end)
+
+    start_price = float(rng.uniform(100, 10_000))
+    mu, sigma = rng.uniform(-0.0002, 0.0006), rng.uniform(0.01, 0.035)
+    log_ret = rng.normal(mu - sigma ** 2 / 2, sigma, n_days)
+    close = start_price * np.exp(np.cumsum(log_ret))
+
+    gap = rng.normal(0, sigma / 2, n_days)
+    open_ = np.concatenate([[start_price], close[:-1]]) * np.exp(gap)
+    spread = np.abs(rng.normal(0, sigma, n_days))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.lognormal(mean=rng.uniform(12, 17), sigma=0.6, size=n_days).astype(np.int64)
+
+    return pd.DataFrame({
+        "Open": open_.round(2), "High": high.round(2), "Low": low.round(2),
+        "Close": close.round(2), "Adj Close": close.round(2), "Volume": volume,
+    }, index=idx)
+
+
+def intraday_bars(ticker: str, daily: pd.DataFrame, interval_min: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Bar intraday (index Datetime WIB, kolom yfinance) untuk setiap hari di `daily`.
+    Jalur harga = brownian bridge Open -> Close dalam rentang [Low, High] harian; open bar
+    pertama, close bar terakhir, high/low ekstrem, dan total volume sama persis dengan
+    bar harian, jadi roll-up harian bisa diverifikasi eksak.
+    """
+    from src.pipeline.trading_calendar import bar_starts
+
+    frames = []
+    for day, row in daily.iterrows():
+        rng = np.random.default_rng(ticker_seed(f"{ticker}@{day.date()}:{interval_min}", seed))
+        idx = bar_starts(day.date(), interval_min)
+        n = len(idx)
+        o, h, l, c = row["Open"], row["High"], row["Low"], row["Close"]
+
+        steps = np.cumsum(rng.normal(0, (h - l) / 4, n))
+        k = np.arange(1, n + 1) / n
+        closes = np.clip(o + (c - o) * k + steps - steps[-1] * k, l, h)
+        closes[-1] = c
+        opens = np.concatenate([[o], closes[:-1]])
+        highs = np.maximum(opens, closes)
+        lows = np.minimum(opens, closes)
+        highs[rng.integers(n)] = h
+        lows[rng.integers(n)] = l
+
+        weights = rng.dirichlet(np.ones(n))
+        volume = np.floor(weights * row["Volume"]).astype(np.int64)
+        volume[-1] += int(row["Volume"]) - int(volume.sum())
+
+        frames.append(pd.DataFrame({
+            "Open": opens.round(2), "High": highs.round(2), "Low": lows.round(2),
+            "Close": closes.round(2), "Adj Close": closes.round(2), "Volume": volume,
+        }, index=idx))
+    if not frames:
+        return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Adj Close", "Volume"],
+                            index=pd.DatetimeIndex([], name="Datetime", tz="Asia/Jakarta"))
+    return pd.concat(frames)
+
+
+def indicator_input(ticker: str, n_days: int, seed: int = 42) -> pd.DataFrame:
+    """Bentuk input calculate_indicators: index date, kolom close/volume/high/low."""
+    df = ohlcv(ticker, n_days, seed=seed)
+    out = df.rename(columns={"Close": "close", "Volume": "volume", "High": "high", "Low": "low"})
+    out.index = out.index.date
+    out.index.name = "date"
+    return out[["close", "volume", "high", "low"]]
+
+
+def price_panel(tickers: list[str], n_days: int, end: date | None = None, seed: int = 42) -> dict[str, pd.DataFrame]:
+    return {t: ohlcv(t, n_days, end=end, seed=seed) for t in tickers}
+
+
+def headline_corpus(n: int, tickers: list[str] | None = None, seed: int = 42) -> list[str]:
+    rng = np.random.default_rng(seed)
+    tickers = tickers or synthetic_tickers(50)
+    out = []
+    for _ in range(n):
+        ticker = tickers[rng.integers(len(tickers))]
+        template = HEADLINE_TEMPLATES[rng.integers(len(HEADLINE_TEMPLATES))]
+        out.append(template.format(
+            name=company_name(ticker), code=ticker.split(".")[0],
+            pct=round(float(rng.uniform(0.5, 35)), 1), q=int(rng.integers(1, 5)),
+            amount=int(rng.integers(10, 5000)), price=int(rng.integers(50, 20000) // 25 * 25),
+        ))
+    return out
+
+
+def headlines_for(ticker: str, n: int, seed: int = 42) -> list[tuple[str, date]]:
+    """(judul, tanggal terbit) untuk satu ticker -- dipakai FakeRss."""
+    rng = np.random.default_rng(ticker_seed(ticker, seed))
+    titles = headline_corpus(n, [ticker], seed=ticker_seed(ticker, seed))
+    today = date.today()
+    return [(t, today - timedelta(days=int(rng.integers(0, 7)))) for t in titles]
+
+
+def quarterly_statements(ticker: str, quarters: int = 12, seed: int = 42) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(income, balance) ala yfinance: index = nama akun, kolom = tanggal akhir kuartal (terbaru dulu)."""
+    rng = np.random.default_rng(ticker_seed(ticker, seed))
+    ends = pd.period_range(end=pd.Timestamp.today(), periods=quarters, freq="Q").to_timestamp(how="end").normalize()[::-1]
+
+    base_rev = rng.uniform(5e11, 5e13)
+    growth = rng.normal(0.01, 0.05, quarters)[::-1].cumsum()[::-1]
+    revenue = base_rev * np.exp(growth)
+    margin = rng.uniform(0.03, 0.25)
+    net = revenue * (margin + rng.normal(0, 0.02, quarters))
+    shares = rng.uniform(1e9, 1e11)
+    assets = revenue * rng.uniform(2, 8)
+    liabilities = assets * rng.uniform(0.3, 0.85)
+
+    income = pd.DataFrame(
+        [revenue.round(), net.round(), (net / shares).round(2)], index=INCOME_KEYS, columns=ends
+    )
+    balance = pd.DataFrame([assets.round(), liabilities.round()], index=BALANCE_KEYS, columns=ends)
+    return income, balance
@@ -0,0 +1,123 @@
+"""
+Deteksi corporate action (split / dividen) dari data harga yang baru diunduh.
+
+Insert harian memakai ON CONFLICT DO NOTHING, jadi setelah split atau penyesuaian dividen
+histori di DB diam-diam basi. Setiap fetch harian sudah membawa beberapa hari overlap dengan
+data tersimpan; detektor membandingkan overlap itu (vektorisasi, satu merge) dan event
+Dividends / Stock Splits dari Yahoo:
+
+  - split / dividen baru (belum ada di tabel corporate_actions)
+  - close atau adj_close overlap menyimpang > tolerance dari yang tersimpan
+
+Jika ada diskontinuitas, prices.rewrite_history() mengunduh ulang dan menimpa histori ticker
+itu saja, lalu menandai indikatornya untuk dihitung ulang (indicator_recompute). Ticker lain
+tetap di jalur inkremental murah (satu SELECT kecil tambahan per ticker).
+"""
+import pandas as pd
+from sqlalchemy import text
+
+from src.config import get_settings
+from src.database.write_buffer import ROLLUP_SOURCE
+
+DEFAULT_TOLERANCE = 0.005  # 0.5%: di atas noise revisi harga penutupan Yahoo
+
+# Baris roll-up intraday (adj_close = close, bar sementara) bukan pembanding: ditimpa bar Yahoo
+OVERLAP_SQL = """
+    SELECT date, close, adj_close FROM technical_prices
+    WHERE stock_id = :sid AND date = ANY(:dates) AND data_source IS DISTINCT FROM :rollup
+"""
+
+KNOWN_EVENTS_SQL = """
+    SELECT date, kind FROM corporate_actions
+    WHERE stock_id = :sid AND date = ANY(:dates)
+"""
+
+
+def tolerance() -> float:
+    """corporate_actions.tolerance dari settings.yaml (konfigurasi ter-cache)."""
+    return get_settings().corporate_actions.tolerance
+
+
+def event_rows(fresh: pd.DataFrame) -> pd.DataFrame:
+    """Baris event dari frame yfinance (actions=True): kolom date, kind, value."""
+    frames = []
+    for col, kind in (("Stock_Splits", "split"), ("Dividends", "dividend")):
+        if col in fresh.columns:
+            hit = fresh.loc[fresh[col].fillna(0) > 0, ["Date", col]]
+            frames.append(pd.DataFrame({"date": hit["Date"], "kind": kind, "value": hit[col].astype(float)}))
+    if not frames:
+        return pd.DataFrame(columns=["date", "kind", "value"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def find_discontinuity(fresh: pd.DataFrame, stored: pd.DataFrame, known_events: set,
+                       tol: float = DEFAULT_TOLERANCE) -> dict | None:
+    """
+    fresh: frame hasil download (kolom Date, Close, Adj_Close, [Dividends, Stock_Splits])
+    stored: baris DB pada tanggal yang sama (kolom date, close, adj_close)
+    known_events: {(date, kind)} yang sudah pernah ditangani
+    Return {"reason", "events", "max_deviation", "first_date"} atau None.
+    Ticker baru (belum ada baris tersimpan) tidak punya histori yang bisa basi -> None.
+    """
+    if stored.empty:
+        return None
+
+    events = event_rows(fresh)
+    if not events.empty:
+        is_new = [(d, k) not in known_events for d, k in zip(events["date"], events["kind"])]
+        events = events[is_new]
+
+    deviation = 0.0
+    first_bad = None
+    merged = fresh[["Date", "Close", "Adj_Close"]].merge(stored, left_on="Date", right_on="date")
+    rel = pd.concat([
+        (merged["Close"] / merged["close"].astype(float) - 1).abs(),
+        (merged["Adj_Close"] / merged["adj_close"].astype(float) - 1).abs(),
+    ], axis=1).max(axis=1)
+    bad = rel > tol
+    if bad.any():
+        deviation = float(rel.max())
+        first_bad = merged.loc[bad, "Date"].min()
+
+    if events.empty and first_bad is None:
+        return None
+
+    reason = ",".join(sorted(set(events["kind"]))) if not events.empty else "mismatch"
+    event_list = list(events.itertuples(index=False, name=None))
+    if first_bad is not None and events.empty:
+        event_list.append((first_bad, "mismatch", round(deviation, 6)))
+    return {
+        "reason": reason,
+        "events": event_list,
+        "max_deviation": round(deviation, 6),
+        "first_date": min([d for d, _, _ in event_list]),
+    }
+
+
+def check_overlap(conn, stock_id: int, fresh: pd.DataFrame) -> dict | None:
+    """Dua SELECT kecil (hanya tanggal overlap) lalu find_discontinuity."""
+    dates = list(fresh["Date"])
+    stored = pd.DataFrame(
+        conn.execute(text(OVERLAP_SQL), {"sid": stock_id, "dates": dates, "rollup": ROLLUP_SOURCE}).fetchall(),
+        columns=["date", "close", "adj_close"],
+    )
+    known = set()
+    if {"Stock_Splits", "Dividends"} & set(fresh.columns):
+        known = {(d, k) for d, k in conn.execute(text(KNOWN_EVENTS_SQL), {"sid": stock_id, "dates": dates}).fetchall()}
+    return find_discontinuity(fresh, stored, known, tolerance())
+
+
+def record_events(conn, stock_id: int, found: dict, since) -> None:
+    """Catat event yang ditangani + tandai indikator ticker ini untuk dihitung ulang sejak `since`."""
+    conn.execute(text("""
+        INSERT INTO corporate_actions (stock_id, date, kind, value)
+        VALUES (:sid, :d, :k, :v)
+        ON CONFLICT (stock_id, date, kind) DO UPDATE SET value = EXCLUDED.value, detected_at = NOW()
+    """), [{"sid": stock_id, "d": d, "k": k, "v": float(v)} for d, k, v in found["events"]])
+    conn.execute(text("""
+        INSERT INTO indicator_recompute (stock_id, since, reason)
+        VALUES (:sid, :since, :reason)
+        ON CONFLICT (stock_id) DO UPDATE SET
+            since = LEAST(indicator_recompute.since, EXCLUDED.since),
+            reason = EXCLUDED.reason, requested_at = NOW()
+    """), {"sid": stock_id, "since": since, "reason": found["reason"][:100]})
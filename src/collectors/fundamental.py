@@ -1,16 +1,42 @@
-import yfinance as yf
 import pandas as pd
-import time
 import os
-import json
 from typing import Dict, Any, Optional
 
-from sqlalchemy import text
+from src.config import get_settings, get_ticker_registry
+from src.database.connection import get_db_engine, statement
+from src.storage.parquet_mirror import mirror_rows
+from src.collectors.providers import quarterly_statements
+from src.collectors.prices import get_or_create_stock
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
 
 
+FUNDAMENTAL_UPSERT_SQL = """
+    INSERT INTO fundamental_quarterly (
+        stock_id, ticker, year, quarter, report_date,
+        revenue, net_profit, eps,
+        total_assets, total_liabilities, total_equity, roe, data_source
+    )
+    VALUES (
+        :stock_id, :ticker, :year, :quarter, :report_date,
+        :revenue, :net_profit, :eps,
+        :assets, :liabilities, :equity, :roe,
+        'yahoo_finance'
+    )
+    ON CONFLICT (stock_id, year, quarter)
+    DO UPDATE SET
+        revenue = EXCLUDED.revenue,
+        net_profit = EXCLUDED.net_profit,
+        eps = EXCLUDED.eps,
+        total_assets = EXCLUDED.total_assets,
+        total_liabilities = EXCLUDED.total_liabilities,
+        total_equity = EXCLUDED.total_equity,
+        roe = EXCLUDED.roe,
+        updated_at = NOW()
+"""
+
+
 # FUNDAMENTAL COLLECTOR 
 
 class FundamentalCollector:
@@ -21,64 +47,33 @@ class FundamentalCollector:
     Purpose   : Long-term trend / trajectory
     """
 
-    def __init__(self, engine):
-        self.engine = engine
-        self.config = self._load_config()
-
-        self.years_back = self.config["data_collection"]["years_back"]
-        self.delay = self.config["data_collection"]["request_delay"]
-        self.q_cfg = self.config["fundamental"]["quarterly"]
-
+    def __init__(self, engine=None):
+        self.engine = engine if engine is not None else get_db_engine()
         print("[OK] FundamentalCollector (quarterly-only) initialized")
 
+    # Dibaca dari konfigurasi ter-cache setiap dipakai (ikut reload jika settings.yaml berubah)
 
-    def _load_config(self) -> Dict[str, Any]:
-        import yaml
-        path = os.path.join(PROJECT_ROOT, "config", "settings.yaml")
-        if not os.path.exists(path):
-            raise FileNotFoundError("settings.yaml not found")
+    @property
+    def years_back(self) -> int:
+        return get_settings().data_collection.years_back
 
-        with open(path, "r") as f:
-            return yaml.safe_load(f)
+    @property
+    def q_cfg(self) -> Dict[str, Any]:
+        return get_settings().quarterly.as_dict()
 
     def load_tickers(self, market: str) -> list[str]:
-        path = os.path.join(PROJECT_ROOT, "config", "tickers.json")
-        if not os.path.exists(path):
-            raise FileNotFoundError("tickers.json not found")
-
-        with open(path, "r") as f:
-            data = json.load(f)
-
-        if market not in data:
+        registry = get_ticker_registry()
+        if market not in registry.regions:
             raise ValueError(f"Market '{market}' not found in tickers.json")
 
-        return data[market]
+        return [t["ticker"] for t in registry.get(market)]
 
     
     # DB
     
     def ensure_stock_exists(self, ticker: str) -> int:
-        with self.engine.begin() as conn:
-            result = conn.execute(
-                text("SELECT id FROM stocks WHERE ticker = :ticker"),
-                {"ticker": ticker}
-            ).fetchone()
-
-            if result:
-                return result[0]
-
-            conn.execute(
-                text("""
-                    INSERT INTO stocks (ticker, is_active)
-                    VALUES (:ticker, true)
-                """),
-                {"ticker": ticker}
-            )
-
-            return conn.execute(
-                text("SELECT id FROM stocks WHERE ticker = :ticker"),
-                {"ticker": ticker}
-            ).fetchone()[0]
+        # Registrasi yang sama dengan collector harga (nama dari tickers.json, metadata menyusul)
+        return get_or_create_stock(ticker, self.engine)
 
     @staticmethod
     def _extract(df: pd.DataFrame, key: str, col) -> Optional[float]:
@@ -108,14 +103,10 @@ class FundamentalCollector:
     
     # QUARTERLY COLLECTION
     
-    def collect_quarterly(self, ticker: str) -> int:
+    def collect_quarterly(self, ticker: str, buffer=None) -> int:
         stock_id = self.ensure_stock_exists(ticker)
 
-        time.sleep(self.delay)
-        yf_stock = yf.Ticker(ticker)
-
-        income = yf_stock.quarterly_financials
-        balance = yf_stock.quarterly_balance_sheet
+        income, balance = quarterly_statements(ticker)
 
         if income is None or income.empty:
             print(f"[WARN] No quarterly income data for {ticker}")
@@ -126,80 +117,71 @@ class FundamentalCollector:
 
         saved = 0
         skipped = 0
-
-        with self.engine.begin() as conn:
-            for q in quarters:
-                q_date = pd.Timestamp(q)
-                year = q_date.year
-                quarter = f"Q{(q_date.month - 1) // 3 + 1}"
-
-                revenue = self._extract(income, self.q_cfg["revenue_key"], q)
-                net_profit = self._extract(income, self.q_cfg["net_profit_key"], q)
-                eps = self._extract(income, self.q_cfg["eps_key"], q)
-
-                assets = self._extract(balance, self.q_cfg["assets_key"], q)
-                liabilities = self._extract(balance, self.q_cfg["liabilities_key"], q)
-
-                # kalau semua fundamental inti kosong skip quarter
-                if all(v is None for v in [revenue, net_profit, assets, liabilities]):
-                    skipped += 1
-                    continue
-
-                # FORSA INT CASTING (Fix: pg8000.dbapi.ProgrammingError for BIGINT)
-                revenue = int(revenue) if revenue is not None else None
-                net_profit = int(net_profit) if net_profit is not None else None
-                assets = int(assets) if assets is not None else None
-                liabilities = int(liabilities) if liabilities is not None else None
-
-                if assets is not None and liabilities is not None:
-                    equity = int(assets - liabilities)
-                    # Calculate ROE if possible (Net Profit / Equity)
-                    roe = net_profit / equity if equity and net_profit is not None and equity != 0 else None
-                else:
-                    equity = None
-                    roe = None
-
-                conn.execute(
-                    text("""
-                        INSERT INTO fundamental_quarterly (
-                            stock_id, ticker, year, quarter, report_date,
-                            revenue, net_profit, eps,
-                            total_assets, total_liabilities, total_equity, roe, data_source
-                        )
-                        VALUES (
-                            :stock_id, :ticker, :year, :quarter, :report_date,
-                            :revenue, :net_profit, :eps,
-                            :assets, :liabilities, :equity, :roe,
-                            'yahoo_finance'
-                        )
-                        ON CONFLICT (stock_id, year, quarter)
-                        DO UPDATE SET
-                            revenue = EXCLUDED.revenue,
-                            net_profit = EXCLUDED.net_profit,
-                            eps = EXCLUDED.eps,
-                            total_assets = EXCLUDED.total_assets,
-                            total_liabilities = EXCLUDED.total_liabilities,
-                            total_equity = EXCLUDED.total_equity,
-                            roe = EXCLUDED.roe,
-                            updated_at = CURRENT_TIMESTAMP
-                    """),
-                    {
-                        "stock_id": stock_id,
-                        "ticker": ticker,
-                        "year": year,
-                        "quarter": quarter,
-                        "report_date": q_date.date(),
-                        "revenue": revenue,
-                        "net_profit": net_profit,
-                        "eps": eps,
-                        "assets": assets,
-                        "liabilities": liabilities,
-                        "equity": equity,
-                        "roe": roe
-                    }
-                )
-
-                saved += 1
+        params = []
+
+        for q in quarters:
+            q_date = pd.Timestamp(q)
+            year = q_date.year
+            quarter = f"Q{(q_date.month - 1) // 3 + 1}"
+
+            revenue = self._extract(income, self.q_cfg["revenue_key"], q)
+            net_profit = self._extract(income, self.q_cfg["net_profit_key"], q)
+            eps = self._extract(income, self.q_cfg["eps_key"], q)
+
+            assets = self._extract(balance, self.q_cfg["assets_key"], q)
+            liabilities = self._extract(balance, self.q_cfg["liabilities_key"], q)
+
+            # kalau semua fundamental inti kosong skip quarter
+            if all(v is None for v in [revenue, net_profit, assets, liabilities]):
+                skipped += 1
+                continue
+
+            # FORSA INT CASTING (Fix: pg8000.dbapi.ProgrammingError for BIGINT)
+            revenue = int(revenue) if revenue is not None else None
+            net_profit = int(net_profit) if net_profit is not None else None
+            assets = int(assets) if assets is not None else None
+            liabilities = int(liabilities) if liabilities is not None else None
+
+            if assets is not None and liabilities is not None:
+                equity = int(assets - liabilities)
+                # Calculate ROE if possible (Net Profit / Equity)
+                roe = net_profit / equity if equity and net_profit is not None and equity != 0 else None
+            else:
+                equity = None
+                roe = None
+
+            row = {
+                "stock_id": stock_id,
+                "ticker": ticker,
+                "year": year,
+                "quarter": quarter,
+                "report_date": q_date.date(),
+                "revenue": revenue,
+                "net_profit": net_profit,
+                "eps": eps,
+                "assets": assets,
+                "liabilities": liabilities,
+                "equity": equity,
+                "roe": roe
+            }
+            params.append(row)
+            saved += 1
+
+        # Param statement (assets/liabilities/equity) -> nama kolom tabel
+        rows = [
+            {k: v for k, v in r.items() if k not in ("assets", "liabilities", "equity")}
+            | {"total_assets": r["assets"], "total_liabilities": r["liabilities"],
+               "total_equity": r["equity"], "data_source": "yahoo_finance"}
+            for r in params
+        ]
+
+        if params:
+            if buffer is not None:
+                buffer.add("fundamental_quarterly", rows)
+            else:
+                with self.engine.begin() as conn:
+                    conn.execute(statement("fundamental_upsert", FUNDAMENTAL_UPSERT_SQL), params)
+                mirror_rows("fundamental_quarterly", rows)
 
         print(f"[DONE] {ticker}: saved={saved}, skipped={skipped}")
         return saved
@@ -208,14 +190,12 @@ class FundamentalCollector:
 
 if __name__ == "__main__":
     import argparse
-    from src.database.connection import engine
-
     parser = argparse.ArgumentParser("Quarterly Fundamental Collector")
     parser.add_argument("--ticker", help="Single ticker (e.g. BBCA.JK)")
     parser.add_argument("--market", help="Market key from tickers.json (e.g. indonesia)")
     args = parser.parse_args()
 
-    collector = FundamentalCollector(engine)
+    collector = FundamentalCollector()
 
     if args.ticker:
         tickers = [args.ticker]
@@ -0,0 +1,195 @@
+"""
+Mode intraday collector harga: bar 15m / 60m untuk ticker paling likuid (tier universe).
+
+- Watermark per (ticker, interval) = MAX(ts) yang sudah tersimpan di intraday_prices,
+  diambil untuk satu batch ticker dalam satu query (index PK, tanpa tabel state terpisah:
+  watermark tidak pernah bisa mendahului data yang benar-benar ter-commit).
+- Download mulai dari watermark (bar terakhir ikut diambil ulang dan ditimpa, bisa jadi
+  parsial), dibatasi jendela histori Yahoo per interval.
+- Baris masuk lewat write buffer (multi-row upsert per flush), bukan per bar.
+- rollup_daily(): bar harian (OHLCV) diturunkan dari bar intraday. Dipakai untuk mengisi
+  hari yang hilang di technical_prices dan untuk validasi terhadap bar harian Yahoo. Hanya
+  sesi bursa yang sudah tutup; barisnya bertanda data_source 'intraday_rollup' dan ditimpa
+  bar harian Yahoo begitu tersedia (price_windows tidak menganggapnya tersimpan).
+
+Contoh:
+  python -m src.collectors.intraday --ticker BBCA.JK --interval 15m
+  python -m src.collectors.intraday --rollup --interval 60m --since 2026-09-01 --dry-run
+"""
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.database.bulk import bulk_upsert, frame_to_rows
+from src.database.connection import get_db_engine
+from src.database.write_buffer import ROLLUP_SOURCE
+from src.collectors.providers import download_prices
+from src.pipeline.trading_calendar import EXCHANGE_TZ, get_calendar
+
+# Interval yfinance -> menit (disimpan sebagai interval_min SMALLINT)
+INTERVAL_MINUTES = {"15m": 15, "30m": 30, "60m": 60, "1h": 60}
+# Batas histori intraday Yahoo (hari kalender, sedikit di bawah batas resmi 60 / 730)
+MAX_HISTORY_DAYS = {15: 59, 30: 59, 60: 729}
+
+WATERMARK_SQL = """
+    SELECT s.ticker,
+           (SELECT MAX(p.ts) FROM intraday_prices p WHERE p.stock_id = s.id AND p.interval_min = :i),
+           s.id
+    FROM stocks s WHERE s.ticker = ANY(:t)
+"""
+
+ROLLUP_SELECT_SQL = """
+    SELECT stock_id, d AS date,
+           (array_agg(open ORDER BY ts))[1] AS open,
+           MAX(high) AS high,
+           MIN(low) AS low,
+           (array_agg(close ORDER BY ts DESC))[1] AS close,
+           SUM(volume) AS volume
+    FROM (
+        SELECT p.*, (p.ts AT TIME ZONE :tz)::date AS d
+        FROM intraday_prices p
+        WHERE p.interval_min = :i AND p.stock_id = ANY(:sids) AND p.ts >= :since
+    ) x
+    GROUP BY stock_id, d
+"""
+
+
+def watermarks(tickers: list[str], interval: str) -> dict[str, tuple[int, datetime | None]]:
+    """{ticker: (stock_id, ts bar terakhir | None)} -- ticker yang belum terdaftar tidak ada di hasil."""
+    if not tickers:
+        return {}
+    with get_db_engine().connect() as conn:
+        rows = conn.execute(
+            text(WATERMARK_SQL), {"i": INTERVAL_MINUTES[interval], "t": list(tickers)}
+        ).fetchall()
+    return {t: (sid, ts) for t, ts, sid in rows}
+
+
+def fetch_intraday(ticker: str, stock_id: int, interval: str = "60m", watermark: datetime | None = None,
+                   buffer=None) -> int:
+    minutes = INTERVAL_MINUTES[interval]
+    floor = datetime.now(timezone.utc) - timedelta(days=MAX_HISTORY_DAYS[minutes])
+    start = max(watermark, floor) if watermark is not None else floor
+    print(f"\n{ticker} | intraday {interval} since {start:%Y-%m-%d %H:%M}")
+
+    df = download_prices(
+        ticker,
+        expect_rows=watermark is not None,
+        start=start.date(),
+        interval=interval,
+        auto_adjust=False,
+        prepost=False,
+        progress=False
+    )
+    if df is None or df.empty:
+        print("No data returned")
+        return 0
+
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    idx = pd.DatetimeIndex(df.index)
+    df = df.reset_index(drop=True).assign(ts=idx.tz_localize(EXCHANGE_TZ) if idx.tz is None else idx)
+    # Hanya bar >= watermark: start download dibulatkan ke tanggal
+    if watermark is not None:
+        df = df[df["ts"] >= pd.Timestamp(watermark)]
+    df = df.dropna(subset=["Close"])
+
+    out = pd.DataFrame({
+        "stock_id": stock_id,
+        "ts": df["ts"],
+        "interval_min": minutes,
+        "open": df["Open"], "high": df["High"], "low": df["Low"], "close": df["Close"],
+        "volume": df["Volume"].fillna(0).astype("int64"),
+    })
+    rows = frame_to_rows(out, ["stock_id", "ts", "interval_min", "open", "high", "low", "close", "volume"])
+    if buffer is not None:
+        buffer.add("intraday_prices", rows)
+    else:
+        with get_db_engine().begin() as conn:
+            bulk_upsert(conn, "intraday_prices", rows, conflict_cols=["stock_id", "ts", "interval_min"],
+                        update_cols=["open", "high", "low", "close", "volume"])
+    print(f"{'buffered' if buffer is not None else 'upserted'} {len(rows)} {interval} bars")
+    return len(rows)
+
+
+def rollup_daily(engine, tickers: list[str], interval: str = "60m", since=None, write: bool = True) -> pd.DataFrame:
+    """
+    Bar harian dari bar intraday (open bar pertama, close bar terakhir, high/low ekstrem,
+    volume dijumlah) per hari bursa WIB. Hanya sesi kalender IDX yang sudah tutup: bar sesi
+    yang masih berjalan parsial. write=True: hanya hari yang BELUM ada di technical_prices yang
+    diisi, bertanda ROLLUP_SOURCE -- bar harian Yahoo tetap sumber utama (termasuk adj_close)
+    dan menimpanya saat di-fetch.
+    """
+    since = since or (datetime.now(timezone.utc) - timedelta(days=MAX_HISTORY_DAYS[INTERVAL_MINUTES[interval]]))
+    with engine.connect() as conn:
+        ids = dict(conn.execute(
+            text("SELECT id, ticker FROM stocks WHERE ticker = ANY(:t)"), {"t": list(tickers)}
+        ).fetchall())
+        bars = pd.DataFrame(conn.execute(
+            text(ROLLUP_SELECT_SQL),
+            {"tz": EXCHANGE_TZ, "i": INTERVAL_MINUTES[interval], "sids": list(ids), "since": since}
+        ).fetchall(), columns=["stock_id", "date", "open", "high", "low", "close", "volume"])
+
+    cal = get_calendar()
+    through = cal.last_closed_session(datetime.now(timezone.utc))
+    closed = bars["date"].map(lambda d: through is not None and d <= through and cal.is_session(d))
+    bars = bars[closed.astype(bool)].reset_index(drop=True)
+    bars["ticker"] = bars["stock_id"].map(ids)
+    if write and not bars.empty:
+        rows = frame_to_rows(
+            bars.assign(adj_close=bars["close"], data_source=ROLLUP_SOURCE),
+            ["stock_id", "date", "open", "high", "low", "close", "adj_close", "volume", "data_source"]
+        )
+        with engine.begin() as conn:
+            filled = bulk_upsert(conn, "technical_prices", rows, conflict_cols=["stock_id", "date"])
+        print(f"[ROLLUP] {len(bars)} daily bars derived from {interval}, {filled} row(s) offered to technical_prices")
+    return bars
+
+
+def compare_with_daily(engine, bars: pd.DataFrame) -> pd.DataFrame:
+    """Deviasi relatif roll-up vs bar harian tersimpan per (ticker, date)."""
+    if bars.empty:
+        return bars
+    with engine.connect() as conn:
+        daily = pd.DataFrame(conn.execute(text("""
+            SELECT stock_id, date, open, high, low, close, volume FROM technical_prices
+            WHERE stock_id = ANY(:sids) AND date >= :since
+        """), {"sids": [int(s) for s in bars["stock_id"].unique()], "since": bars["date"].min()}).fetchall(),
+            columns=["stock_id", "date", "open", "high", "low", "close", "volume"])
+    merged = bars.merge(daily, on=["stock_id", "date"], suffixes=("", "_daily"))
+    for col in ["open", "high", "low", "close", "volume"]:
+        merged[f"{col}_dev"] = (merged[col].astype(float) / merged[f"{col}_daily"].astype(float) - 1).abs()
+    return merged
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.collectors.prices import get_or_create_stock
+
+    parser = argparse.ArgumentParser("Intraday Price Collector")
+    parser.add_argument("--ticker", type=str, action="append", help="Ticker (boleh berulang)")
+    parser.add_argument("--interval", default="60m", choices=sorted(INTERVAL_MINUTES))
+    parser.add_argument("--rollup", action="store_true", help="Turunkan bar harian dari bar intraday")
+    parser.add_argument("--since", type=str, help="Tanggal awal roll-up (YYYY-MM-DD)")
+    parser.add_argument("--dry-run", action="store_true", help="Roll-up tanpa menulis; bandingkan dengan bar harian")
+    args = parser.parse_args()
+
+    engine = get_db_engine()
+    tickers = args.ticker or []
+    if args.rollup:
+        if not tickers:
+            with engine.connect() as conn:
+                tickers = [r[0] for r in conn.execute(text(
+                    "SELECT DISTINCT s.ticker FROM intraday_prices p JOIN stocks s ON s.id = p.stock_id"
+                )).fetchall()]
+        bars = rollup_daily(engine, tickers, args.interval, since=args.since, write=not args.dry_run)
+        cmp = compare_with_daily(engine, bars)
+        if not cmp.empty:
+            print(cmp[[c for c in cmp.columns if c.endswith("_dev")]].describe().loc[["mean", "max"]].round(5))
+    else:
+        for t in tickers:
+            get_or_create_stock(t)
+        for t, (sid, wm) in watermarks(tickers, args.interval).items():
+            fetch_intraday(t, sid, args.interval, wm)
@@ -1,8 +1,14 @@
-import yfinance as yf
+from datetime import timedelta
+
 import pandas as pd
-from src.database.connection import engine
+from src.database.connection import get_db_engine
+from src.database.bulk import bulk_upsert, frame_to_rows
+from src.storage.parquet_mirror import mirror_frame
+from src.collectors.providers import download_prices
 from sqlalchemy import text
 
+# Tambah seri baru cukup di sini (+ kolomnya di schema): semua simbol
+# diunduh dalam SATU request grouped, jadi tidak ada round trip tambahan.
 MACRO_TICKERS = {
     "USDIDR=X": "usd_idr",
     "^JKSE": "ihsg",
@@ -10,66 +16,122 @@ MACRO_TICKERS = {
     "CL=F": "oil_price"
 }
 
+# IHSG hanya punya bar di hari bursa IDX -> dipakai sebagai index hari perdagangan
+TRADING_DAY_SYMBOL = "^JKSE"
+
+DEFAULT_PERIOD = "1mo"  # dipakai jika tabel masih kosong
+ASOF_BUFFER_DAYS = 10   # ambil sedikit histori sebelum tanggal terakhir agar as-of join punya nilai awal
+
+
+def get_last_macro_date(conn):
+    """Tanggal terakhir yang sudah punya data harga makro (bukan baris sentimen saja)."""
+    cols = " OR ".join(f"{c} IS NOT NULL" for c in MACRO_TICKERS.values())
+    return conn.execute(text(f"SELECT MAX(date) FROM macro_economic WHERE {cols}")).scalar()
+
+
+def download_macro(start=None) -> pd.DataFrame:
+    """Satu grouped download untuk semua simbol. Return: index=date, kolom=nama kolom DB."""
+    kwargs = {"start": start} if start else {"period": DEFAULT_PERIOD}
+    raw = download_prices(
+        list(MACRO_TICKERS),
+        expect_rows=start is not None,
+        interval="1d",
+        group_by="ticker",
+        auto_adjust=False,
+        progress=False,
+        threads=True,
+        **kwargs
+    )
+    if raw is None or raw.empty:
+        return pd.DataFrame()
+
+    closes = {}
+    for ticker, col_name in MACRO_TICKERS.items():
+        if isinstance(raw.columns, pd.MultiIndex):
+            if ticker not in raw.columns.get_level_values(0):
+                print(f"    No data for {ticker}")
+                continue
+            series = raw[ticker]["Close"]
+        else:
+            series = raw["Close"]
+        closes[col_name] = series
+
+    df = pd.DataFrame(closes)
+    df.index = pd.to_datetime(df.index).tz_localize(None).normalize()
+    return df.sort_index()
+
+
+def align_to_trading_days(closes: pd.DataFrame) -> pd.DataFrame:
+    """
+    As-of join (backward) tiap seri ke index hari bursa IDX.
+    Nilai sebuah tanggal hanya berasal dari observasi di tanggal itu atau sebelumnya,
+    jadi tidak ada nilai masa depan yang bocor ke belakang (beda dengan bfill).
+    """
+    ihsg_col = MACRO_TICKERS[TRADING_DAY_SYMBOL]
+    if ihsg_col in closes and closes[ihsg_col].notna().any():
+        trading_days = closes.index[closes[ihsg_col].notna()]
+    else:
+        trading_days = pd.bdate_range(closes.index.min(), closes.index.max())
+
+    aligned = pd.DataFrame({"date": pd.DatetimeIndex(trading_days)})
+    for col in closes.columns:
+        series = closes[col].dropna()
+        if series.empty:
+            aligned[col] = None
+            continue
+        right = series.rename(col).rename_axis("date").reset_index()
+        aligned = pd.merge_asof(aligned, right, on="date", direction="backward")
+
+    aligned = aligned.dropna(how="all", subset=list(closes.columns))
+    aligned["date"] = aligned["date"].dt.date
+    return aligned
+
+
 def collect_macro():
     print("Fetching Macro Data (Currencies, Indices, Commodities)...")
-    
-    dfs = []
-    for ticker, col_name in MACRO_TICKERS.items():
-        print(f"  - {ticker} -> {col_name}")
-        try:
-            # TURBO: Untuk harian cukup ambil 1 bulan terakhir agar kencang
-            hist = yf.Ticker(ticker).history(period="1mo")
-            if hist.empty: continue
-            
-            # Reset index to get 'Date' column and rename Close to col_name
-            temp_df = hist[['Close']].reset_index()
-            temp_df['Date'] = temp_df['Date'].dt.date
-            temp_df = temp_df.rename(columns={'Close': col_name})
-            dfs.append(temp_df)
-        except Exception as e:
-            print(f"    Error fetching {ticker}: {e}")
-
-    # Merge all DataFrames
-    from functools import reduce
-    if not dfs:
+
+    with get_db_engine().connect() as conn:
+        last_date = get_last_macro_date(conn)
+
+    start = last_date - timedelta(days=ASOF_BUFFER_DAYS) if last_date else None
+    print(f"  Symbols: {', '.join(MACRO_TICKERS)} | since: {start or DEFAULT_PERIOD}")
+
+    try:
+        closes = download_macro(start)
+    except Exception as e:
+        print(f"    Error fetching macro data: {e}")
+        return
+
+    if closes.empty:
         print("No macro data fetched.")
         return
 
-    df_merged = reduce(lambda left, right: pd.merge(left, right, on='Date', how='outer'), dfs)
-    df_merged = df_merged.sort_values('Date').ffill().bfill().dropna()
-    
-    print(f"Saving {len(df_merged)} macro records to DB...")
-    
-    query = text("""
-        INSERT INTO macro_economic (date, usd_idr, ihsg, gold_price, oil_price)
-        VALUES (:date, :usd_idr, :ihsg, :gold_price, :oil_price)
-        ON CONFLICT (date) DO UPDATE 
-        SET 
-            usd_idr = EXCLUDED.usd_idr, 
-            ihsg = EXCLUDED.ihsg,
-            gold_price = EXCLUDED.gold_price,
-            oil_price = EXCLUDED.oil_price;
-    """)
-    
+    df = align_to_trading_days(closes)
+    if last_date:
+        # Buffer hanya untuk nilai awal as-of; yang ditulis cukup dari tanggal terakhir (bar terakhir bisa berubah)
+        df = df[df["date"] >= last_date].copy()
+
+    for col in MACRO_TICKERS.values():
+        if col not in df:
+            df[col] = None
+
+    rows = frame_to_rows(df, ["date"] + list(MACRO_TICKERS.values()))
+    print(f"Saving {len(rows)} macro records to DB...")
+
     try:
-        with engine.connect() as conn:
-            # Batch execution using SQLAlchemy
-            data = [
-                {
-                    "date": row['Date'], 
-                    "usd_idr": row.get('usd_idr'), 
-                    "ihsg": row.get('ihsg'), 
-                    "gold_price": row.get('gold_price'), 
-                    "oil_price": row.get('oil_price')
-                } 
-                for _, row in df_merged.iterrows()
-            ]
-            conn.execute(query, data)
-            conn.commit()
+        with get_db_engine().begin() as conn:
+            # NULL tidak menimpa nilai lama (mis. seri yang libur di tanggal itu)
+            bulk_upsert(
+                conn, "macro_economic", rows,
+                conflict_cols=["date"],
+                update_cols=list(MACRO_TICKERS.values()),
+                coalesce=True
+            )
+        mirror_frame("macro_economic", df)
+        return len(rows)
     except Exception as e:
         print(f"Error saving macro data: {e}")
-        
-    print("Macro Data Collection Complete!")
+
     print("Macro Data Collection Complete!")
 
 if __name__ == "__main__":
@@ -1,8 +1,11 @@
-import feedparser
 import urllib.parse
 from datetime import datetime, date
-from src.database.connection import get_db_connection
+from sqlalchemy import text
+from src.config import get_settings
+from src.database.connection import get_db_engine
+from src.storage.parquet_mirror import mirror_rows
 from src.modeling.indobert import get_engine
+from src.collectors.sentiment import fetch_feed
 
 KEYWORDS = [
     "Ekonomi Indonesia", 
@@ -17,14 +20,15 @@ def collect_macro_sentiment():
     ai_engine = get_engine()
     
     all_headlines = []
+    max_headlines = get_settings().data_collection.max_headlines
     
     for kw in KEYWORDS:
         query = urllib.parse.quote(kw)
         rss_url = f"https://news.google.com/rss/search?q={query}&hl=id-ID&gl=ID&ceid=ID:id"
         print(f"  Searching: {kw}")
         
-        feed = feedparser.parse(rss_url)
-        for entry in feed.entries[:10]: # Top 10 per keyword
+        feed = fetch_feed(rss_url)
+        for entry in feed.entries[:max_headlines]: # Top N per keyword
             all_headlines.append(entry.title)
             
     # Batch Prediction (TURBO MODE)
@@ -39,21 +43,20 @@ def collect_macro_sentiment():
     print(f"\nFinal Macro Sentiment Score: {final_score:.4f} (from {count} headlines)")
     
     # Save to DB
-    conn = get_db_connection()
-    cur = conn.cursor()
     today = date.today()
     
     # Upsert
-    cur.execute("""
-        INSERT INTO macro_economic (date, macro_sentiment_score)
-        VALUES (%s, %s)
-        ON CONFLICT (date) DO UPDATE
-        SET macro_sentiment_score = EXCLUDED.macro_sentiment_score;
-    """, (today, final_score))
+    with get_db_engine().begin() as conn:
+        conn.execute(text("""
+            INSERT INTO macro_economic (date, macro_sentiment_score)
+            VALUES (:d, :s)
+            ON CONFLICT (date) DO UPDATE
+            SET macro_sentiment_score = EXCLUDED.macro_sentiment_score;
+        """), {"d": today, "s": final_score})
+    mirror_rows("macro_economic", [{"date": today, "macro_sentiment_score": final_score}])
     
-    conn.commit()
-    conn.close()
     print("Macro Sentiment Saved to DB!")
+    return 1
 
 if __name__ == "__main__":
     collect_macro_sentiment()
@@ -0,0 +1,179 @@
+"""
+Enrichment metadata saham (nama, sektor, industri, mata uang) di luar jalur panas.
+
+Registrasi ticker baru (prices.get_or_create_stock) hanya INSERT ticker + nama dari
+tickers.json, tanpa request ke Yahoo. Job ini (stage global stock_metadata, atau CLI)
+mengambil semua saham yang metadatanya belum pernah / sudah lama tidak diperbarui:
+
+  - ticker_info() paralel di thread pool (metadata.workers)
+  - hasil info di-cache di disk (metadata.cache_ttl_hours): job yang gagal di tengah
+    atau dijalankan ulang tidak meminta ulang ticker yang sudah didapat
+  - satu bulk UPDATE ... FROM (VALUES ...) ke tabel stocks; field yang tidak dikembalikan
+    Yahoo tidak menimpa nilai lama (COALESCE)
+
+Contoh:
+  python -m src.collectors.metadata              # saham dengan metadata kosong / basi
+  python -m src.collectors.metadata --all        # paksa semua saham aktif
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from src.config import get_settings
+from src.database.bulk import bulk_update
+from src.database.connection import get_db_engine
+from src.collectors.providers import ticker_info
+from src.monitoring.metrics import RUN_METRICS
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+
+METADATA_COLUMNS = ["company_name", "sector", "industry", "currency"]
+# Yahoo info key -> kolom stocks (key pertama yang terisi menang)
+INFO_KEYS = {
+    "company_name": ["longName", "shortName"],
+    "sector": ["sector"],
+    "industry": ["industry"],
+    "currency": ["currency"],
+}
+
+STALE_SQL = """
+    SELECT ticker FROM stocks
+    WHERE is_active IS NOT FALSE
+      AND (metadata_updated_at IS NULL OR metadata_updated_at < NOW() - CAST(:days AS INTEGER) * INTERVAL '1 day')
+    ORDER BY metadata_updated_at NULLS FIRST, ticker
+"""
+
+_cache_lock = threading.Lock()
+
+
+def cache_path() -> str:
+    data_raw = (get_settings().raw.get("paths") or {}).get("data_raw", "data/raw")
+    return os.path.join(PROJECT_ROOT, data_raw, "cache", "stock_info.json")
+
+
+def load_cache(ttl_hours: float) -> dict[str, dict]:
+    """{ticker: metadata} yang umurnya < ttl_hours."""
+    path = cache_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            raw = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    cutoff = time.time() - ttl_hours * 3600
+    return {t: e["metadata"] for t, e in raw.items() if e.get("fetched_at", 0) >= cutoff}
+
+
+def save_cache(entries: dict[str, dict]):
+    """Gabungkan entri baru ke file cache (tulis ke file sementara lalu rename)."""
+    if not entries:
+        return
+    path = cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _cache_lock:
+        current = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    current = json.load(f)
+            except (OSError, ValueError):
+                current = {}
+        now = time.time()
+        current.update({t: {"fetched_at": now, "metadata": m} for t, m in entries.items()})
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(current, f)
+        os.replace(tmp, path)
+
+
+def extract_metadata(info: dict) -> dict:
+    """Kolom stocks dari dict info Yahoo; field kosong -> None."""
+    out = {}
+    for col, keys in INFO_KEYS.items():
+        value = next((info.get(k) for k in keys if info.get(k)), None)
+        out[col] = str(value)[:255 if col == "company_name" else 100] if value else None
+    if out["currency"]:
+        out["currency"] = out["currency"][:10]
+    return out
+
+
+def stale_tickers(engine, max_age_days: int) -> list[str]:
+    with engine.connect() as conn:
+        return [r[0] for r in conn.execute(text(STALE_SQL), {"days": int(max_age_days)}).fetchall()]
+
+
+def fetch_metadata(tickers: list[str], workers: int) -> tuple[dict[str, dict], list[str]]:
+    """Info paralel. Return ({ticker: metadata}, [ticker gagal])."""
+    scope = RUN_METRICS.current()  # request di thread pool tetap tercatat di stage pemanggil
+
+    def one(ticker):
+        try:
+            with RUN_METRICS.attach(scope):
+                return ticker, extract_metadata(ticker_info(ticker) or {})
+        except Exception as e:
+            print(f"  [META] {ticker}: {e}")
+            return ticker, None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="metadata") as pool:
+        results = list(pool.map(one, tickers))
+    fetched = {t: m for t, m in results if m is not None}
+    return fetched, [t for t, m in results if m is None]
+
+
+def enrich_metadata(engine=None, tickers: list[str] | None = None) -> int:
+    """
+    Perbarui metadata saham yang kosong/basi (atau `tickers` tertentu) dengan satu bulk
+    UPDATE. Ticker yang gagal diambil tidak ditandai, jadi ikut lagi di run berikutnya.
+    Return jumlah baris stocks yang diperbarui.
+    """
+    engine = engine or get_db_engine()
+    cfg = get_settings().metadata
+    tickers = tickers if tickers is not None else stale_tickers(engine, cfg.max_age_days)
+    if not tickers:
+        print("[META] All stock metadata is fresh")
+        return 0
+
+    cached = load_cache(cfg.cache_ttl_hours)
+    metadata = {t: cached[t] for t in tickers if t in cached}
+    to_fetch = [t for t in tickers if t not in metadata]
+    print(f"[META] {len(tickers)} stock(s) to enrich | {len(metadata)} from cache, "
+          f"{len(to_fetch)} to fetch with {cfg.workers} worker(s)")
+
+    failed = []
+    if to_fetch:
+        fetched, failed = fetch_metadata(to_fetch, cfg.workers)
+        save_cache(fetched)
+        metadata.update(fetched)
+
+    rows = [{"ticker": t, **m} for t, m in metadata.items()]
+    with engine.begin() as conn:
+        updated = bulk_update(
+            conn, "stocks", rows, key_cols=["ticker"], update_cols=METADATA_COLUMNS, coalesce=True,
+            extra_set="metadata_updated_at = NOW()",
+            types={c: "VARCHAR" for c in ["ticker"] + METADATA_COLUMNS},
+        )
+    print(f"[META] {updated} stock(s) updated, {len(failed)} failed")
+    return updated
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser("Stock Metadata Enrichment")
+    parser.add_argument("--all", action="store_true", help="Semua saham aktif, bukan hanya yang basi")
+    parser.add_argument("--ticker", action="append", help="Ticker tertentu (boleh berulang)")
+    args = parser.parse_args()
+
+    engine = get_db_engine()
+    if args.all:
+        with engine.connect() as conn:
+            selected = [r[0] for r in conn.execute(text("SELECT ticker FROM stocks WHERE is_active IS NOT FALSE")).fetchall()]
+    else:
+        selected = args.ticker
+    enrich_metadata(engine, selected)
@@ -1,11 +1,17 @@
-import yfinance as yf
 import pandas as pd
 from sqlalchemy import text
-import time
-import json
 import os
 
-from src.database.connection import engine
+from src.config import get_settings, get_tickers, ticker_names
+from src.database.bulk import bulk_upsert
+from src.database.connection import get_db_engine, statement, set_backend
+from src.database.write_buffer import ROLLUP_SOURCE
+from src.storage.parquet_mirror import mirror_frame
+from src.storage import price_tail
+from src.collectors.providers import download_prices
+from src.collectors.corporate_actions import check_overlap, record_events
+from src.monitoring.metrics import RUN_METRICS
+from src.pipeline.trading_calendar import get_calendar
 
 
 # CONFIG
@@ -14,22 +20,40 @@ from src.database.connection import engine
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
 
-CONFIG_DIR = os.path.join(PROJECT_ROOT, "config")
-DEFAULT_PERIOD = "7d" # TURBO: Cukup ambil data 7 hari terakhir agar kencang
-REQUEST_DELAY = 1.0 # Pangkas sedikit delay agar lebih gesit
+# Periode default (ticker tanpa histori): data_collection.price_period di settings.yaml.
+# Jeda antar request tidak lagi di sini: rate controller per provider (collectors.ratelimit)
+# Sesi tersimpan yang ikut diunduh ulang: overlap untuk deteksi corporate action
+OVERLAP_SESSIONS = 3
 
 
 # UTILS
 
 def load_tickers(region="indonesia"):
-    path = os.path.join(CONFIG_DIR, "tickers.json")
-    with open(path, "r") as f:
-        data = json.load(f)
-    return data.get(region, [])
-
-
-def get_or_create_stock(ticker: str) -> int:
-    with engine.begin() as conn:
+    return get_tickers(region)
+
+
+# Bar Yahoo tidak menimpa harga tersimpan, kecuali baris roll-up intraday (sementara)
+PRICE_UPSERT_SQL = f"""
+    INSERT INTO technical_prices
+    (stock_id, date, open, high, low, close, adj_close, volume, data_source)
+    VALUES
+    (:sid, :d, :o, :h, :l, :c, :ac, :v, 'yahoo_finance')
+    ON CONFLICT (stock_id, date) DO UPDATE SET
+        open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close,
+        adj_close = EXCLUDED.adj_close, volume = EXCLUDED.volume, data_source = EXCLUDED.data_source
+    WHERE technical_prices.data_source = '{ROLLUP_SOURCE}'
+"""
+
+# Kolom yang ditimpa saat histori ditulis ulang setelah corporate action
+REWRITE_UPDATE_COLS = ["open", "high", "low", "close", "adj_close", "volume", "data_source"]
+
+
+def get_or_create_stock(ticker: str, engine=None) -> int:
+    """
+    id saham; ticker baru didaftarkan tanpa request ke Yahoo (nama dari tickers.json).
+    Sektor/industri diisi belakangan oleh job enrichment (collectors.metadata).
+    """
+    with (engine or get_db_engine()).begin() as conn:
         res = conn.execute(
             text("SELECT id FROM stocks WHERE ticker = :t"),
             {"t": ticker}
@@ -38,63 +62,91 @@ def get_or_create_stock(ticker: str) -> int:
         if res:
             return res[0]
 
-        try:
-            info = yf.Ticker(ticker).info
-        except Exception:
-            info = {}
-
+        # DO UPDATE no-op agar RETURNING tetap mengembalikan id jika job lain lebih dulu insert
         result = conn.execute(
             text("""
-                INSERT INTO stocks (ticker, company_name, sector, industry, currency)
-                VALUES (:ticker, :name, :sector, :industry, :currency)
+                INSERT INTO stocks (ticker, company_name)
+                VALUES (:ticker, :name)
+                ON CONFLICT (ticker) DO UPDATE SET ticker = EXCLUDED.ticker
                 RETURNING id
             """),
-            {
-                "ticker": ticker,
-                "name": info.get("longName", ticker),
-                "sector": info.get("sector", "Unknown"),
-                "industry": info.get("industry", "Unknown"),
-                "currency": info.get("currency", "IDR"),
-            }
+            {"ticker": ticker, "name": ticker_names().get(ticker)}
         )
         return result.fetchone()[0]
 
-# CORE LOGIC
-
-def fetch_and_store(ticker: str, period: str = DEFAULT_PERIOD):
-    print(f"\n{ticker} | period={period}")
-
-    time.sleep(REQUEST_DELAY)
-
-    stock_id = get_or_create_stock(ticker)
-
-    df = yf.download(
-        ticker,
-        period=period,
-        interval="1d",
-        auto_adjust=False,
-        progress=False
-    )
-
-    if df.empty:
-        print("No data returned")
-        return
 
+def register_stocks(tickers: list[str], engine=None) -> int:
+    """Daftarkan semua ticker yang belum ada dalam satu INSERT multi-row."""
+    names = ticker_names()
+    rows = [{"ticker": t, "company_name": names.get(t)} for t in tickers]
+    with (engine or get_db_engine()).begin() as conn:
+        return bulk_upsert(conn, "stocks", rows, conflict_cols=["ticker"])
+
+def price_windows(tickers: list[str], through) -> dict[str, dict]:
+    """
+    {ticker: {"start", "missing"}} dari tanggal harga terakhir per ticker (satu query) dan
+    kalender bursa. missing = sesi sampai `through` yang belum tersimpan (0 = sudah lengkap,
+    tidak perlu fetch). start None = ticker tanpa histori -> pakai data_collection.price_period.
+    """
+    if not tickers:
+        return {}
+    with get_db_engine().connect() as conn:
+        # Baris roll-up intraday tidak dihitung tersimpan: window mencakupnya dan bar Yahoo menimpanya
+        last = dict(conn.execute(text("""
+            SELECT s.ticker, (SELECT MAX(p.date) FROM technical_prices p
+                              WHERE p.stock_id = s.id AND p.data_source IS DISTINCT FROM :rollup)
+            FROM stocks s WHERE s.ticker = ANY(:t)
+        """), {"t": list(tickers), "rollup": ROLLUP_SOURCE}).fetchall())
+
+    cal = get_calendar()
+    windows = {}
+    for t in tickers:
+        last_date = last.get(t)
+        if last_date is None:
+            windows[t] = {"start": None, "missing": None}
+            continue
+        missing = cal.missing_sessions(last_date, through)
+        start = cal.shift(missing[0], -OVERLAP_SESSIONS) if missing else None
+        windows[t] = {"start": start, "missing": len(missing)}
+    return windows
+
+
+def report_gaps(ticker: str, start, returned_dates) -> list:
+    """Sesi bursa di window yang tidak dikembalikan provider: gap data (bukan libur)."""
+    cal = get_calendar()
+    latest = cal.last_session(pd.Timestamp.now(tz="Asia/Jakarta").date())
+    # Sesi terakhir bisa belum dipublikasikan provider saat run -> belum dihitung gap
+    gaps = sorted(set(cal.sessions_between(start, latest)) - set(returned_dates) - {latest})
+    if gaps:
+        print(f"[GAP] {ticker}: {len(gaps)} session(s) without data: {', '.join(str(d) for d in gaps[:5])}"
+              f"{' ...' if len(gaps) > 5 else ''}")
+    return gaps
+
+
+def _price_row(r: dict) -> dict:
+    """Param statement (kunci pendek) -> baris dengan nama kolom tabel."""
+    return {
+        "stock_id": r["sid"], "date": r["d"], "open": r["o"], "high": r["h"], "low": r["l"],
+        "close": r["c"], "adj_close": r["ac"], "volume": r["v"], "data_source": "yahoo_finance",
+    }
+
+def _normalise(df: pd.DataFrame) -> pd.DataFrame:
     if isinstance(df.columns, pd.MultiIndex):
         df.columns = df.columns.get_level_values(0)
 
-    df.reset_index(inplace=True)
+    df = df.reset_index()
     df["Date"] = pd.to_datetime(df["Date"]).dt.date
     df.columns = [c.replace(" ", "_") for c in df.columns]
+    # Fallback jika Adj Close tidak ada (sering terjadi di versi yfinance baru)
+    if "Adj_Close" not in df.columns:
+        df["Adj_Close"] = df["Close"]
+    return df
+
 
+def _price_params(df: pd.DataFrame, stock_id: int) -> list[dict]:
     # Konversi baris ke list dictionary (Lebih aman drpd itertuples jika kolom hilang)
-    data_list = df.to_dict('records')
     data_to_prepare = []
-    
-    for row in data_list:
-        # Fallback jika Adj Close tidak ada (sering terjadi di versi yfinance baru)
-        adj_close = row.get("Adj_Close", row.get("Close"))
-        
+    for row in df.to_dict('records'):
         data_to_prepare.append({
             "sid": stock_id,
             "d": row["Date"],
@@ -102,27 +154,108 @@ def fetch_and_store(ticker: str, period: str = DEFAULT_PERIOD):
             "h": float(row["High"]),
             "l": float(row["Low"]),
             "c": float(row["Close"]),
-            "ac": float(adj_close),
+            "ac": float(row["Adj_Close"]),
             "v": int(row["Volume"]) if row.get("Volume") is not None and not pd.isna(row.get("Volume")) else 0,
         })
+    return data_to_prepare
+
+# CORE LOGIC
+
+def rewrite_history(ticker: str, stock_id: int, found: dict) -> int:
+    """
+    Unduh ulang seluruh histori tersimpan ticker ini dan timpa (DO UPDATE), lalu catat event
+    dan tandai indikatornya untuk dihitung ulang -- satu transaksi, langsung (bukan lewat
+    write buffer) agar stage indikator berikutnya melihat harga yang sudah benar.
+    """
+    print(f"[CORP-ACTION] {ticker}: {found['reason']} at {found['first_date']} "
+          f"(max deviation {found['max_deviation']:.2%}) -> rewriting history")
+
+    with get_db_engine().connect() as conn:
+        since = conn.execute(
+            text("SELECT MIN(date) FROM technical_prices WHERE stock_id = :sid"), {"sid": stock_id}
+        ).scalar()
+
+    df = download_prices(
+        ticker,
+        expect_rows=True,
+        start=since,
+        interval="1d",
+        auto_adjust=False,
+        actions=True,
+        progress=False
+    )
+    if df is None or df.empty:
+        # Event belum dicatat -> run berikutnya mendeteksi dan mencoba lagi
+        print("No data returned for history rewrite")
+        return 0
+
+    rows = [_price_row(r) for r in _price_params(_normalise(df), stock_id)]
+    with get_db_engine().begin() as conn:
+        written = bulk_upsert(conn, "technical_prices", rows, conflict_cols=["stock_id", "date"],
+                              update_cols=REWRITE_UPDATE_COLS)
+        record_events(conn, stock_id, found, since)
+    RUN_METRICS.incr("history_rewrites")
+    # Tail lokal berisi harga sebelum penyesuaian; indikator dihitung ulang dari DB (recompute)
+    price_tail.invalidate(ticker)
+
+    mirror_frame("technical_prices", pd.DataFrame(rows).assign(ticker=ticker))
+    print(f"rewrote {written} rows since {since}")
+    return written
+
+
+def fetch_and_store(ticker: str, period: str | None = None, buffer=None, start=None):
+    """start: tanggal awal window (dari price_windows); jika ada, menggantikan period."""
+    cfg = get_settings().data_collection
+    period = period or cfg.price_period
+    print(f"\n{ticker} | {f'start={start}' if start else f'period={period}'}")
+
+    stock_id = get_or_create_stock(ticker)
+
+    window = {"start": start} if start else {"period": period}
+    # start dari price_windows = ticker sudah punya harga: frame kosong adalah kegagalan provider
+    df = download_prices(
+        ticker,
+        expect_rows=start is not None,
+        interval="1d",
+        auto_adjust=False,
+        actions=True,
+        progress=False,
+        **window
+    )
+
+    if df is None or df.empty:
+        print("No data returned")
+        return 0
+
+    df = _normalise(df)
+    if start:
+        report_gaps(ticker, start, df["Date"])
+
+    # Overlap dengan data tersimpan menyimpang / ada split-dividen baru -> tulis ulang histori
+    with get_db_engine().connect() as conn:
+        found = check_overlap(conn, stock_id, df)
+    if found:
+        return rewrite_history(ticker, stock_id, found)
+
+    data_to_prepare = _price_params(df, stock_id)
 
     inserted = 0
     if data_to_prepare:
-        with engine.begin() as conn:
-            # TURBO: Bulk Upsert sekaligus
-            conn.execute(
-                text("""
-                    INSERT INTO technical_prices
-                    (stock_id, date, open, high, low, close, adj_close, volume, data_source)
-                    VALUES
-                    (:sid, :d, :o, :h, :l, :c, :ac, :v, 'yahoo_finance')
-                    ON CONFLICT (stock_id, date) DO NOTHING
-                """),
-                data_to_prepare
-            )
-            inserted = len(data_to_prepare)
-
-    print(f"inserted {inserted} rows")
+        rows = [_price_row(r) for r in data_to_prepare]
+        if buffer is not None:
+            # Write-behind: ditulis (dan di-mirror) saat buffer di-flush (threshold / akhir shard)
+            buffer.add("technical_prices", rows)
+        else:
+            with get_db_engine().begin() as conn:
+                # TURBO: Bulk Upsert sekaligus
+                conn.execute(statement("price_upsert", PRICE_UPSERT_SQL), data_to_prepare)
+            mirror_frame("technical_prices", pd.DataFrame(rows).assign(ticker=ticker))
+        inserted = len(data_to_prepare)
+        # Hand-off ke stage indicators: tidak perlu membaca ulang histori dari DB
+        price_tail.offer(ticker, rows)
+
+    print(f"{'buffered' if buffer is not None else 'inserted'} {inserted} rows")
+    return inserted
 
 
 # CLI
@@ -132,10 +265,14 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser("Yahoo Technical Price Collector")
     parser.add_argument("--ticker", type=str, help="Single ticker")
-    parser.add_argument("--period", type=str, default=DEFAULT_PERIOD)
+    parser.add_argument("--period", type=str, help="Default: data_collection.price_period")
     parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--backend", choices=["postgres", "duckdb"],
+                        help="Override database.backend (duckdb: backfill lokal, lalu python -m src.database.sync)")
 
     args = parser.parse_args()
+    if args.backend:
+        set_backend(args.backend)
 
     if args.ticker:
         fetch_and_store(args.ticker, args.period)
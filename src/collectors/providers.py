@@ -0,0 +1,177 @@
+"""
+Seam untuk semua panggilan ke sumber data eksternal (Yahoo Finance, Google News RSS).
+
+Collector tidak memanggil yfinance / HTTP langsung, tapi lewat fungsi modul ini. Implementasi
+default memakai yfinance + requests; benchmark dan simulator bisa memasang provider palsu
+lewat use_providers() tanpa mengubah collector. Instrumentasi request (RUN_METRICS) dan rate
+control adaptif per provider (collectors.ratelimit) ada di sini, jadi provider palsu pun
+terukur dan di-throttle dengan cara yang sama.
+"""
+import threading
+import warnings
+from contextlib import contextmanager
+
+import pandas as pd
+import requests
+
+from src.config import get_settings
+from src.collectors.ratelimit import controller, reset_controllers, EmptyResponseError, NoDataError
+from src.monitoring.metrics import RUN_METRICS
+
+RSS_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; stock-harvester)"}
+
+# Argumen yf.download yang tidak dimiliki Ticker.history
+DOWNLOAD_ONLY_KWARGS = ("progress", "threads", "ignore_tz", "session")
+
+# raise_errors=True adalah satu-satunya cara per panggilan (bukan config global yfinance)
+# agar Ticker.history melempar 429 / 5xx
+warnings.filterwarnings("ignore", message="'raise_errors' deprecated", category=DeprecationWarning)
+
+
+class YahooProvider:
+    """Implementasi asli: yfinance (diimport saat dipakai agar mode offline tidak butuh paketnya)."""
+
+    def download(self, tickers, group_by: str = "column", actions: bool = False, **kwargs) -> pd.DataFrame:
+        """
+        Format sama dengan yf.download, tapi per ticker lewat Ticker.history(raise_errors=True).
+        yf.download menelan setiap error per ticker (termasuk YFRateLimitError dan 5xx) dan
+        mengembalikan frame kosong, sehingga rate controller tidak pernah melihat kegagalan.
+        Di sini 429 / 5xx / error jaringan dilempar. Ticker yang dijawab Yahoo "tidak ada data"
+        (delisted, simbol salah, window tanpa bar) dilewati; jika SEMUA ticker dijawab begitu,
+        NoDataError dilempar agar download_prices bisa membedakannya dari frame kosong diam-diam.
+        """
+        import yfinance as yf
+        from yfinance.exceptions import YFPricesMissingError, YFTzMissingError, YFInvalidPeriodError
+
+        for key in DOWNLOAD_ONLY_KWARGS:
+            kwargs.pop(key, None)
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        frames, no_data = {}, []
+        for symbol in symbols:
+            try:
+                df = yf.Ticker(symbol).history(actions=actions, raise_errors=True, **kwargs)
+            except (YFPricesMissingError, YFTzMissingError, YFInvalidPeriodError) as e:
+                print(f"  {symbol}: {e}")
+                no_data.append(symbol)
+                continue
+            if df is not None and not df.empty:
+                # yf.download (ignore_tz default): index harian tanpa timezone
+                if kwargs.get("interval", "1d")[-1] not in ("m", "h"):
+                    df.index = df.index.tz_localize(None)
+                frames[symbol] = df
+        if not frames:
+            if symbols and len(no_data) == len(symbols):
+                raise NoDataError(f"yahoo: no data for {', '.join(no_data)}")
+            return pd.DataFrame()
+
+        data = pd.concat(frames.values(), axis=1, sort=True, keys=frames.keys(), names=["Ticker", "Price"])
+        if group_by == "column":
+            data.columns = data.columns.swaplevel(0, 1)
+            data = data.sort_index(level=0, axis=1)
+        return data
+
+    def info(self, ticker: str) -> dict:
+        import yfinance as yf
+        return yf.Ticker(ticker).info
+
+    def quarterly_statements(self, ticker: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+        import yfinance as yf
+        stock = yf.Ticker(ticker)
+        # Property yfinance memicu request saat diakses
+        return stock.quarterly_financials, stock.quarterly_balance_sheet
+
+
+class RssProvider:
+    def fetch(self, url: str) -> bytes:
+        resp = requests.get(url, timeout=get_settings().data_collection.rss_timeout, headers=RSS_HEADERS)
+        resp.raise_for_status()
+        return resp.content
+
+
+_lock = threading.Lock()
+_active = {"yahoo": YahooProvider(), "rss": RssProvider()}
+
+
+def get_provider(name: str):
+    return _active[name]
+
+
+def set_providers(yahoo=None, rss=None) -> dict:
+    """Pasang provider pengganti; return provider sebelumnya (untuk dipulihkan)."""
+    with _lock:
+        previous = dict(_active)
+        if yahoo is not None:
+            _active["yahoo"] = yahoo
+        if rss is not None:
+            _active["rss"] = rss
+    # Rate / breaker milik layanan sebelumnya tidak berlaku untuk provider baru
+    reset_controllers()
+    return previous
+
+
+@contextmanager
+def use_providers(yahoo=None, rss=None):
+    previous = set_providers(yahoo=yahoo, rss=rss)
+    try:
+        yield
+    finally:
+        with _lock:
+            _active.update(previous)
+        reset_controllers()
+
+
+# API yang dipakai collector
+
+# Setiap attempt (termasuk retry) diukur terpisah; controller(...) mengatur pacing, retry,
+# dan circuit breaker per provider (lihat collectors.ratelimit)
+
+def download_prices(tickers, expect_rows: bool = False, **kwargs) -> pd.DataFrame:
+    """
+    expect_rows: caller tahu ticker ini punya data di window (mis. ada harga tersimpan sebelum
+    start). Frame kosong lalu dianggap soft failure (EmptyResponseError): di-retry, menurunkan
+    rate, dan dihitung breaker -- provider yang menelan 429 tidak terlihat sebagai sukses.
+    Jawaban eksplisit "tidak ada data" (NoDataError: delisted / suspend lama) tetap frame kosong
+    biasa: tidak di-retry dan tidak dihitung AIMD / breaker.
+    """
+    def attempt():
+        with RUN_METRICS.request("yahoo") as req:
+            try:
+                df = _active["yahoo"].download(tickers, **kwargs)
+            except NoDataError:
+                req["empty"] = True
+                return pd.DataFrame()
+            req["empty"] = df is None or df.empty
+            if req["empty"] and expect_rows:
+                raise EmptyResponseError(f"yahoo: empty response for {tickers}")
+        return df
+    return controller("yahoo").call(attempt)
+
+
+def ticker_info(ticker: str) -> dict:
+    def attempt():
+        with RUN_METRICS.request("yahoo"):
+            return _active["yahoo"].info(ticker)
+    return controller("yahoo").call(attempt)
+
+
+def quarterly_statements(ticker: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    def attempt():
+        with RUN_METRICS.request("yahoo") as req:
+            income, balance = _active["yahoo"].quarterly_statements(ticker)
+            req["empty"] = income is None or income.empty
+        return income, balance
+    return controller("yahoo").call(attempt)
+
+
+def fetch_rss(url: str) -> bytes | None:
+    """Body RSS, atau None jika request gagal setelah retry / provider di-pause breaker."""
+    def attempt():
+        with RUN_METRICS.request("google_news") as req:
+            body = _active["rss"].fetch(url)
+            req["bytes"] = len(body)
+        return body
+    try:
+        return controller("rss").call(attempt)
+    except Exception as e:
+        print(f"  RSS fetch failed: {e}")
+        return None
@@ -0,0 +1,260 @@
+"""
+Rate control adaptif per provider eksternal (Yahoo, RSS), dipasang di seam providers.
+
+Menggantikan time.sleep tetap di collector. Setiap provider punya RateController sendiri:
+
+  - pacing: request diberi slot waktu 1/rate detik (global per provider, lintas thread)
+  - AIMD: setiap sukses menaikkan rate secara aditif (~+increase req/s per detik trafik);
+    429, error 5xx/jaringan, atau latensi > latency_target menurunkan rate secara
+    multiplikatif (x decrease, paling sering sekali per decrease_cooldown detik agar
+    burst kegagalan serentak tidak langsung menjatuhkan rate ke minimum)
+  - retry: kegagalan provider diulang hingga max_retries kali dengan exponential backoff
+    + full jitter (dan minimal Retry-After jika server mengirimkannya)
+  - circuit breaker: breaker_threshold kegagalan berturut-turut -> provider "open" selama
+    breaker_open_seconds; panggilan selama open langsung gagal (CircuitOpenError) tanpa
+    menunggu, jadi worker bebas mengerjakan stage provider lain. Setelah itu satu
+    panggilan percobaan (half-open): sukses -> closed, gagal -> open lagi (durasi x2).
+
+Error yang bukan kegagalan provider (mis. 404, bug parsing) diteruskan apa adanya: tidak
+di-retry dan tidak dihitung breaker. Response kosong untuk permintaan yang seharusnya berisi
+(EmptyResponseError, mis. ticker yang kemarin masih punya harga) dihitung sebagai kegagalan:
+sumber data yang menelan error dan mengembalikan data kosong tetap terlihat oleh controller.
+Jawaban eksplisit "tidak ada data" (NoDataError, mis. yfinance YFPricesMissingError untuk
+ticker delisted / suspend lama) BUKAN kegagalan: tanpa retry, tidak menurunkan rate / breaker.
+"""
+import random
+import threading
+import time
+
+import requests
+
+from src.config import get_settings
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+THROTTLED, FAILED = "throttled", "failed"
+
+MAX_OPEN_FACTOR = 8  # durasi open maksimum = breaker_open_seconds x faktor ini
+
+
+class CircuitOpenError(RuntimeError):
+    """Provider sedang di-pause oleh circuit breaker."""
+
+
+class EmptyResponseError(RuntimeError):
+    """Provider mengembalikan data kosong padahal data diharapkan ada (soft failure)."""
+
+
+class NoDataError(RuntimeError):
+    """Provider menjawab eksplisit "tidak ada data" (delisted / suspend lama): bukan kegagalan provider."""
+
+
+def classify(exc: Exception) -> str | None:
+    """THROTTLED / FAILED untuk kegagalan provider, None untuk error lain."""
+    if isinstance(exc, NoDataError):
+        return None
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is not None:
+        if status == 429:
+            return THROTTLED
+        return FAILED if status >= 500 else None
+    # yfinance: YFRateLimitError ("Too Many Requests. Rate limited.")
+    if "ratelimit" in type(exc).__name__.lower() or "too many requests" in str(exc).lower():
+        return THROTTLED
+    if isinstance(exc, (EmptyResponseError, requests.ConnectionError, requests.Timeout,
+                        ConnectionError, TimeoutError)):
+        return FAILED
+    # yfinance: YFDataException "YAHOO! FINANCE IS CURRENTLY DOWN", error jaringan curl_cffi
+    if "currently down" in str(exc).lower() or type(exc).__module__.startswith("curl_cffi"):
+        return FAILED
+    return None
+
+
+def retry_after(exc: Exception) -> float:
+    response = getattr(exc, "response", None)
+    value = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+class RateController:
+    def __init__(self, name: str, enabled: bool = True, initial_rate: float = 2.0, min_rate: float = 0.2,
+                 max_rate: float = 20.0, increase: float = 0.5, decrease: float = 0.5,
+                 decrease_cooldown: float = 1.0, latency_target: float = 5.0, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0, breaker_threshold: int = 5,
+                 breaker_open_seconds: float = 60.0, seed: int | None = None):
+        self.name = name
+        self.enabled = enabled
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.decrease_cooldown = decrease_cooldown
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_open_seconds = breaker_open_seconds
+
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._next_slot = 0.0
+        self._last_decrease = float("-inf")
+        self.state = CLOSED
+        self._open_until = 0.0
+        self._open_seconds = breaker_open_seconds
+        self._probe_in_flight = False
+        self._consecutive_failures = 0
+        self.stats = {"calls": 0, "successes": 0, "throttled": 0, "failures": 0, "retries": 0,
+                      "rejected": 0, "breaker_trips": 0, "wait_s": 0.0, "backoff_s": 0.0,
+                      "min_rate_seen": self.rate, "max_rate_seen": self.rate}
+
+    # breaker
+
+    def _admit(self):
+        """Raise CircuitOpenError jika provider di-pause; half-open hanya meloloskan satu probe."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() < self._open_until:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(f"{self.name}: circuit open for {self._open_until - time.monotonic():.1f}s")
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(f"{self.name}: circuit half-open, probe in flight")
+                self._probe_in_flight = True
+
+    def _trip(self, now: float):
+        self._open_seconds = (self._open_seconds * 2 if self.state == HALF_OPEN else self.breaker_open_seconds)
+        self._open_seconds = min(self._open_seconds, self.breaker_open_seconds * MAX_OPEN_FACTOR)
+        self.state = OPEN
+        self._open_until = now + self._open_seconds
+        self._probe_in_flight = False
+        self.stats["breaker_trips"] += 1
+        print(f"[RATE] {self.name}: circuit OPEN for {self._open_seconds:.0f}s "
+              f"after {self._consecutive_failures} consecutive failure(s)")
+
+    # pacing + AIMD
+
+    def _acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+            with self._lock:
+                self.stats["wait_s"] += wait
+
+    def _set_rate(self, rate: float):
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.stats["min_rate_seen"] = min(self.stats["min_rate_seen"], self.rate)
+        self.stats["max_rate_seen"] = max(self.stats["max_rate_seen"], self.rate)
+
+    def _decrease(self, now: float):
+        if now - self._last_decrease >= self.decrease_cooldown:
+            self._last_decrease = now
+            self._set_rate(self.rate * self.decrease)
+
+    def _on_success(self, latency: float):
+        with self._lock:
+            now = time.monotonic()
+            self.stats["successes"] += 1
+            self._consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                print(f"[RATE] {self.name}: circuit CLOSED (probe succeeded)")
+            self.state = CLOSED
+            self._probe_in_flight = False
+            if latency > self.latency_target:
+                self._decrease(now)
+            else:
+                self._set_rate(self.rate + self.increase / self.rate)
+
+    def _on_failure(self, kind: str) -> bool:
+        """Catat kegagalan; return True jika breaker baru saja terbuka."""
+        with self._lock:
+            now = time.monotonic()
+            self.stats["throttled" if kind == THROTTLED else "failures"] += 1
+            self._consecutive_failures += 1
+            self._decrease(now)
+            if self.state == OPEN:
+                return True  # request yang sudah in-flight saat breaker terbuka
+            if self.state == HALF_OPEN or self._consecutive_failures >= self.breaker_threshold:
+                self._trip(now)
+                return True
+            return False
+
+    def backoff(self, attempt: int, exc: Exception | None = None) -> float:
+        """Full jitter: uniform(0, min(backoff_max, base * 2^attempt)), minimal Retry-After."""
+        with self._lock:
+            jittered = self._rng.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        return max(jittered, retry_after(exc) if exc is not None else 0.0)
+
+    def call(self, fn, *args, **kwargs):
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        for attempt in range(self.max_retries + 1):
+            self._admit()
+            self._acquire()
+            with self._lock:
+                self.stats["calls"] += 1
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify(e)
+                if kind is None:
+                    with self._lock:
+                        self._probe_in_flight = False
+                    raise
+                opened = self._on_failure(kind)
+                if opened or attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt, e)
+                with self._lock:
+                    self.stats["retries"] += 1
+                    self.stats["backoff_s"] += delay
+                time.sleep(delay)
+                continue
+            self._on_success(time.perf_counter() - start)
+            return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {k: round(v, 3) if isinstance(v, float) else v for k, v in self.stats.items()}
+            out.update(rate=round(self.rate, 3), state=self.state)
+        return out
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def controller(provider: str) -> RateController:
+    """RateController untuk provider seam ('yahoo' / 'rss'), dari rate_limit.<provider>."""
+    ctl = _controllers.get(provider)
+    if ctl is None:
+        with _controllers_lock:
+            ctl = _controllers.get(provider)
+            if ctl is None:
+                ctl = RateController(provider, **get_settings().section(f"rate_limit.{provider}").as_dict())
+                _controllers[provider] = ctl
+    return ctl
+
+
+def reset_controllers():
+    """Buang state (rate, breaker); controller dibuat ulang dari settings saat dipakai lagi."""
+    with _controllers_lock:
+        _controllers.clear()
+
+
+def controller_stats() -> dict:
+    with _controllers_lock:
+        return {name: ctl.snapshot() for name, ctl in _controllers.items()}
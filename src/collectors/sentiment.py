@@ -1,11 +1,12 @@
 import feedparser
 import pandas as pd
 from datetime import datetime
-from src.database.connection import engine
+from src.config import get_settings, ticker_names
+from src.database.connection import get_db_engine, statement
+from src.storage.parquet_mirror import mirror_rows
+from src.collectors.providers import fetch_rss
 from sqlalchemy import text
 import urllib.parse
-import json
-import os
 
 # Simple Indonesian Sentiment Dictionary
 POSITIVE_WORDS = [
@@ -19,6 +20,17 @@ NEGATIVE_WORDS = [
 
 from src.modeling.indobert import get_engine
 
+SENTIMENT_UPSERT_SQL = """
+    INSERT INTO news_sentiment (stock_id, date, sentiment_score, news_count)
+    VALUES (:sid, :d, :s, :c)
+    ON CONFLICT (stock_id, date) DO UPDATE
+    SET sentiment_score = EXCLUDED.sentiment_score, news_count = EXCLUDED.news_count;
+"""
+
+def fetch_feed(url: str):
+    """RSS lewat provider lalu parse. Gagal jaringan -> feed kosong (perilaku lama feedparser.parse(url))."""
+    return feedparser.parse(fetch_rss(url) or b"")
+
 # Initialize AI Engine (Lazy Load)
 ai_engine = None
 
@@ -38,68 +50,74 @@ def get_sentiment_score(text):
             if w in text: score -= 1
         return max(min(score, 1.0), -1.0)
 
-def collect_sentiment(target_ticker=None):
+def collect_sentiment(target_ticker=None, buffer=None):
     print(f"Collecting Sentiment...")
     
-    with engine.connect() as conn:
+    # Koneksi hanya dipegang selama query, bukan selama fetch RSS + inferensi
+    with get_db_engine().connect() as conn:
         # Get Tickers
         if target_ticker:
             stocks = conn.execute(text("SELECT id, ticker FROM stocks WHERE ticker = :t"), {"t": target_ticker}).fetchall()
         else:
             stocks = conn.execute(text("SELECT id, ticker FROM stocks")).fetchall()
+    
+    # Nama perusahaan dari registry ticker (tickers.json di-cache, tidak dibuka per panggilan)
+    ticker_map = ticker_names("indonesia")
+    max_headlines = get_settings().data_collection.max_headlines
+    
+    today_date = datetime.now().date()
+    print(f"Processing {len(stocks)} stocks...")
+    
+    global ai_engine # Fix: Terkadang python menganggap ini lokal karena ada pengecekan None
+    
+    for stock_id, ticker_raw in stocks:
+        ticker_clean = ticker_raw.split(".")[0]
+        company_name = ticker_map.get(ticker_raw, ticker_clean)
         
-        # Load Tickers Config
-        CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "config", "tickers.json")
-        
-        ticker_map = {}
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, "r") as f:
-                ticker_config = json.load(f)
-            ticker_map = {item["ticker"]: item["name"] for item in ticker_config.get("indonesia", [])}
+        query = f'"{company_name}" OR "{ticker_clean}"'
+        encoded_query = urllib.parse.quote(query)
         
-        today_date = datetime.now().date()
-        print(f"Processing {len(stocks)} stocks...")
+        print(f"  Searching: {query}")
+        rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=id-ID&gl=ID&ceid=ID:id"
         
-        global ai_engine # Fix: Terkadang python menganggap ini lokal karena ada pengecekan None
+        feed = fetch_feed(rss_url)
+        titles = [entry.title for entry in feed.entries[:max_headlines]] # [TURBO] Batasi N berita terbaru (tetap akurat)
+        count = len(titles)
         
-        for stock_id, ticker_raw in stocks:
-            ticker_clean = ticker_raw.split(".")[0]
-            company_name = ticker_map.get(ticker_raw, ticker_clean)
+        if count > 0:
+            # Batch Prediction (TURBO MODE)
+            if ai_engine is None:
+                ai_engine = get_engine()
             
-            query = f'"{company_name}" OR "{ticker_clean}"'
-            encoded_query = urllib.parse.quote(query)
-            
-            print(f"  Searching: {query}")
-            rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=id-ID&gl=ID&ceid=ID:id"
-            
-            feed = feedparser.parse(rss_url)
-            titles = [entry.title for entry in feed.entries[:10]] # [TURBO] Batasi 10 berita terbaru (tetap akurat)
-            count = len(titles)
-            
-            if count > 0:
-                # Batch Prediction (TURBO MODE)
-                if ai_engine is None:
-                    ai_engine = get_engine()
-                
-                print(f"  [TURBO] Batch processing {count} news for {ticker_clean}...")
-                scores = ai_engine.predict_batch(titles)
-                avg = sum(scores) / count
-                final_score = max(min(avg, 1.0), -1.0)
-            else:
-                final_score = 0
-                
-            print(f"  {ticker_clean}: {count} news, Score: {final_score:.2f}")
+            print(f"  [TURBO] Batch processing {count} news for {ticker_clean}...")
+            scores = ai_engine.predict_batch(titles)
+            avg = sum(scores) / count
+            final_score = max(min(avg, 1.0), -1.0)
+        else:
+            final_score = 0
             
-            # Upsert
-            conn.execute(text("""
-                INSERT INTO news_sentiment (stock_id, date, sentiment_score, news_count)
-                VALUES (:sid, :d, :s, :c)
-                ON CONFLICT (stock_id, date) DO UPDATE 
-                SET sentiment_score = EXCLUDED.sentiment_score, news_count = EXCLUDED.news_count;
-            """), {"sid": stock_id, "d": today_date, "s": final_score, "c": count})
-            conn.commit()
+        print(f"  {ticker_clean}: {count} news, Score: {final_score:.2f}")
+        
+        # Upsert
+        if buffer is not None:
+            buffer.add("news_sentiment", [{
+                "stock_id": stock_id, "date": today_date,
+                "sentiment_score": final_score, "news_count": count
+            }])
+        else:
+            with get_db_engine().begin() as conn:
+                conn.execute(
+                    statement("sentiment_upsert", SENTIMENT_UPSERT_SQL),
+                    {"sid": stock_id, "d": today_date, "s": final_score, "c": count}
+                )
+            # Jalur buffer di-mirror oleh write buffer setelah flush commit
+            mirror_rows("news_sentiment", [{
+                "ticker": ticker_raw, "date": today_date,
+                "sentiment_score": final_score, "news_count": count
+            }])
 
     print("Sentiment Collection Complete!")
+    return len(stocks)
 
 if __name__ == "__main__":
     import argparse
@@ -0,0 +1,501 @@
+"""
+Konfigurasi terpusat: config/settings.yaml dan config/tickers.json dibaca SEKALI per
+proses, divalidasi, lalu di-cache. File hanya di-parse ulang jika mtime-nya berubah;
+mtime sendiri dicek paling sering sekali per config.reload_check_seconds, jadi
+get_settings() di jalur per-ticker praktis gratis.
+
+  cfg = get_settings()
+  cfg.performance.workers            # section bertipe, nilai sudah divalidasi
+  cfg.section("rate_limit.yahoo").max_rate
+  cfg.as_dict()                      # deep copy dict mentah (helper lama yang menerima dict)
+
+  get_tickers("indonesia")           # [{"ticker", "name"}, ...]
+  ticker_names("indonesia")          # {ticker: name}
+
+Nilai yang tidak valid (tipe salah, di bawah minimum) -> ConfigError saat load pertama.
+Saat reload, file yang tidak valid tidak menggantikan konfigurasi terakhir yang valid
+(warning), supaya edit setengah jadi tidak menjatuhkan run yang sedang berjalan.
+
+override("rate_limit.yahoo.enabled", False) menimpa nilai untuk proses ini
+(flag CLI, benchmark / simulator), tetap lewat validasi yang sama.
+"""
+import copy
+import json
+import os
+import threading
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+
+SETTINGS_PATH = os.path.join(PROJECT_ROOT, "config", "settings.yaml")
+TICKERS_PATH = os.path.join(PROJECT_ROOT, "config", "tickers.json")
+
+DEFAULT_RELOAD_CHECK_SECONDS = 5.0
+
+BACKENDS = ("postgres", "duckdb")
+# Interval intraday yang dikenal collectors.intraday (INTERVAL_MINUTES)
+INTRADAY_INTERVALS = ("15m", "30m", "60m", "1h")
+
+# Rate controller per provider (collectors.ratelimit); default yang sama untuk semua provider
+RATE_LIMIT_FIELDS = {
+    "enabled": (bool, True, None),
+    "initial_rate": (float, 2.0, 0.01),     # request/detik awal
+    "min_rate": (float, 0.2, 0.01),
+    "max_rate": (float, 20.0, 0.01),
+    "increase": (float, 0.5, 0),            # AIMD: + req/s per detik trafik sukses
+    "decrease": (float, 0.5, 0.01),         # AIMD: rate x faktor ini saat 429/error/lambat
+    "decrease_cooldown": (float, 1.0, 0),
+    "latency_target": (float, 5.0, 0.01),   # detik; lebih lambat = sinyal kongesti
+    "max_retries": (int, 3, 0),
+    "backoff_base": (float, 0.5, 0),
+    "backoff_max": (float, 30.0, 0),
+    "breaker_threshold": (int, 5, 1),       # kegagalan berturut-turut sebelum provider di-pause
+    "breaker_open_seconds": (float, 60.0, 0),
+}
+
+
+# Tipe bersarang section universe / intraday (peta / daftar per tier likuiditas)
+def _tier_key(name: str, key) -> int:
+    # Key YAML bisa int (1:) atau string ("1":)
+    if isinstance(key, bool) or not isinstance(key, (int, str)) or not str(key).isdigit() or int(key) < 1:
+        raise ConfigError(f"{name}: tier must be an integer >= 1, got {key!r}")
+    return int(key)
+
+
+def _tier_mapping(name: str, value) -> dict:
+    if not isinstance(value, dict) or not value:
+        raise ConfigError(f"{name}: expected a non-empty mapping of tier -> value, got {value!r}")
+    return {_tier_key(name, k): v for k, v in value.items()}
+
+
+def _tier_thresholds(name: str, value) -> dict[int, float]:
+    thresholds = {}
+    for tier, v in _tier_mapping(name, value).items():
+        thresholds[tier] = _checked(f"{name}.{tier}", float, v, 0)
+    ordered = [thresholds[t] for t in sorted(thresholds)]
+    if any(a <= b for a, b in zip(ordered, ordered[1:])):
+        raise ConfigError(f"{name}: thresholds must decrease as the tier number grows, got {value!r}")
+    return thresholds
+
+
+def _tier_schedules(name: str, value) -> dict[int, dict[str, int]]:
+    schedules = {}
+    for tier, stages in _tier_mapping(name, value).items():
+        if not isinstance(stages, dict):
+            raise ConfigError(f"{name}.{tier}: expected a mapping of stage -> days, got {stages!r}")
+        schedules[tier] = {str(stage): _checked(f"{name}.{tier}.{stage}", int, days, 1)
+                           for stage, days in stages.items()}
+    return schedules
+
+
+def _tier_list(name: str, value) -> list[int]:
+    if not isinstance(value, list) or not value:
+        raise ConfigError(f"{name}: expected a non-empty list of tiers, got {value!r}")
+    return [_tier_key(name, t) for t in value]
+
+
+# section -> {key: (tipe, default, minimum)}; minimum None = tanpa batas bawah.
+# Tipe boleh fungsi (name, value) -> value untuk struktur bersarang (mis. peta per tier).
+# Default = perilaku lama jika key tidak ada di settings.yaml.
+SCHEMA = {
+    "performance": {
+        "workers": (int, 4, 1),
+        "cpu_workers": (int, 1, 1),
+        "db_workers": (int, 2, 1),
+        "process_workers": (int, 0, 0),
+    },
+    "database": {
+        "max_connections": (int, 15, 1),  # Supabase pooler (free tier) membatasi koneksi per project
+        "pool_timeout": (int, 30, 1),
+        "connect_timeout": (int, 10, 1),
+        "backend": (str, "postgres", None),  # postgres | duckdb (file lokal, batch job berat)
+        "duckdb_path": (str, "data/local/stock_harvester.duckdb", None),
+    },
+    "data_collection": {
+        "years_back": (int, 3, 1),
+        "price_period": (str, "7d", None),
+        "max_headlines": (int, 10, 1),
+        "rss_timeout": (float, 15.0, 1),
+    },
+    "fundamental.quarterly": {
+        "revenue_key": (str, "Total Revenue", None),
+        "net_profit_key": (str, "Net Income", None),
+        "eps_key": (str, "Diluted EPS", None),
+        "assets_key": (str, "Total Assets", None),
+        "liabilities_key": (str, "Total Liabilities Net Minority Interest", None),
+    },
+    "features.technical": {
+        "moving_averages": (list, [20, 50], None),
+        "rsi_period": (int, 14, 2),
+        "macd_fast": (int, 12, 1),
+        "macd_slow": (int, 26, 2),
+        "macd_signal": (int, 9, 1),
+        "bollinger_period": (int, 20, 2),
+        "bollinger_std": (float, 2.0, 0),
+        "volatility_period": (int, 20, 2),
+        "volume_sma_period": (int, 20, 1),
+    },
+    "write_buffer": {
+        "max_rows": (int, 5000, 1),
+        "max_age_seconds": (float, 60.0, 0),
+        "retries": (int, 3, 1),
+    },
+    "work_queue": {
+        "lease_seconds": (int, 900, 1),
+        "max_attempts": (int, 3, 1),
+        "claim_size": (int, None, 1),
+        "cost_history_runs": (int, 5, 1),
+    },
+    "run_ledger": {
+        "checkpoint_size": (int, 25, 1),
+    },
+    "universe": {
+        "enabled": (bool, False, None),
+        "lookback_days": (int, 20, 1),
+        # Ambang median nilai transaksi harian (IDR) -> tier; di bawah ambang terakhir = tier berikutnya
+        "tiers": (_tier_thresholds, {1: 10_000_000_000, 2: 1_000_000_000}, None),
+        # Interval hari per stage per tier (1 = setiap run)
+        "schedules": (_tier_schedules, {
+            1: {"prices": 1, "indicators": 1, "sentiment": 1, "fundamentals": 1},
+            2: {"prices": 1, "indicators": 1, "sentiment": 3, "fundamentals": 7},
+            3: {"prices": 1, "indicators": 1, "sentiment": 7, "fundamentals": 30},
+        }, None),
+    },
+    "intraday": {
+        "enabled": (bool, False, None),
+        "tiers": (_tier_list, [1], None),
+        "intervals": (list, ["60m"], None),
+    },
+    "rate_limit.yahoo": RATE_LIMIT_FIELDS,
+    "rate_limit.rss": RATE_LIMIT_FIELDS,
+    "metadata": {
+        "workers": (int, 4, 1),
+        "max_age_days": (int, 30, 1),
+        "cache_ttl_hours": (float, 24.0, 0),
+    },
+    "price_tail": {
+        "enabled": (bool, True, None),
+        "bars": (int, 250, 100),  # warm-up SMA-50 + konvergensi EMA sebelum 30 baris yang disimpan
+    },
+    "corporate_actions": {
+        "tolerance": (float, 0.005, 0),
+    },
+    "profiling": {
+        "interval_ms": (float, 10.0, 1),
+        "memory": (bool, True, None),
+        "memory_frames": (int, 1, 1),
+        "top_n": (int, 25, 1),
+    },
+    "mirror": {
+        "enabled": (bool, True, None),
+        "compact_min_files": (int, 8, 2),
+    },
+    "config": {
+        "reload_check_seconds": (float, DEFAULT_RELOAD_CHECK_SECONDS, 0),
+    },
+}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _coerce(name: str, typ, value):
+    if not isinstance(typ, type):
+        return typ(name, value)
+    if typ is bool:
+        if not isinstance(value, bool):
+            raise ConfigError(f"{name}: expected true/false, got {value!r}")
+        return value
+    if typ is list:
+        if not isinstance(value, list):
+            raise ConfigError(f"{name}: expected a list, got {value!r}")
+        return list(value)
+    if typ is str:
+        if not isinstance(value, str) or not value:
+            raise ConfigError(f"{name}: expected a non-empty string, got {value!r}")
+        return value
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ConfigError(f"{name}: expected a number, got {value!r}")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ConfigError(f"{name}: expected a number, got {value!r}") from None
+    if typ is int:
+        if number != int(number):
+            raise ConfigError(f"{name}: expected an integer, got {value!r}")
+        return int(number)
+    return number
+
+
+def _checked(name: str, typ, value, minimum):
+    value = _coerce(name, typ, value)
+    if minimum is not None and value < minimum:
+        raise ConfigError(f"{name}: must be >= {minimum}, got {value!r}")
+    return value
+
+
+def _section_dict(raw: dict, path: str) -> dict:
+    node = raw
+    for part in path.split("."):
+        node = node.get(part) if isinstance(node, dict) else None
+        if node is None:
+            return {}
+    if not isinstance(node, dict):
+        raise ConfigError(f"{path}: expected a mapping, got {node!r}")
+    return node
+
+
+def _set_path(raw: dict, path: str, value):
+    parts = path.split(".")
+    node = raw
+    for part in parts[:-1]:
+        if not isinstance(node.get(part), dict):
+            node[part] = {}
+        node = node[part]
+    node[parts[-1]] = value
+
+
+class Section:
+    """Akses atribut ke satu section yang sudah divalidasi (read-only by convention)."""
+
+    def __init__(self, path: str, values: dict):
+        self._path = path
+        self.__dict__.update(values)
+
+    def as_dict(self) -> dict:
+        return {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+
+    def __repr__(self):
+        return f"Section({self._path}, {self.as_dict()})"
+
+
+class Settings:
+    """
+    settings.yaml yang sudah divalidasi. Section di SCHEMA tersedia sebagai atribut
+    (nama daun path: features.technical -> .technical); nilai ternormalisasi juga ditulis
+    balik ke .raw, sehingga helper lama berbasis dict membaca angka yang sama.
+    Section lain (paths, logging) tetap lewat .raw / helper masing-masing.
+    """
+
+    def __init__(self, raw: dict):
+        if not isinstance(raw, dict):
+            raise ConfigError("settings.yaml: top level must be a mapping")
+        self.raw = raw
+        self._sections = {}
+        errors = []
+        for path, fields in SCHEMA.items():
+            try:
+                given = _section_dict(raw, path)
+            except ConfigError as e:
+                errors.append(str(e))
+                given = {}
+            values = {}
+            for key, (typ, default, minimum) in fields.items():
+                value = given.get(key, default)
+                name = f"{path}.{key}"
+                try:
+                    if value is not None:
+                        value = _checked(name, typ, value, minimum)
+                except ConfigError as e:
+                    errors.append(str(e))
+                    value = default
+                values[key] = value
+            # None (mis. work_queue.claim_size) = "pakai fallback pemanggil": tidak ditulis balik
+            _set_path(raw, path, {**given, **{k: v for k, v in values.items() if v is not None}})
+            self._sections[path] = Section(path, values)
+            setattr(self, path.split(".")[-1], self._sections[path])
+
+        errors += self._check_consistency()
+        if errors:
+            raise ConfigError("; ".join(errors))
+
+    def _check_consistency(self) -> list[str]:
+        errors = []
+        tech = self.technical
+        # Kolom sma_20 / sma_50 di technical_indicators: periode lain butuh kolom baru
+        if not {20, 50} <= set(tech.moving_averages):
+            errors.append(f"features.technical.moving_averages: must include 20 and 50 "
+                          f"(sma_20/sma_50 columns), got {tech.moving_averages!r}")
+        if self.database.backend not in BACKENDS:
+            errors.append(f"database.backend: must be one of {BACKENDS}, got {self.database.backend!r}")
+        if tech.macd_fast >= tech.macd_slow:
+            errors.append("features.technical: macd_fast must be < macd_slow")
+        for path in ("rate_limit.yahoo", "rate_limit.rss"):
+            rl = self._sections[path]
+            if rl.min_rate > rl.max_rate:
+                errors.append(f"{path}: min_rate must be <= max_rate")
+            if rl.decrease >= 1:
+                errors.append(f"{path}: decrease must be < 1")
+        unknown = [i for i in self.intraday.intervals if i not in INTRADAY_INTERVALS]
+        if unknown:
+            errors.append(f"intraday.intervals: must be among {INTRADAY_INTERVALS}, got {unknown!r}")
+        return errors
+
+    def section(self, path: str) -> Section:
+        """Section berdasarkan path lengkap, mis. section("rate_limit.yahoo")."""
+        return self._sections[path]
+
+    def as_dict(self) -> dict:
+        """Deep copy dict mentah: aman dimodifikasi pemanggil (mis. override CLI)."""
+        return copy.deepcopy(self.raw)
+
+
+# TICKERS
+
+class TickerRegistry:
+    """tickers.json tervalidasi: region -> [{"ticker", "name"}] (entri string dinormalisasi)."""
+
+    def __init__(self, raw: dict):
+        if not isinstance(raw, dict):
+            raise ConfigError("tickers.json: top level must be an object of region -> list")
+        self.regions = {}
+        errors = []
+        for region, entries in raw.items():
+            if not isinstance(entries, list):
+                errors.append(f"tickers.json[{region}]: expected a list")
+                continue
+            seen, items = set(), []
+            for i, entry in enumerate(entries):
+                if isinstance(entry, str):
+                    entry = {"ticker": entry, "name": entry.split(".")[0]}
+                ticker = entry.get("ticker") if isinstance(entry, dict) else None
+                if not isinstance(ticker, str) or not ticker:
+                    errors.append(f"tickers.json[{region}][{i}]: missing 'ticker'")
+                    continue
+                if ticker in seen:
+                    errors.append(f"tickers.json[{region}]: duplicate ticker {ticker}")
+                    continue
+                seen.add(ticker)
+                items.append({**entry, "name": entry.get("name") or ticker.split(".")[0]})
+            self.regions[region] = items
+        if errors:
+            raise ConfigError("; ".join(errors))
+        self._names = {r: {t["ticker"]: t["name"] for t in items} for r, items in self.regions.items()}
+
+    def get(self, region: str) -> list[dict]:
+        return [dict(t) for t in self.regions.get(region, [])]
+
+    def names(self, region: str) -> dict[str, str]:
+        return self._names.get(region, {})
+
+
+# CACHE
+
+class _CachedFile:
+    """Hasil parse satu file, di-parse ulang hanya jika mtime berubah."""
+
+    def __init__(self, path: str, parse, label: str):
+        self.path = path
+        self.parse = parse
+        self.label = label
+        self._lock = threading.Lock()
+        self._value = None
+        self._mtime = None
+        self._checked = 0.0
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get(self, check_seconds: float):
+        value = self._value
+        if value is not None and time.monotonic() - self._checked < check_seconds:
+            return value
+        with self._lock:
+            mtime = self._stat()
+            if self._value is None or mtime != self._mtime:
+                try:
+                    self._value = self.parse(self.path if mtime is not None else None)
+                    if self._mtime is not None:
+                        print(f"[CONFIG] {self.label} changed on disk, reloaded")
+                except (ConfigError, OSError, ValueError) as e:
+                    if self._value is None:
+                        raise
+                    print(f"[CONFIG] {self.label} reload rejected, keeping previous: {e}")
+                self._mtime = mtime
+            self._checked = time.monotonic()
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._mtime = None
+
+
+_overrides = {}
+
+
+def _parse_settings(path: str | None) -> Settings:
+    raw = {}
+    if path is not None:
+        import yaml
+        with open(path, "r") as f:
+            raw = yaml.safe_load(f) or {}
+    for key, value in _overrides.items():
+        _set_path(raw, key, value)
+    return Settings(raw)
+
+
+def _parse_tickers(path: str | None) -> TickerRegistry:
+    if path is None:
+        raise FileNotFoundError(f"{TICKERS_PATH} not found")
+    with open(path, "r") as f:
+        return TickerRegistry(json.load(f))
+
+
+_settings_file = _CachedFile(SETTINGS_PATH, _parse_settings, "settings.yaml")
+_tickers_file = _CachedFile(TICKERS_PATH, _parse_tickers, "tickers.json")
+
+
+def _check_seconds() -> float:
+    current = _settings_file._value
+    return current.config.reload_check_seconds if current is not None else 0.0
+
+
+def get_settings() -> Settings:
+    return _settings_file.get(_check_seconds())
+
+
+def get_ticker_registry() -> TickerRegistry:
+    return _tickers_file.get(_check_seconds())
+
+
+def get_tickers(region: str = "indonesia") -> list[dict]:
+    return get_ticker_registry().get(region)
+
+
+def ticker_names(region: str = "indonesia") -> dict[str, str]:
+    return get_ticker_registry().names(region)
+
+
+def override(path: str, value):
+    """Timpa satu nilai (mis. "rate_limit.yahoo.enabled") untuk proses ini."""
+    previous = _overrides.get(path)
+    _overrides[path] = value
+    _settings_file.invalidate()
+    try:
+        get_settings()
+    except ConfigError:
+        if previous is None:
+            _overrides.pop(path)
+        else:
+            _overrides[path] = previous
+        _settings_file.invalidate()
+        raise
+
+
+def clear_overrides():
+    _overrides.clear()
+    _settings_file.invalidate()
+
+
+if __name__ == "__main__":
+    cfg = get_settings()
+    for path in SCHEMA:
+        print(f"{path}: {getattr(cfg, path.split('.')[-1]).as_dict()}")
+    registry = get_ticker_registry()
+    print("tickers: " + ", ".join(f"{r}={len(items)}" for r, items in registry.regions.items()))
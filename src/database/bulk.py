@@ -0,0 +1,135 @@
+import math
+
+import pandas as pd
+from sqlalchemy import text
+
+# pg8000 membatasi jumlah parameter per statement (int16)
+MAX_PARAMS = 32767
+
+
+def _clean(value):
+    """NaN/NaT -> None dan numpy scalar -> python scalar (pg8000 tidak kenal numpy)."""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def frame_to_rows(df: pd.DataFrame, columns: list[str]) -> list[dict]:
+    """Konversi DataFrame ke list dict yang aman untuk driver, tanpa iterrows."""
+    records = df[columns].to_dict("records")
+    return [{k: _clean(v) for k, v in r.items()} for r in records]
+
+
+def bulk_upsert(conn, table: str, rows: list[dict], conflict_cols: list[str],
+                update_cols: list[str] | None = None, coalesce: bool = False,
+                extra_set: str | None = None, update_where: str | None = None) -> int:
+    """
+    Multi-row INSERT ... ON CONFLICT dalam satu statement per chunk.
+
+    - update_cols None  -> ON CONFLICT DO NOTHING
+    - coalesce=True     -> nilai NULL tidak menimpa nilai lama
+    - extra_set         -> potongan SET tambahan (mis. "updated_at = NOW()")
+    - update_where      -> DO UPDATE hanya untuk baris lama yang memenuhi kondisi (sisanya DO NOTHING)
+    """
+    if not rows:
+        return 0
+
+    columns = list(rows[0].keys())
+
+    # Dedup berdasarkan conflict key (baris terakhir menang), karena Postgres menolak
+    # ON CONFLICT DO UPDATE yang menyentuh baris yang sama dua kali dalam satu statement.
+    deduped = {}
+    for r in rows:
+        deduped[tuple(r[c] for c in conflict_cols)] = r
+    rows = list(deduped.values())
+
+    if update_cols is None:
+        conflict_sql = f"ON CONFLICT ({', '.join(conflict_cols)}) DO NOTHING"
+    else:
+        if coalesce:
+            sets = [f"{c} = COALESCE(EXCLUDED.{c}, {table}.{c})" for c in update_cols]
+        else:
+            sets = [f"{c} = EXCLUDED.{c}" for c in update_cols]
+        if extra_set:
+            sets.append(extra_set)
+        conflict_sql = f"ON CONFLICT ({', '.join(conflict_cols)}) DO UPDATE SET {', '.join(sets)}"
+        if update_where:
+            conflict_sql += f" WHERE {update_where}"
+
+    chunk_size = max(1, min(1000, math.floor(MAX_PARAMS / len(columns))))
+    written = 0
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        values_sql = []
+        params = {}
+        for i, r in enumerate(chunk):
+            placeholders = []
+            for j, c in enumerate(columns):
+                key = f"p{i}_{j}"
+                placeholders.append(f":{key}")
+                params[key] = r[c]
+            values_sql.append(f"({', '.join(placeholders)})")
+
+        conn.execute(
+            text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join(values_sql)} {conflict_sql}"),
+            params
+        )
+        written += len(chunk)
+
+    return written
+
+
+def bulk_update(conn, table: str, rows: list[dict], key_cols: list[str], update_cols: list[str],
+                coalesce: bool = False, extra_set: str | None = None, types: dict | None = None) -> int:
+    """
+    UPDATE ... FROM (VALUES ...) dalam satu statement per chunk (baris yang belum ada
+    tidak dibuat). Return jumlah baris tabel yang ter-update.
+
+    - coalesce=True -> nilai NULL tidak menimpa nilai lama
+    - types         -> {kolom: tipe SQL} untuk CAST placeholder (default: tipe literal)
+    """
+    if not rows:
+        return 0
+
+    types = types or {}
+    columns = key_cols + update_cols
+    if coalesce:
+        sets = [f"{c} = COALESCE(v.{c}, {table}.{c})" for c in update_cols]
+    else:
+        sets = [f"{c} = v.{c}" for c in update_cols]
+    if extra_set:
+        sets.append(extra_set)
+    where = " AND ".join(f"{table}.{c} = v.{c}" for c in key_cols)
+
+    chunk_size = max(1, min(1000, math.floor(MAX_PARAMS / len(columns))))
+    updated = 0
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        values_sql = []
+        params = {}
+        for i, r in enumerate(chunk):
+            placeholders = []
+            for j, c in enumerate(columns):
+                key = f"p{i}_{j}"
+                placeholders.append(f"CAST(:{key} AS {types[c]})" if c in types else f":{key}")
+                params[key] = r[c]
+            values_sql.append(f"({', '.join(placeholders)})")
+
+        n = conn.execute(
+            text(f"UPDATE {table} SET {', '.join(sets)} "
+                 f"FROM (VALUES {', '.join(values_sql)}) AS v ({', '.join(columns)}) WHERE {where}"),
+            params
+        ).rowcount
+        # DuckDB tidak melaporkan rowcount (-1): anggap semua baris chunk cocok
+        updated += n if n >= 0 else len(chunk)
+
+    return updated
@@ -1,15 +1,24 @@
 import os
-from sqlalchemy import create_engine, text
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 
+from src.config import BACKENDS, get_settings
+from src.monitoring.metrics import RUN_METRICS
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
 
-# LOAD 
+
+# LOAD
 
 try:
     load_dotenv()
-    print(".env file loaded successfully")
 except Exception as e:
     print(f"Warning: Could not load .env file: {e}")
     print("   Using default/empty environment variables")
@@ -19,15 +28,9 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "stock_prediction_db")
-
-print("\n" + "=" * 50)
-print("DATABASE CONFIGURATION")
-print("=" * 50)
-print(f"   Host: {DB_HOST}:{DB_PORT}")
-print(f"   Database: {DB_NAME}")
-print(f"   User: {DB_USER}")
-print(f"   Password: {'*' * len(DB_PASSWORD) if DB_PASSWORD else 'NOT SET'}")
-print("=" * 50)
+# Override database.backend dari settings.yaml (mis. DB_BACKEND=duckdb untuk satu job lokal)
+DB_BACKEND = os.getenv("DB_BACKEND", "")
+_forced_backend = None
 
 
 #  URL
@@ -36,40 +39,257 @@ DATABASE_URL = (
     f"@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
+# POOL METRICS
 
-#CREATE ENGINE 
-engine = None
-SessionLocal = None
+class PoolMetrics:
+    """Counter sederhana (thread-safe) untuk tuning pool terhadap limit koneksi Supabase."""
 
-try:
-    print("Creating database engine...")
-    engine = create_engine(
-        DATABASE_URL,
-        echo=False,
-        poolclass=QueuePool,
-        pool_size=5,
-        max_overflow=10,
-        pool_pre_ping=True,
-        pool_recycle=3600,
-        connect_args={
-            "timeout": 10,
-        },
-    )
-
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.waits = 0
+            self.wait_seconds = 0.0
+            self.round_trips = 0
+
+    def incr(self, name: str, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 4),
+                "round_trips": self.round_trips,
+            }
+
+
+POOL_METRICS = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool yang mencatat checkout yang harus menunggu karena pool penuh."""
+
+    def _do_get(self):
+        exhausted = self.checkedin() == 0 and self.overflow() >= self._max_overflow
+        start = time.perf_counter()
+        conn = super()._do_get()
+        if exhausted:
+            POOL_METRICS.incr("waits")
+            POOL_METRICS.incr("wait_seconds", time.perf_counter() - start)
+        return conn
+
+
+# CONFIG
+
+def _load_pool_settings() -> dict:
+    """Ukuran pool mengikuti jumlah worker yang dikonfigurasi, dibatasi max_connections."""
+    cfg = get_settings()
+    workers = cfg.performance.workers
+    max_connections = cfg.database.max_connections
+
+    # 1 koneksi per worker + 1 untuk thread utama; overflow menampung burst (flush, DDL)
+    pool_size = max(1, min(workers + 1, max_connections))
+    max_overflow = max(0, min(workers, max_connections - pool_size))
+
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": cfg.database.pool_timeout,
+        "connect_timeout": cfg.database.connect_timeout,
+    }
+
+
+def set_backend(name: str | None):
+    """Paksa backend untuk proses ini (flag CLI --backend); None = env / settings.yaml."""
+    global _forced_backend
+    if name is not None and name not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {name!r}")
+    _forced_backend = name
+
+
+def backend() -> str:
+    """'postgres' atau 'duckdb': set_backend(), env DB_BACKEND, lalu database.backend di settings.yaml."""
+    name = _forced_backend or DB_BACKEND or get_settings().database.backend
+    if name not in BACKENDS:
+        raise ValueError(f"DB_BACKEND must be one of {BACKENDS}, got {name!r}")
+    return name
+
+
+def duckdb_path() -> str:
+    path = get_settings().database.duckdb_path
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+def is_duckdb(engine=None) -> bool:
+    return (engine or get_db_engine()).dialect.name == "duckdb"
+
+
+def describe_config():
+    pool = _load_pool_settings()
+    print("\n" + "=" * 50)
+    print("DATABASE CONFIGURATION")
+    print("=" * 50)
+    if backend() == "duckdb":
+        print(f"   Backend: duckdb ({duckdb_path()})")
+        print(f"   Pool: size={pool['pool_size']}, overflow={pool['max_overflow']}")
+        print("=" * 50)
+        return
+    print(f"   Host: {DB_HOST}:{DB_PORT}")
+    print(f"   Database: {DB_NAME}")
+    print(f"   User: {DB_USER}")
+    print(f"   Password: {'*' * len(DB_PASSWORD) if DB_PASSWORD else 'NOT SET'}")
+    print(f"   Pool: size={pool['pool_size']}, overflow={pool['max_overflow']}")
+    print("=" * 50)
+
+
+# LAZY ENGINE
+
+_engine = None
+_session_factory = None
+_init_lock = threading.Lock()
+
+
+def _attach_metrics(eng):
+    @event.listens_for(eng, "connect")
+    def _on_connect(dbapi_conn, conn_record):
+        POOL_METRICS.incr("connects")
+
+    @event.listens_for(eng, "checkout")
+    def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+        POOL_METRICS.incr("checkouts")
+
+    @event.listens_for(eng, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        # pg8000 menjalankan executemany sebagai satu round trip per parameter set
+        trips = len(parameters) if executemany and parameters else 1
+        POOL_METRICS.incr("round_trips", trips)
+        RUN_METRICS.incr("db_round_trips", trips)
+
+
+def create_backend_engine(name: str):
+    """
+    Engine baru (pool + metrik) untuk backend `name`, terlepas dari backend aktif.
+    Dipakai langsung oleh src.database.sync, yang butuh DuckDB dan Postgres sekaligus.
+    """
+    pool = _load_pool_settings()
+    if name == "duckdb":
+        try:
+            import duckdb_engine  # noqa: F401  (dialect SQLAlchemy "duckdb://")
+        except ImportError:
+            raise ConnectionError(
+                "database.backend=duckdb requires the duckdb and duckdb-engine packages "
+                "(pip install -r requirements.txt)"
+            ) from None
+        path = duckdb_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        url, connect_args = f"duckdb:///{path}", {}
+    else:
+        url, connect_args = DATABASE_URL, {"timeout": pool["connect_timeout"]}
+    try:
+        eng = create_engine(
+            url,
+            echo=False,
+            poolclass=MeteredQueuePool,
+            pool_size=pool["pool_size"],
+            max_overflow=pool["max_overflow"],
+            pool_timeout=pool["pool_timeout"],
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            connect_args=connect_args,
+        )
+    except Exception as e:
+        raise ConnectionError(f"Database engine creation failed: {e}") from e
+    _attach_metrics(eng)
+    return eng
+
+
+def get_db_engine():
+    """Engine dibuat saat pertama kali dibutuhkan (bukan saat import)."""
+    global _engine, _session_factory
+    if _engine is not None:
+        return _engine
+
+    with _init_lock:
+        if _engine is None:
+            eng = create_backend_engine(backend())
+            if eng.dialect.name == "duckdb":
+                # File lokal bisa baru dibuat: schema langsung disiapkan (murah, tanpa lock)
+                from src.database.schema import migrate
+                migrate(eng)
+            _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=eng)
+            _engine = eng
+
+    return _engine
+
+
+def dispose_engine():
+    """Tutup semua koneksi pool (mis. setelah fork atau di akhir run)."""
+    global _engine, _session_factory
+    with _init_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_factory = None
+
+
+def __getattr__(name):
+    # Kompatibilitas: `from src.database.connection import engine` tetap jalan,
+    # tapi engine baru dibuat saat atribut itu benar-benar diakses.
+    if name == "engine":
+        return get_db_engine()
+    if name == "SessionLocal":
+        get_db_engine()
+        return _session_factory
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# STATEMENT CACHE
+
+_statements = {}
+_statements_lock = threading.Lock()
+
+
+def statement(name: str, sql: str):
+    """
+    text() bernama untuk upsert yang sering dipakai: parsing bind param text() dilakukan
+    sekali per proses, bukan setiap ticker. Bukan prepared statement server-side -- pg8000
+    mengeksekusi setiap statement sebagai unnamed (executemany = loop execute), jadi
+    penghematan round trip datang dari batching (bulk_upsert), bukan dari sini.
+    """
+    stmt = _statements.get(name)
+    if stmt is not None:
+        return stmt
+    with _statements_lock:
+        return _statements.setdefault(name, text(sql))
+
+
+def pool_metrics() -> dict:
+    """Snapshot counter + kondisi pool saat ini."""
+    data = POOL_METRICS.snapshot()
+    if _engine is not None:
+        p = _engine.pool
+        data.update({
+            "pool_size": p.size(),
+            "checked_out": p.checkedout(),
+            "overflow": p.overflow(),
+        })
+    return data
 
-except Exception as e:
-    print(f"\nCRITICAL: Database engine creation failed: {e}")
-    engine = None
-    SessionLocal = None
 
 def verify_db_connection():
     """Verify connection without crashing the app."""
-    if engine is None:
-        return False
     try:
+        eng = get_db_engine()
         print("Testing database connection...")
-        with engine.connect() as conn:
+        with eng.connect() as conn:
             conn.execute(text("SELECT 1"))
         print("Database connection successful!")
         return True
@@ -79,23 +299,22 @@ def verify_db_connection():
 
 
 # 5. PUBLIC API
+@contextmanager
 def get_db():
-    if SessionLocal is None:
-        raise ConnectionError("Database not connected.")
-    db = SessionLocal()
+    """Session ORM; ditutup setelah blok `with` selesai (bukan sebelum dipakai)."""
+    get_db_engine()
+    db = _session_factory()
     try:
-        return db
+        yield db
     finally:
         db.close()
 
 
 #TEST
 def test_connection():
-    if engine is None:
-        print("Engine not initialized")
-        return False
+    describe_config()
     try:
-        with engine.connect() as conn:
+        with get_db_engine().connect() as conn:
             version = conn.execute(text("SELECT version()")).fetchone()[0]
             print("Connected:", version.split(",")[0])
         return True
@@ -105,9 +324,7 @@ def test_connection():
 
 def get_db_connection():
     """Returns a raw DBAPI connection (pg8000) for direct cursor usage."""
-    if engine is None:
-        raise ConnectionError("Database engine not initialized.")
-    return engine.raw_connection()
+    return get_db_engine().raw_connection()
 
 
 if __name__ == "__main__":
@@ -1,136 +1,562 @@
+import re
+from datetime import date
+
 from sqlalchemy import text
 
-TABLES = [
-    """
-    CREATE TABLE IF NOT EXISTS stocks (
-        id SERIAL PRIMARY KEY,
-        ticker VARCHAR(20) UNIQUE NOT NULL,
-        company_name VARCHAR(255),
-        sector VARCHAR(100),
-        industry VARCHAR(100),
-        currency VARCHAR(10) DEFAULT 'IDR',
-        is_active BOOLEAN DEFAULT TRUE,
-        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-    );
-    """,
+# DECLARED SCHEMA
+# (kolom, tipe, modifier). Ini satu-satunya sumber kebenaran: DDL CREATE TABLE
+# dan diff migrasi sama-sama diturunkan dari sini.
+SCHEMA = {
+    "stocks": {
+        "columns": [
+            ("id", "SERIAL", "PRIMARY KEY"),
+            ("ticker", "VARCHAR(20)", "UNIQUE NOT NULL"),
+            ("company_name", "VARCHAR(255)", ""),
+            ("sector", "VARCHAR(100)", ""),
+            ("industry", "VARCHAR(100)", ""),
+            ("currency", "VARCHAR(10)", "DEFAULT 'IDR'"),
+            ("is_active", "BOOLEAN", "DEFAULT TRUE"),
+            ("created_at", "TIMESTAMP WITH TIME ZONE", "DEFAULT CURRENT_TIMESTAMP"),
+            # NULL = metadata (nama/sektor/industri) belum pernah diambil dari Yahoo
+            ("metadata_updated_at", "TIMESTAMP WITH TIME ZONE", ""),
+        ],
+        "constraints": [],
+    },
+    "technical_prices": {
+        "columns": [
+            ("stock_id", "INTEGER", "NOT NULL REFERENCES stocks(id) ON DELETE CASCADE"),
+            ("date", "DATE", "NOT NULL"),
+            ("open", "DOUBLE PRECISION", ""),
+            ("high", "DOUBLE PRECISION", ""),
+            ("low", "DOUBLE PRECISION", ""),
+            ("close", "DOUBLE PRECISION", "NOT NULL"),
+            ("adj_close", "DOUBLE PRECISION", ""),
+            ("volume", "BIGINT", ""),
+            ("data_source", "VARCHAR(50)", ""),
+        ],
+        # Tanpa surrogate id: key natural (stock_id, date) wajib memuat kolom partisi
+        "constraints": ["CONSTRAINT technical_prices_pk PRIMARY KEY (stock_id, date)"],
+        "partition_by": "date",
+        "indexes": [
+            # BRIN: sangat kecil, efektif karena data masuk berurutan per tanggal
+            "CREATE INDEX IF NOT EXISTS ix_technical_prices_date_brin ON technical_prices USING BRIN (date)",
+            # Covering index untuk pola baca (stock_id, date) -> index-only scan di update_indicators
+            "CREATE INDEX IF NOT EXISTS ix_technical_prices_stock_date_cover ON technical_prices (stock_id, date) "
+            "INCLUDE (open, high, low, close, adj_close, volume)",
+        ],
+    },
+    "technical_indicators": {
+        "columns": [
+            ("stock_id", "INTEGER", "NOT NULL REFERENCES stocks(id) ON DELETE CASCADE"),
+            ("date", "DATE", "NOT NULL"),
+            ("rsi", "DOUBLE PRECISION", ""),
+            ("macd", "DOUBLE PRECISION", ""),
+            ("macd_signal", "DOUBLE PRECISION", ""),
+            ("sma_20", "DOUBLE PRECISION", ""),
+            ("sma_50", "DOUBLE PRECISION", ""),
+            ("ema_20", "DOUBLE PRECISION", ""),
+            ("bb_upper", "DOUBLE PRECISION", ""),
+            ("bb_lower", "DOUBLE PRECISION", ""),
+            ("bb_middle", "DOUBLE PRECISION", ""),
+            ("daily_return", "DOUBLE PRECISION", ""),
+            ("volatility_20", "DOUBLE PRECISION", ""),
+            ("volume_sma_20", "DOUBLE PRECISION", ""),
+            ("volume_ratio", "DOUBLE PRECISION", ""),
+            ("atr_14", "DOUBLE PRECISION", ""),
+            ("stoch_rsi", "DOUBLE PRECISION", ""),
+            ("updated_at", "TIMESTAMP WITH TIME ZONE", "DEFAULT CURRENT_TIMESTAMP"),
+        ],
+        "constraints": ["CONSTRAINT technical_indicators_pk PRIMARY KEY (stock_id, date)"],
+        "partition_by": "date",
+        "indexes": [
+            "CREATE INDEX IF NOT EXISTS ix_technical_indicators_date_brin ON technical_indicators USING BRIN (date)",
+        ],
+    },
+    # Bar intraday (15m/60m) untuk ticker paling likuid: 10-30x volume baris harian.
+    # Tipe sempit (REAL, SMALLINT, tanpa data_source) -> baris ~50 byte, bukan ~90
+    "intraday_prices": {
+        "columns": [
+            ("stock_id", "INTEGER", "NOT NULL REFERENCES stocks(id) ON DELETE CASCADE"),
+            ("ts", "TIMESTAMP WITH TIME ZONE", "NOT NULL"),  # waktu mulai bar
+            ("interval_min", "SMALLINT", "NOT NULL"),
+            ("open", "REAL", ""),
+            ("high", "REAL", ""),
+            ("low", "REAL", ""),
+            ("close", "REAL", "NOT NULL"),
+            ("volume", "BIGINT", ""),
+        ],
+        # Key (stock_id, ts) + interval: bar 15m dan 60m berbagi timestamp di awal jam
+        "constraints": ["CONSTRAINT intraday_prices_pk PRIMARY KEY (stock_id, ts, interval_min)"],
+        "partition_by": "ts",
+        # Yahoo hanya menyimpan ~730 hari bar 60m (15m: 60 hari) -> tidak perlu partisi sejak 2010
+        "partition_start_year": 2024,
+        "indexes": [
+            "CREATE INDEX IF NOT EXISTS ix_intraday_prices_ts_brin ON intraday_prices USING BRIN (ts)",
+        ],
+    },
+    "macro_economic": {
+        "columns": [
+            ("date", "DATE", "PRIMARY KEY"),
+            ("usd_idr", "DOUBLE PRECISION", ""),
+            ("ihsg", "DOUBLE PRECISION", ""),
+            ("gold_price", "DOUBLE PRECISION", ""),
+            ("oil_price", "DOUBLE PRECISION", ""),
+            ("macro_sentiment_score", "DOUBLE PRECISION", "DEFAULT 0"),
+            ("created_at", "TIMESTAMP WITH TIME ZONE", "DEFAULT CURRENT_TIMESTAMP"),
+        ],
+        "constraints": [],
+    },
+    "news_sentiment": {
+        "columns": [
+            ("id", "SERIAL", "PRIMARY KEY"),
+            ("stock_id", "INTEGER", "REFERENCES stocks(id) ON DELETE CASCADE"),
+            ("date", "DATE", "NOT NULL"),
+            ("sentiment_score", "DOUBLE PRECISION", ""),
+            ("news_count", "INTEGER", ""),
+        ],
+        "constraints": ["UNIQUE(stock_id, date)"],
+    },
+    "fundamental_quarterly": {
+        "columns": [
+            ("id", "SERIAL", "PRIMARY KEY"),
+            ("stock_id", "INTEGER", "REFERENCES stocks(id) ON DELETE CASCADE"),
+            ("ticker", "VARCHAR(20)", ""),
+            ("year", "INTEGER", "NOT NULL"),
+            ("quarter", "VARCHAR(10)", "NOT NULL"),
+            ("report_date", "DATE", "NOT NULL"),
+            ("revenue", "BIGINT", ""),
+            ("net_profit", "BIGINT", ""),
+            ("eps", "DOUBLE PRECISION", ""),
+            ("total_assets", "BIGINT", ""),
+            ("total_liabilities", "BIGINT", ""),
+            ("total_equity", "BIGINT", ""),
+            ("roe", "DOUBLE PRECISION", ""),
+            ("data_source", "VARCHAR(50)", ""),
+            ("updated_at", "TIMESTAMP WITH TIME ZONE", "DEFAULT CURRENT_TIMESTAMP"),
+        ],
+        "constraints": ["UNIQUE(stock_id, year, quarter)"],
+    },
+    # Antrean kerja harian: runner shard meng-claim ticker (FOR UPDATE SKIP LOCKED)
+    "work_queue": {
+        "columns": [
+            ("run_date", "DATE", "NOT NULL"),
+            ("ticker", "VARCHAR(20)", "NOT NULL"),
+            ("status", "VARCHAR(16)", "NOT NULL DEFAULT 'pending'"),  # pending | claimed | done | failed
+            ("est_cost", "DOUBLE PRECISION", "DEFAULT 1"),
+            ("claimed_by", "VARCHAR(100)", ""),
+            ("lease_until", "TIMESTAMP WITH TIME ZONE", ""),
+            ("attempts", "INTEGER", "DEFAULT 0"),
+            ("duration", "DOUBLE PRECISION", ""),
+            ("error", "TEXT", ""),
+            ("started_at", "TIMESTAMP WITH TIME ZONE", ""),
+            ("finished_at", "TIMESTAMP WITH TIME ZONE", ""),
+            ("session_id", "VARCHAR(100)", ""),  # run yang men-seed baris ini (reset FRESH)
+        ],
+        "constraints": ["CONSTRAINT work_queue_pk PRIMARY KEY (run_date, ticker)"],
+        "indexes": [
+            "CREATE INDEX IF NOT EXISTS ix_work_queue_claim ON work_queue (run_date, status, est_cost DESC)",
+        ],
+    },
+    # Checkpoint per (hari, ticker, stage): dasar --resume / --retry-failed
+    "run_ledger": {
+        "columns": [
+            ("run_date", "DATE", "NOT NULL"),
+            ("ticker", "VARCHAR(20)", "NOT NULL"),  # '*' untuk stage global (makro)
+            ("stage", "VARCHAR(32)", "NOT NULL"),
+            ("status", "VARCHAR(16)", "NOT NULL"),  # ok | failed | skipped
+            ("duration", "DOUBLE PRECISION", ""),
+            ("rows", "INTEGER", ""),
+            ("attempts", "INTEGER", "DEFAULT 1"),
+            ("error", "TEXT", ""),
+            ("updated_at", "TIMESTAMP WITH TIME ZONE", "DEFAULT CURRENT_TIMESTAMP"),
+        ],
+        "constraints": ["CONSTRAINT run_ledger_pk PRIMARY KEY (run_date, ticker, stage)"],
+    },
+    # Event split / dividen yang sudah ditangani (agar event yang sama tidak memicu rewrite tiap hari)
+    "corporate_actions": {
+        "columns": [
+            ("stock_id", "INTEGER", "NOT NULL REFERENCES stocks(id) ON DELETE CASCADE"),
+            ("date", "DATE", "NOT NULL"),
+            ("kind", "VARCHAR(16)", "NOT NULL"),  # split | dividend | mismatch
+            ("value", "DOUBLE PRECISION", ""),    # rasio split / nominal dividen / deviasi relatif
+            ("detected_at", "TIMESTAMP WITH TIME ZONE", "DEFAULT CURRENT_TIMESTAMP"),
+        ],
+        "constraints": ["CONSTRAINT corporate_actions_pk PRIMARY KEY (stock_id, date, kind)"],
+    },
+    # Penanda: histori harga ditulis ulang -> indikator sejak `since` harus dihitung ulang penuh
+    "indicator_recompute": {
+        "columns": [
+            ("stock_id", "INTEGER", "PRIMARY KEY REFERENCES stocks(id) ON DELETE CASCADE"),
+            ("since", "DATE", "NOT NULL"),
+            ("reason", "VARCHAR(100)", ""),
+            ("requested_at", "TIMESTAMP WITH TIME ZONE", "DEFAULT CURRENT_TIMESTAMP"),
+        ],
+        "constraints": [],
+    },
+    # Read path aplikasi: state terbaru per saham (harga + indikator + sentimen + fundamental)
+    # dalam satu baris. Di-refresh inkremental oleh src.database.snapshot di akhir setiap
+    # batch, hanya untuk ticker yang berubah.
+    "stock_latest_snapshot": {
+        "columns": [
+            ("stock_id", "INTEGER", "PRIMARY KEY REFERENCES stocks(id) ON DELETE CASCADE"),
+            ("ticker", "VARCHAR(20)", "NOT NULL"),
+            ("company_name", "VARCHAR(255)", ""),
+            ("sector", "VARCHAR(100)", ""),
+            ("price_date", "DATE", ""),
+            ("open", "DOUBLE PRECISION", ""),
+            ("high", "DOUBLE PRECISION", ""),
+            ("low", "DOUBLE PRECISION", ""),
+            ("close", "DOUBLE PRECISION", ""),
+            ("adj_close", "DOUBLE PRECISION", ""),
+            ("volume", "BIGINT", ""),
+            ("prev_close", "DOUBLE PRECISION", ""),
+            ("change_pct", "DOUBLE PRECISION", ""),
+            ("indicator_date", "DATE", ""),
+            ("rsi", "DOUBLE PRECISION", ""),
+            ("macd", "DOUBLE PRECISION", ""),
+            ("macd_signal", "DOUBLE PRECISION", ""),
+            ("sma_20", "DOUBLE PRECISION", ""),
+            ("sma_50", "DOUBLE PRECISION", ""),
+            ("ema_20", "DOUBLE PRECISION", ""),
+            ("bb_upper", "DOUBLE PRECISION", ""),
+            ("bb_lower", "DOUBLE PRECISION", ""),
+            ("bb_middle", "DOUBLE PRECISION", ""),
+            ("daily_return", "DOUBLE PRECISION", ""),
+            ("volatility_20", "DOUBLE PRECISION", ""),
+            ("volume_sma_20", "DOUBLE PRECISION", ""),
+            ("volume_ratio", "DOUBLE PRECISION", ""),
+            ("atr_14", "DOUBLE PRECISION", ""),
+            ("stoch_rsi", "DOUBLE PRECISION", ""),
+            ("sentiment_date", "DATE", ""),
+            ("sentiment_score", "DOUBLE PRECISION", ""),
+            ("news_count", "INTEGER", ""),
+            ("report_date", "DATE", ""),
+            ("fiscal_year", "INTEGER", ""),
+            ("fiscal_quarter", "VARCHAR(10)", ""),
+            ("revenue", "BIGINT", ""),
+            ("net_profit", "BIGINT", ""),
+            ("eps", "DOUBLE PRECISION", ""),
+            ("total_equity", "BIGINT", ""),
+            ("roe", "DOUBLE PRECISION", ""),
+            ("updated_at", "TIMESTAMP WITH TIME ZONE", "DEFAULT CURRENT_TIMESTAMP"),
+        ],
+        "constraints": [],
+        "indexes": [
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_stock_latest_snapshot_ticker ON stock_latest_snapshot (ticker)",
+        ],
+    },
+    # Indeks universe: metadata + tier likuiditas (1 = paling likuid) untuk jadwal per tier
+    "ticker_universe": {
+        "columns": [
+            ("ticker", "VARCHAR(20)", "PRIMARY KEY"),
+            ("name", "VARCHAR(255)", ""),
+            ("is_active", "BOOLEAN", "DEFAULT TRUE"),
+            ("tier", "SMALLINT", ""),                          # NULL = belum dihitung
+            ("median_traded_value", "DOUBLE PRECISION", ""),   # median close * volume (IDR)
+            ("avg_volume", "DOUBLE PRECISION", ""),
+            ("active_days", "INTEGER", ""),                    # hari dengan volume > 0 di window
+            ("tier_updated_at", "TIMESTAMP WITH TIME ZONE", ""),
+            ("created_at", "TIMESTAMP WITH TIME ZONE", "DEFAULT CURRENT_TIMESTAMP"),
+        ],
+        "constraints": [],
+    },
+}
+
+# Kunci advisory lock Postgres untuk migrasi schema (konstanta sembarang tapi tetap)
+SCHEMA_LOCK_KEY = 7_310_001
+
+
+# Partisi tahunan dari PARTITION_START_YEAR sampai tahun depan; data di luar rentang
+# itu jatuh ke partisi DEFAULT. Migrator membuat partisi tahun berikutnya otomatis.
+PARTITION_START_YEAR = 2010
+
+
+# Backend DuckDB (file lokal): schema logis yang sama, tanpa fitur khusus Postgres --
+# SERIAL -> SEQUENCE, tanpa FK (DuckDB tidak mendukung ON DELETE CASCADE dan menolak
+# upsert baris yang direferensikan), tanpa partisi, dan hanya UNIQUE index (index lain
+# adalah hint performa Postgres; DuckDB memakai zone map per kolom).
+DUCKDB = "duckdb"
+_FK_RE = re.compile(r"\s*REFERENCES\s+\w+\s*\(\w+\)(\s+ON DELETE CASCADE)?", re.IGNORECASE)
+
+
+def sequence_name(table: str, column: str) -> str:
+    return f"{table}_{column}_seq"
+
+
+def _column_sql(table: str, name: str, dtype: str, mods: str, dialect: str) -> str:
+    if dialect == DUCKDB:
+        mods = _FK_RE.sub("", mods)
+        if dtype.upper() == "SERIAL":
+            dtype = f"INTEGER DEFAULT nextval('{sequence_name(table, name)}')"
+    return f"{name} {dtype} {mods}".strip()
+
+
+def create_table_sql(table: str, dialect: str = "postgresql") -> str:
+    spec = SCHEMA[table]
+    lines = [_column_sql(table, name, dtype, mods, dialect) for name, dtype, mods in spec["columns"]]
+    lines += spec["constraints"]
+    body = ",\n        ".join(lines)
+    partition = ""
+    if spec.get("partition_by") and dialect != DUCKDB:
+        partition = f" PARTITION BY RANGE ({spec['partition_by']})"
+    return f"CREATE TABLE IF NOT EXISTS {table} (\n        {body}\n    ){partition}"
+
+
+def create_sequences_sql(table: str) -> list[str]:
+    """DuckDB: sequence untuk kolom SERIAL, dibuat sebelum tabelnya."""
+    return [f"CREATE SEQUENCE IF NOT EXISTS {sequence_name(table, name)}"
+            for name, dtype, _ in SCHEMA[table]["columns"] if dtype.upper() == "SERIAL"]
+
+
+def table_indexes(table: str, dialect: str = "postgresql") -> list[str]:
+    indexes = SCHEMA[table].get("indexes", [])
+    if dialect == DUCKDB:
+        return [ddl for ddl in indexes if ddl.upper().startswith("CREATE UNIQUE INDEX")]
+    return indexes
+
+
+def partition_name(table: str, year: int | None) -> str:
+    return f"{table}_default" if year is None else f"{table}_y{year}"
+
+
+def partition_years(first_year: int | None = None, start_year: int = PARTITION_START_YEAR) -> list[int]:
+    first = min(first_year or start_year, start_year)
+    return list(range(first, date.today().year + 2))
+
+
+def create_partition_sql(table: str, year: int | None) -> str:
+    name = partition_name(table, year)
+    if year is None:
+        return f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} DEFAULT"
+    return (
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+    )
+
+
+def expected_partitions(first_year: int | None = None) -> dict[str, list]:
+    """{tabel_induk: [tahun..., None(default)]} untuk semua tabel yang dipartisi."""
+    return {
+        table: partition_years(first_year, spec.get("partition_start_year", PARTITION_START_YEAR)) + [None]
+        for table, spec in SCHEMA.items() if spec.get("partition_by")
+    }
+
+
+def add_column_sql(table: str, name: str, dtype: str, mods: str) -> str:
+    # Kolom baru di tabel yang sudah berisi: hanya tipe + DEFAULT (NOT NULL/UNIQUE bisa gagal di data lama)
+    if dtype.upper() == "SERIAL":
+        dtype = "INTEGER"
+    default = re.search(r"DEFAULT\s+(\S+)", mods, re.IGNORECASE)
+    extra = f" DEFAULT {default.group(1)}" if default else ""
+    return f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {name} {dtype}{extra}"
+
+
+# Kompatibilitas untuk kode lama yang membaca TABLES / SCHEMA_MAP
+TABLES = [create_table_sql(t) for t in SCHEMA]
+SCHEMA_MAP = {
+    table: [c[0] for c in spec["columns"] if c[1] != "SERIAL" and not c[0].endswith("_at")]
+    for table, spec in SCHEMA.items()
+}
+
+
+# MIGRATOR
+
+def introspect(conn) -> dict:
     """
-    CREATE TABLE IF NOT EXISTS technical_prices (
-        id SERIAL PRIMARY KEY,
-        stock_id INTEGER REFERENCES stocks(id) ON DELETE CASCADE,
-        date DATE NOT NULL,
-        open DOUBLE PRECISION,
-        high DOUBLE PRECISION,
-        low DOUBLE PRECISION,
-        close DOUBLE PRECISION NOT NULL,
-        adj_close DOUBLE PRECISION,
-        volume BIGINT,
-        data_source VARCHAR(50),
-        UNIQUE(stock_id, date)
-    );
-    """,
+    Satu query ke information_schema.columns (+ relkind dari pg_class) untuk semua tabel
+    dan partisi yang dideklarasikan, plus satu query nama index.
     """
-    CREATE TABLE IF NOT EXISTS technical_indicators (
-        id SERIAL PRIMARY KEY,
-        stock_id INTEGER REFERENCES stocks(id) ON DELETE CASCADE,
-        date DATE NOT NULL,
-        rsi DOUBLE PRECISION,
-        macd DOUBLE PRECISION,
-        macd_signal DOUBLE PRECISION,
-        sma_20 DOUBLE PRECISION,
-        sma_50 DOUBLE PRECISION,
-        ema_20 DOUBLE PRECISION,
-        bb_upper DOUBLE PRECISION,
-        bb_lower DOUBLE PRECISION,
-        bb_middle DOUBLE PRECISION,
-        daily_return DOUBLE PRECISION,
-        volatility_20 DOUBLE PRECISION,
-        volume_sma_20 DOUBLE PRECISION,
-        volume_ratio DOUBLE PRECISION,
-        atr_14 DOUBLE PRECISION,
-        stoch_rsi DOUBLE PRECISION,
-        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE(stock_id, date)
-    );
-    """,
+    partitions = [partition_name(t, y) for t, years in expected_partitions().items() for y in years]
+    rows = conn.execute(
+        text("""
+            SELECT c.table_name, c.column_name, pc.relkind
+            FROM information_schema.columns c
+            JOIN pg_class pc
+              ON pc.relname = c.table_name
+             AND pc.relnamespace = current_schema()::regnamespace
+            WHERE c.table_schema = current_schema()
+              AND c.table_name = ANY(:tables)
+        """),
+        {"tables": list(SCHEMA) + partitions}
+    ).fetchall()
+
+    columns, kinds = {}, {}
+    for table, column, relkind in rows:
+        columns.setdefault(table, set()).add(column)
+        kinds[table] = relkind
+
+    indexes = {
+        r[0] for r in conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")
+        ).fetchall()
+    }
+    return {"columns": columns, "kinds": kinds, "indexes": indexes}
+
+
+def introspect_duckdb(conn) -> dict:
+    """introspect() untuk DuckDB: information_schema + duckdb_indexes(), tanpa partisi."""
+    rows = conn.execute(
+        text("""
+            SELECT table_name, column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = ANY(:tables)
+        """),
+        {"tables": list(SCHEMA)}
+    ).fetchall()
+    columns = {}
+    for table, column in rows:
+        columns.setdefault(table, set()).add(column)
+    indexes = {r[0] for r in conn.execute(text("SELECT index_name FROM duckdb_indexes()")).fetchall()}
+    return {"columns": columns, "kinds": {}, "indexes": indexes}
+
+
+def _index_name(ddl: str) -> str:
+    return re.search(r"IF NOT EXISTS\s+(\S+)", ddl).group(1)
+
+
+def plan_migration(state: dict, dialect: str = "postgresql") -> list[str]:
+    """Diff schema yang dideklarasikan vs database. Return daftar DDL yang benar-benar perlu."""
+    existing, kinds, indexes = state["columns"], state["kinds"], state["indexes"]
+    partitions = expected_partitions()
+    plan = []
+    # Urutan dict = urutan dependensi FK (stocks dulu)
+    for table, spec in SCHEMA.items():
+        is_new = table not in existing
+        if is_new:
+            if dialect == DUCKDB:
+                plan += create_sequences_sql(table)
+            plan.append(create_table_sql(table, dialect))
+        else:
+            for name, dtype, mods in spec["columns"]:
+                if name not in existing[table]:
+                    plan.append(add_column_sql(table, name, dtype, mods))
+
+        if spec.get("partition_by") and dialect != DUCKDB:
+            if not is_new and kinds.get(table) != "p":
+                # Tabel heap lama: jangan sentuh otomatis, migrasi data butuh perintah eksplisit
+                print(f"[DB-MIGRATE] {table} belum dipartisi -> jalankan: "
+                      f"python -m src.database.schema --partition {table}")
+                continue
+            for year in partitions[table]:
+                if partition_name(table, year) not in existing:
+                    plan.append(create_partition_sql(table, year))
+
+        for ddl in table_indexes(table, dialect):
+            if _index_name(ddl) not in indexes:
+                plan.append(ddl)
+    return plan
+
+
+def migrate(engine, dry_run: bool = False) -> list[str]:
     """
-    CREATE TABLE IF NOT EXISTS macro_economic (
-        date DATE PRIMARY KEY,
-        usd_idr DOUBLE PRECISION,
-        ihsg DOUBLE PRECISION,
-        gold_price DOUBLE PRECISION,
-        oil_price DOUBLE PRECISION,
-        macro_sentiment_score DOUBLE PRECISION DEFAULT 0,
-        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-    );
-    """,
+    Terapkan hanya perubahan yang hilang, dalam SATU transaksi di bawah advisory lock.
+    Setiap runner memanggil ini saat start: yang datang belakangan menunggu lock, lalu
+    mendapati plan kosong.
+    Error tidak ditelan: kalau DDL gagal, seluruh transaksi di-rollback.
+    DuckDB: file lokal satu proses, tanpa advisory lock.
     """
-    CREATE TABLE IF NOT EXISTS news_sentiment (
-        id SERIAL PRIMARY KEY,
-        stock_id INTEGER REFERENCES stocks(id) ON DELETE CASCADE,
-        date DATE NOT NULL,
-        sentiment_score DOUBLE PRECISION,
-        news_count INTEGER,
-        UNIQUE(stock_id, date)
-    );
-    """,
+    if engine is None:
+        return []
+    print("\n[DB-MIGRATE] Checking schema...")
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == DUCKDB:
+            plan = plan_migration(introspect_duckdb(conn), dialect)
+        else:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": SCHEMA_LOCK_KEY})
+            plan = plan_migration(introspect(conn))
+
+        if not plan:
+            print("[DB-MIGRATE] Schema is up-to-date. ✅")
+            return []
+
+        for ddl in plan:
+            print(f"  -> {ddl.splitlines()[0]}")
+            if not dry_run:
+                conn.execute(text(ddl))
+
+    print(f"[DB-MIGRATE] Applied {len(plan)} change(s). ✅")
+    return plan
+
+
+def init_tables(engine):
+    # Nama lama dipertahankan untuk pemanggil yang sudah ada
+    migrate(engine)
+
+
+# PARTITION MIGRATION (tabel heap lama -> tabel terpartisi)
+
+def migrate_to_partitioned(engine, table: str, keep_legacy: bool = False) -> int:
     """
-    CREATE TABLE IF NOT EXISTS fundamental_quarterly (
-        id SERIAL PRIMARY KEY,
-        stock_id INTEGER REFERENCES stocks(id) ON DELETE CASCADE,
-        ticker VARCHAR(20),
-        year INTEGER NOT NULL,
-        quarter VARCHAR(10) NOT NULL,
-        report_date DATE NOT NULL,
-        revenue BIGINT,
-        net_profit BIGINT,
-        eps DOUBLE PRECISION,
-        total_assets BIGINT,
-        total_liabilities BIGINT,
-        total_equity BIGINT,
-        roe DOUBLE PRECISION,
-        data_source VARCHAR(50),
-        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE(stock_id, year, quarter)
-    );
+    Pindahkan tabel heap lama (id SERIAL + UNIQUE(stock_id, date)) ke layout terpartisi.
+    Satu transaksi di bawah advisory lock yang sama dengan migrate():
+      1. rename tabel lama -> <table>_legacy
+      2. buat tabel terpartisi + partisi tahunan yang mencakup data lama + index
+      3. INSERT ... SELECT semua baris (kolom yang dideklarasikan saja)
+      4. drop tabel lama (kecuali keep_legacy)
+    Job harian harus dihentikan selama proses ini (tabel terkunci).
     """
-]
+    spec = SCHEMA[table]
+    if not spec.get("partition_by"):
+        raise ValueError(f"{table} is not declared as partitioned")
+    if engine.dialect.name == DUCKDB:
+        raise ValueError("Partitioning is a Postgres layout; DuckDB tables are never partitioned")
 
-# UNIVERSAL SCHEMA MAP (For Auto-Healer)
-SCHEMA_MAP = {
-    "stocks": ["ticker", "company_name", "sector", "industry", "currency", "is_active"],
-    "technical_prices": ["stock_id", "date", "open", "high", "low", "close", "adj_close", "volume", "data_source"],
-    "technical_indicators": [
-        "stock_id", "date", "rsi", "macd", "macd_signal", "sma_20", "sma_50", "ema_20", 
-        "bb_upper", "bb_lower", "bb_middle", "daily_return", "volatility_20", 
-        "volume_sma_20", "volume_ratio", "atr_14", "stoch_rsi"
-    ],
-    "macro_economic": ["date", "usd_idr", "ihsg", "gold_price", "oil_price", "macro_sentiment_score"],
-    "news_sentiment": ["stock_id", "date", "sentiment_score", "news_count"],
-    "fundamental_quarterly": [
-        "stock_id", "ticker", "year", "quarter", "report_date", "revenue", 
-        "net_profit", "eps", "total_assets", "total_liabilities", "total_equity", "roe"
-    ]
-}
+    legacy = f"{table}_legacy"
+    cols = ", ".join(c[0] for c in spec["columns"])
 
-def init_tables(engine):
-    if engine is None: return
-    print("\n[DB-HEALER] Starting Universal Schema Verification...")
     with engine.begin() as conn:
-        # 1. Create missing tables
-        for query in TABLES:
-            conn.execute(text(query))
-        
-        # 2. Universal Column Healer (Simplified check)
-        for table, cols in SCHEMA_MAP.items():
-            for col in cols:
-                try:
-                    # In PostgreSQL, we can use a generic type for new columns in this auto-healer
-                    # For a truly robust system, we use DOUBLE PRECISION as default for numeric
-                    dtype = "DOUBLE PRECISION"
-                    if col in ["id", "stock_id", "news_count", "year", "volume"]: dtype = "BIGINT"
-                    if col in ["date", "report_date"]: dtype = "DATE"
-                    
-                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {col} {dtype};"))
-                except Exception:
-                    pass
-    print("[DB-HEALER] Schema is now up-to-date. ✅")
+        conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": SCHEMA_LOCK_KEY})
+
+        relkind = conn.execute(
+            text("SELECT relkind FROM pg_class WHERE relname = :t AND relnamespace = current_schema()::regnamespace"),
+            {"t": table}
+        ).scalar()
+        if relkind is None:
+            raise ValueError(f"{table} does not exist")
+        if relkind == "p":
+            print(f"[DB-PARTITION] {table} sudah terpartisi, tidak ada yang dilakukan.")
+            return 0
+
+        first = conn.execute(text(f"SELECT MIN({spec['partition_by']}) FROM {table}")).scalar()
+        first_year = first.year if first else None
+
+        print(f"[DB-PARTITION] {table} -> {legacy}")
+        conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+
+        conn.execute(text(create_table_sql(table)))
+        for year in partition_years(first_year, spec.get("partition_start_year", PARTITION_START_YEAR)) + [None]:
+            conn.execute(text(create_partition_sql(table, year)))
+
+        moved = conn.execute(
+            text(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {legacy} ON CONFLICT DO NOTHING")
+        ).rowcount
+        print(f"[DB-PARTITION] Copied {moved} rows")
+
+        # Index dibuat setelah copy: jauh lebih cepat daripada maintain index per baris
+        for ddl in spec.get("indexes", []):
+            conn.execute(text(ddl))
+
+        if not keep_legacy:
+            conn.execute(text(f"DROP TABLE {legacy}"))
+
+        conn.execute(text(f"ANALYZE {table}"))
+
+    print(f"[DB-PARTITION] {table} is now partitioned by year. ✅")
+    return moved
+
+
+if __name__ == "__main__":
+    import argparse
+    from src.database.connection import get_db_engine
+
+    parser = argparse.ArgumentParser("Schema Migrator")
+    parser.add_argument("--dry-run", action="store_true", help="Tampilkan DDL tanpa menjalankan")
+    parser.add_argument("--partition", choices=[t for t, s in SCHEMA.items() if s.get("partition_by")],
+                        help="Migrasi tabel heap lama ke layout terpartisi")
+    parser.add_argument("--keep-legacy", action="store_true", help="Jangan drop tabel <table>_legacy")
+    args = parser.parse_args()
+
+    if args.partition:
+        migrate_to_partitioned(get_db_engine(), args.partition, keep_legacy=args.keep_legacy)
+    else:
+        migrate(get_db_engine(), dry_run=args.dry_run)
@@ -0,0 +1,99 @@
+"""
+stock_latest_snapshot: satu baris per saham berisi harga, indikator, sentimen, dan
+fundamental terbaru -- read path aplikasi StockForecast cukup satu scan tabel kecil ini,
+bukan DISTINCT ON / subquery max(date) ke lima tabel per request.
+
+refresh_snapshot() dipanggil di akhir setiap batch DAG (setelah flush_all), hanya untuk
+ticker yang stage-nya berjalan sukses di batch itu. Satu statement INSERT ... SELECT
+dengan LATERAL per tabel sumber: setiap lookup = ORDER BY date DESC LIMIT 1 di atas
+index (stock_id, date), jadi biayanya sebanding jumlah ticker yang berubah, bukan
+ukuran histori.
+
+Contoh:
+  python -m src.database.snapshot --full     # bangun ulang untuk semua saham
+"""
+from sqlalchemy import text
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "adj_close", "volume"]
+INDICATOR_COLUMNS = [
+    "rsi", "macd", "macd_signal", "sma_20", "sma_50", "ema_20",
+    "bb_upper", "bb_lower", "bb_middle", "daily_return", "volatility_20",
+    "volume_sma_20", "volume_ratio", "atr_14", "stoch_rsi",
+]
+FUNDAMENTAL_COLUMNS = ["revenue", "net_profit", "eps", "total_equity", "roe"]
+
+SNAPSHOT_COLUMNS = (
+    ["stock_id", "ticker", "company_name", "sector", "price_date"] + PRICE_COLUMNS
+    + ["prev_close", "change_pct", "indicator_date"] + INDICATOR_COLUMNS
+    + ["sentiment_date", "sentiment_score", "news_count",
+       "report_date", "fiscal_year", "fiscal_quarter"] + FUNDAMENTAL_COLUMNS
+)
+
+
+def _refresh_sql(where: str) -> str:
+    price_cols = ", ".join(f"p.{c}" for c in PRICE_COLUMNS)
+    ind_cols = ", ".join(f"i.{c}" for c in INDICATOR_COLUMNS)
+    fund_cols = ", ".join(f"f.{c}" for c in FUNDAMENTAL_COLUMNS)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in SNAPSHOT_COLUMNS if c != "stock_id")
+    return f"""
+        INSERT INTO stock_latest_snapshot ({", ".join(SNAPSHOT_COLUMNS)})
+        SELECT s.id, s.ticker, s.company_name, s.sector,
+               p.date, {price_cols},
+               prev.close,
+               CASE WHEN prev.close > 0 THEN (p.close / prev.close - 1) * 100 END,
+               i.date, {ind_cols},
+               n.date, n.sentiment_score, n.news_count,
+               f.report_date, f.year, f.quarter, {fund_cols}
+        FROM stocks s
+        LEFT JOIN LATERAL (
+            SELECT * FROM technical_prices WHERE stock_id = s.id ORDER BY date DESC LIMIT 1
+        ) p ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT close FROM technical_prices WHERE stock_id = s.id AND date < p.date ORDER BY date DESC LIMIT 1
+        ) prev ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT * FROM technical_indicators WHERE stock_id = s.id ORDER BY date DESC LIMIT 1
+        ) i ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT * FROM news_sentiment WHERE stock_id = s.id ORDER BY date DESC LIMIT 1
+        ) n ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT * FROM fundamental_quarterly WHERE stock_id = s.id ORDER BY report_date DESC LIMIT 1
+        ) f ON TRUE
+        {where}
+        ON CONFLICT (stock_id) DO UPDATE SET {updates}, updated_at = NOW()
+    """
+
+
+def refresh_snapshot(engine, tickers: list[str] | None = None) -> int:
+    """Refresh baris snapshot untuk `tickers` (None = semua saham). Return jumlah baris."""
+    if tickers is not None and not tickers:
+        return 0
+    if tickers is None:
+        sql, params = _refresh_sql(""), {}
+    else:
+        sql, params = _refresh_sql("WHERE s.ticker = ANY(:tickers)"), {"tickers": list(tickers)}
+    with engine.begin() as conn:
+        n = conn.execute(text(sql), params).rowcount
+        if n < 0:  # DuckDB tidak melaporkan rowcount
+            n = conn.execute(text("SELECT COUNT(*) FROM stock_latest_snapshot")).scalar() if tickers is None else len(tickers)
+    print(f"[SNAPSHOT] {n} stock(s) refreshed")
+    return n
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.database.connection import get_db_engine
+
+    parser = argparse.ArgumentParser("Latest Snapshot")
+    parser.add_argument("--full", action="store_true", help="Refresh semua saham")
+    parser.add_argument("--ticker", action="append", help="Refresh ticker tertentu (boleh berulang)")
+    args = parser.parse_args()
+
+    engine = get_db_engine()
+    if args.full or args.ticker:
+        refresh_snapshot(engine, None if args.full else args.ticker)
+    with engine.connect() as conn:
+        total, newest = conn.execute(text("SELECT COUNT(*), MAX(price_date) FROM stock_latest_snapshot")).fetchone()
+    print(f"stock_latest_snapshot: {total} rows, newest price_date {newest}")
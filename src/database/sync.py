@@ -0,0 +1,145 @@
+"""
+Sinkronisasi backend lokal DuckDB -> Postgres setelah batch job berat.
+
+Backfill multi-tahun, recompute indikator seluruh universe, dan riset bisa dijalankan
+terhadap file DuckDB lokal (database.backend / DB_BACKEND=duckdb / --backend duckdb) dengan
+schema logis yang sama. Perintah ini lalu mendorong hasilnya ke Postgres:
+
+  - stocks di-upsert berdasarkan ticker (metadata lokal tidak menimpa dengan NULL);
+    stock_id lokal dipetakan ke id Postgres lewat ticker (id SERIAL tidak portabel)
+  - setiap tabel data dibaca per chunk dari DuckDB dan ditulis dengan multi-row
+    INSERT ... ON CONFLICT, satu transaksi per chunk -> idempoten, aman diulang
+  - data lokal dianggap otoritatif untuk baris yang disinkronkan (DO UPDATE semua kolom),
+    kecuali macro_economic yang digabung COALESCE seperti write buffer
+  - stock_latest_snapshot di Postgres di-refresh untuk ticker yang tersentuh
+
+Contoh:
+  python -m src.database.sync                                   # semua tabel data
+  python -m src.database.sync --since 2024-01-01 --table technical_indicators
+"""
+import time
+from datetime import date
+
+from sqlalchemy import text
+
+from src.database.bulk import bulk_upsert
+from src.database.connection import create_backend_engine
+from src.database.schema import SCHEMA, migrate
+from src.database.snapshot import refresh_snapshot
+from src.database.write_buffer import TABLE_SPECS
+
+# tabel -> kolom tanggal untuk --since (urutan = urutan sinkronisasi)
+SYNC_TABLES = {
+    "technical_prices": "date",
+    "technical_indicators": "date",
+    "intraday_prices": "ts",
+    "news_sentiment": "date",
+    "fundamental_quarterly": "report_date",
+    "macro_economic": "date",
+    "corporate_actions": "date",
+}
+# Conflict key tabel yang tidak ditulis lewat write buffer
+EXTRA_KEYS = {"corporate_actions": ["stock_id", "date", "kind"]}
+
+STOCK_COLUMNS = ["ticker", "company_name", "sector", "industry", "currency", "is_active", "metadata_updated_at"]
+CHUNK_ROWS = 20_000
+
+
+def sync_columns(table: str) -> list[str]:
+    """Kolom yang disalin: tanpa id SERIAL dan timestamp audit (diisi default di Postgres)."""
+    return [name for name, dtype, _ in SCHEMA[table]["columns"]
+            if dtype.upper() != "SERIAL" and name not in ("created_at", "updated_at", "detected_at")]
+
+
+def upsert_spec(table: str) -> dict:
+    spec = TABLE_SPECS.get(table, {})
+    conflict = spec.get("conflict_cols") or EXTRA_KEYS[table]
+    has_updated_at = any(name == "updated_at" for name, _, _ in SCHEMA[table]["columns"])
+    return {
+        "conflict_cols": conflict,
+        "update_cols": [c for c in sync_columns(table) if c not in conflict],
+        "coalesce": spec.get("coalesce", False),
+        "extra_set": "updated_at = NOW()" if has_updated_at else None,
+    }
+
+
+def sync_stocks(local, remote) -> dict[int, tuple[int, str]]:
+    """Upsert stocks ke Postgres. Return {stock_id lokal: (stock_id Postgres, ticker)}."""
+    with local.connect() as conn:
+        rows = [dict(r._mapping) for r in conn.execute(
+            text(f"SELECT id, {', '.join(STOCK_COLUMNS)} FROM stocks")).fetchall()]
+    if not rows:
+        return {}
+    local_ids = {r.pop("id"): r["ticker"] for r in rows}
+    with remote.begin() as conn:
+        bulk_upsert(conn, "stocks", rows, conflict_cols=["ticker"],
+                    update_cols=[c for c in STOCK_COLUMNS if c != "ticker"], coalesce=True)
+        remote_ids = dict(conn.execute(
+            text("SELECT ticker, id FROM stocks WHERE ticker = ANY(:t)"), {"t": list(local_ids.values())}
+        ).fetchall())
+    return {lid: (remote_ids[t], t) for lid, t in local_ids.items()}
+
+
+def sync_table(local, remote, table: str, id_map: dict, since: date | None = None) -> tuple[int, set[str]]:
+    """Salin satu tabel per chunk. Return (baris ditulis, ticker yang tersentuh)."""
+    columns = sync_columns(table)
+    spec = upsert_spec(table)
+    where = f" WHERE {SYNC_TABLES[table]} >= :since" if since else ""
+    written, touched = 0, set()
+    with local.connect() as conn:
+        result = conn.execute(text(f"SELECT {', '.join(columns)} FROM {table}{where}"), {"since": since})
+        while True:
+            chunk = result.fetchmany(CHUNK_ROWS)
+            if not chunk:
+                break
+            rows = [dict(zip(columns, r)) for r in chunk]
+            if "stock_id" in columns:
+                for r in rows:
+                    r["stock_id"], ticker = id_map.get(r["stock_id"], (None, None))
+                    touched.add(ticker)
+                    if "ticker" in r and not r["ticker"]:
+                        r["ticker"] = ticker  # fundamental_quarterly: ticker denormalisasi
+                touched.discard(None)
+            with remote.begin() as rconn:
+                written += bulk_upsert(rconn, table, rows, **spec)
+    return written, touched
+
+
+def sync_to_postgres(tables: list[str] | None = None, since: date | None = None, init: bool = False) -> dict:
+    local = create_backend_engine("duckdb")
+    remote = create_backend_engine("postgres")
+    try:
+        if init:
+            migrate(remote)
+        t0 = time.perf_counter()
+        id_map = sync_stocks(local, remote)
+        print(f"[SYNC] stocks: {len(id_map)} ticker(s) mapped")
+
+        report, touched = {"stocks": len(id_map)}, set()
+        for table in tables or list(SYNC_TABLES):
+            start = time.perf_counter()
+            n, tickers = sync_table(local, remote, table, id_map, since)
+            touched |= tickers
+            report[table] = n
+            print(f"[SYNC] {table}: {n} row(s) in {time.perf_counter() - start:.1f}s")
+
+        if touched:
+            refresh_snapshot(remote, sorted(touched))
+        print(f"[SYNC] Done in {time.perf_counter() - t0:.1f}s")
+        return report
+    finally:
+        local.dispose()
+        remote.dispose()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser("DuckDB -> Postgres Sync")
+    parser.add_argument("--table", action="append", choices=list(SYNC_TABLES),
+                        help="Tabel tertentu (boleh berulang; default semua tabel data)")
+    parser.add_argument("--since", type=date.fromisoformat, help="Hanya baris dengan tanggal >= YYYY-MM-DD")
+    parser.add_argument("--init", action="store_true", help="Migrasi schema Postgres dulu")
+    args = parser.parse_args()
+
+    sync_to_postgres(args.table, args.since, args.init)
@@ -0,0 +1,189 @@
+import random
+import threading
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.config import get_settings
+from src.database.bulk import bulk_upsert
+from src.database.connection import get_db_engine
+from src.monitoring.metrics import RUN_METRICS
+from src.storage.parquet_mirror import MIRROR_KEYS, is_enabled as mirror_enabled, mirror_frame
+
+# data_source bar harian turunan bar intraday (collectors.intraday.rollup_daily): sementara,
+# ditimpa begitu bar harian Yahoo untuk tanggal itu masuk
+ROLLUP_SOURCE = "intraday_rollup"
+
+# Cara upsert per tabel (harus sama dengan semantik upsert langsung di collector)
+TABLE_SPECS = {
+    # DO NOTHING, kecuali baris roll-up intraday yang ditimpa bar Yahoo
+    "technical_prices": {
+        "conflict_cols": ["stock_id", "date"],
+        "update_cols": ["open", "high", "low", "close", "adj_close", "volume", "data_source"],
+        "update_where": f"technical_prices.data_source = '{ROLLUP_SOURCE}'",
+    },
+    "technical_indicators": {
+        "conflict_cols": ["stock_id", "date"],
+        "update_cols": [
+            "rsi", "macd", "macd_signal", "sma_20", "sma_50", "ema_20",
+            "bb_upper", "bb_lower", "bb_middle", "daily_return", "volatility_20",
+            "volume_sma_20", "volume_ratio", "atr_14", "stoch_rsi",
+        ],
+        "extra_set": "updated_at = NOW()",
+    },
+    # Bar terakhir yang sudah tersimpan bisa saja parsial saat diambil -> ditimpa
+    "intraday_prices": {
+        "conflict_cols": ["stock_id", "ts", "interval_min"],
+        "update_cols": ["open", "high", "low", "close", "volume"],
+    },
+    "news_sentiment": {
+        "conflict_cols": ["stock_id", "date"],
+        "update_cols": ["sentiment_score", "news_count"],
+    },
+    "fundamental_quarterly": {
+        "conflict_cols": ["stock_id", "year", "quarter"],
+        "update_cols": [
+            "revenue", "net_profit", "eps", "total_assets", "total_liabilities",
+            "total_equity", "roe",
+        ],
+        "extra_set": "updated_at = NOW()",
+    },
+    "macro_economic": {
+        "conflict_cols": ["date"],
+        "update_cols": ["usd_idr", "ihsg", "gold_price", "oil_price", "macro_sentiment_score"],
+        "coalesce": True,
+    },
+}
+
+DEFAULT_MAX_ROWS = 5000
+DEFAULT_MAX_AGE = 60.0
+DEFAULT_RETRIES = 3
+
+
+class WriteBuffer:
+    """
+    Write-behind buffer lintas collector.
+
+    Collector memanggil add(); baris ditahan di memori dan di-flush per tabel dalam SATU
+    transaksi (multi-row INSERT ... ON CONFLICT) saat jumlah baris >= max_rows, umur buffer
+    >= max_age detik, atau saat flush() dipanggil di akhir shard. Karena semua statement adalah
+    upsert, transaksi yang gagal aman diulang utuh (idempotent).
+
+    Mirror Parquet ditulis di sini, SETELAH transaksi tabel itu commit: flush yang gagal /
+    di-retry tidak meninggalkan baris di mirror yang tidak ada di DB.
+    """
+
+    def __init__(self, engine=None, max_rows: int = DEFAULT_MAX_ROWS, max_age: float = DEFAULT_MAX_AGE,
+                 retries: int = DEFAULT_RETRIES):
+        self.engine = engine
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.retries = retries
+        self._rows = {}
+        self._since = {}
+        self._lock = threading.Lock()
+        self.commits = 0
+        self.rows_flushed = 0
+        self._tickers = {}  # stock_id -> ticker (untuk mirror; id tidak berubah selama run)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    def pending(self, table: str | None = None) -> int:
+        with self._lock:
+            if table:
+                return len(self._rows.get(table, []))
+            return sum(len(r) for r in self._rows.values())
+
+    def add(self, table: str, rows: list[dict]):
+        if not rows:
+            return
+        if table not in TABLE_SPECS:
+            raise ValueError(f"No write spec for table '{table}'")
+        with self._lock:
+            self._rows.setdefault(table, []).extend(rows)
+            self._since.setdefault(table, time.monotonic())
+            due = (len(self._rows[table]) >= self.max_rows
+                   or time.monotonic() - self._since[table] >= self.max_age)
+        if due:
+            self.flush(table)
+
+    def flush(self, table: str | None = None) -> int:
+        """Flush satu tabel atau semua (urutan TABLE_SPECS). Return jumlah baris yang ditulis."""
+        tables = [table] if table else [t for t in TABLE_SPECS if t in self._rows]
+        written = 0
+        for t in tables:
+            with self._lock:
+                rows = self._rows.pop(t, [])
+                self._since.pop(t, None)
+            if rows:
+                written += self._write(t, rows)
+        return written
+
+    def _write(self, table: str, rows: list[dict]) -> int:
+        spec = TABLE_SPECS[table]
+        engine = self.engine or get_db_engine()
+        attempt = 0
+        while True:
+            try:
+                with engine.begin() as conn:
+                    n = bulk_upsert(
+                        conn, table, rows,
+                        conflict_cols=spec["conflict_cols"],
+                        update_cols=spec.get("update_cols"),
+                        coalesce=spec.get("coalesce", False),
+                        extra_set=spec.get("extra_set"),
+                        update_where=spec.get("update_where"),
+                    )
+                self.commits += 1
+                self.rows_flushed += n
+                RUN_METRICS.incr("rows_written", n)
+                print(f"[WRITE-BUFFER] {table}: {n} rows in 1 transaction")
+                break
+            except Exception as e:
+                attempt += 1
+                if attempt > self.retries:
+                    # Kembalikan ke buffer agar flush berikutnya bisa mencoba lagi
+                    with self._lock:
+                        self._rows.setdefault(table, [])[:0] = rows
+                        self._since.setdefault(table, time.monotonic())
+                    raise
+                delay = min(30.0, 2 ** (attempt - 1)) * (0.5 + random.random())
+                print(f"[WRITE-BUFFER] {table} flush failed ({e}), retry {attempt}/{self.retries} in {delay:.1f}s")
+                time.sleep(delay)
+        self._mirror(engine, table, rows)
+        return n
+
+    def _mirror(self, engine, table: str, rows: list[dict]):
+        """Mirror baris yang sudah ter-commit; stock_id dipetakan ke ticker (key mirror)."""
+        if table not in MIRROR_KEYS or not mirror_enabled():
+            return
+        try:
+            df = pd.DataFrame(rows)
+            if "ticker" in MIRROR_KEYS[table] and "ticker" not in df:
+                df["ticker"] = df["stock_id"].map(self._resolve_tickers(engine, df["stock_id"].unique()))
+            mirror_frame(table, df)
+        except Exception as e:
+            # Baris sudah di DB: mirror yang gagal tidak boleh memicu retry / menggagalkan flush
+            print(f"[MIRROR] Failed to mirror {table}: {e}")
+
+    def _resolve_tickers(self, engine, stock_ids) -> dict:
+        missing = [int(i) for i in stock_ids if int(i) not in self._tickers]
+        if missing:
+            with engine.connect() as conn:
+                self._tickers.update(conn.execute(
+                    text("SELECT id, ticker FROM stocks WHERE id = ANY(:ids)"), {"ids": missing}
+                ).fetchall())
+        return self._tickers
+
+    def stats(self) -> dict:
+        return {"commits": self.commits, "rows_flushed": self.rows_flushed, "pending": self.pending()}
+
+
+def buffer_from_settings(engine=None) -> WriteBuffer:
+    cfg = get_settings().write_buffer
+    return WriteBuffer(engine=engine, max_rows=cfg.max_rows, max_age=cfg.max_age_seconds, retries=cfg.retries)
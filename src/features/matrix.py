@@ -0,0 +1,236 @@
+"""
+Feature matrix (stock, date) point-in-time untuk training model.
+
+- Basis: technical_prices LEFT JOIN technical_indicators (kadensi harian yang sama),
+  di-stream dari server-side cursor, urut (stock_id, date).
+- Sentimen & makro: as-of join backward (forward-fill tanpa look-ahead).
+- Fundamental: report_date di quarterly_financials adalah tanggal AKHIR PERIODE fiskal
+  (kolom laporan yfinance), BUKAN tanggal publikasi. Laporan baru dianggap tersedia
+  setelah report_date + fundamental_lag_days (default DEFAULT_FUNDAMENTAL_LAG_DAYS = 90,
+  batas terakhir penyampaian laporan keuangan tahunan/review emiten IDX ke OJK), dan
+  baris di tanggal tersedia itu sendiri belum melihatnya. Asumsi ini konservatif: emiten
+  yang melapor lebih awal terlihat terlambat, tapi tidak ada look-ahead. Lag lebih kecil
+  (mis. 30 untuk laporan kuartalan tanpa review) harus dipilih sadar lewat
+  --fundamental-lag-days.
+
+Output berupa generator chunk DataFrame (memori terbatas ~chunk_rows), opsional ditulis
+ke Parquet secara inkremental.
+"""
+import argparse
+import os
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.database.connection import get_db_engine
+from src.database.schema import SCHEMA_MAP
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+
+DEFAULT_CHUNK_ROWS = 200_000
+# Jeda akhir periode -> laporan publik (batas filing IDX/OJK, hari kalender)
+DEFAULT_FUNDAMENTAL_LAG_DAYS = 90
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "adj_close", "volume"]
+INDICATOR_COLUMNS = [c for c in SCHEMA_MAP["technical_indicators"] if c not in ("stock_id", "date")]
+SENTIMENT_COLUMNS = ["sentiment_score", "news_count"]
+MACRO_COLUMNS = [c for c in SCHEMA_MAP["macro_economic"] if c != "date"]
+FUNDAMENTAL_COLUMNS = ["revenue", "net_profit", "eps", "total_assets", "total_liabilities", "total_equity", "roe"]
+
+
+def _to_ts(values) -> pd.Series:
+    # Resolusi seragam: merge_asof menolak key datetime dengan unit berbeda
+    return pd.to_datetime(values).astype("datetime64[ns]")
+
+
+def _base_query(tickers, start, end) -> tuple[str, dict]:
+    where, params = [], {}
+    if tickers:
+        where.append("s.ticker = ANY(:tickers)")
+        params["tickers"] = list(tickers)
+    if start:
+        where.append("p.date >= :start")
+        params["start"] = start
+    if end:
+        where.append("p.date <= :end")
+        params["end"] = end
+
+    price_cols = ", ".join(f"p.{c}" for c in PRICE_COLUMNS)
+    ind_cols = ", ".join(f"i.{c}" for c in INDICATOR_COLUMNS)
+    sql = f"""
+        SELECT p.stock_id, s.ticker, p.date, {price_cols}, {ind_cols}
+        FROM technical_prices p
+        JOIN stocks s ON s.id = p.stock_id
+        LEFT JOIN technical_indicators i ON i.stock_id = p.stock_id AND i.date = p.date
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY p.stock_id, p.date
+    """
+    return sql, params
+
+
+def _load_macro(conn, end) -> pd.DataFrame:
+    sql = f"SELECT date, {', '.join(MACRO_COLUMNS)} FROM macro_economic"
+    params = {}
+    if end:
+        sql += " WHERE date <= :end"
+        params["end"] = end
+    df = pd.DataFrame(conn.execute(text(sql + " ORDER BY date"), params).fetchall(),
+                      columns=["date"] + MACRO_COLUMNS)
+    df["date"] = _to_ts(df["date"])
+    return df.sort_values("date")
+
+
+def _load_side_tables(conn, stock_ids: list[int], end) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Sentimen + fundamental hanya untuk saham di chunk ini (tanpa batas bawah: butuh nilai as-of awal)."""
+    params = {"ids": stock_ids}
+    if end:
+        params["end"] = end
+
+    sent = pd.DataFrame(
+        conn.execute(text(f"""
+            SELECT stock_id, date, {', '.join(SENTIMENT_COLUMNS)}
+            FROM news_sentiment WHERE stock_id = ANY(:ids){" AND date <= :end" if end else ""}
+        """), params).fetchall(),
+        columns=["stock_id", "date"] + SENTIMENT_COLUMNS
+    )
+    fund = pd.DataFrame(
+        conn.execute(text(f"""
+            SELECT stock_id, report_date, {', '.join(FUNDAMENTAL_COLUMNS)}
+            FROM fundamental_quarterly WHERE stock_id = ANY(:ids){" AND report_date <= :end" if end else ""}
+        """), params).fetchall(),
+        columns=["stock_id", "report_date"] + FUNDAMENTAL_COLUMNS
+    )
+    sent["date"] = _to_ts(sent["date"])
+    fund["report_date"] = _to_ts(fund["report_date"])
+    return sent, fund
+
+
+def _assemble(base: pd.DataFrame, sent: pd.DataFrame, fund: pd.DataFrame, macro: pd.DataFrame,
+              fundamental_lag_days: int) -> pd.DataFrame:
+    base = base.copy()
+    base["date"] = _to_ts(base["date"])
+    base = base.sort_values("date", kind="stable")
+
+    # merge_asof butuh kolom 'on' terurut global; 'by' memisahkan per saham
+    if not sent.empty:
+        base = pd.merge_asof(base, sent.sort_values("date"), on="date", by="stock_id", direction="backward")
+    else:
+        for c in SENTIMENT_COLUMNS:
+            base[c] = None
+
+    if not fund.empty:
+        fund = fund.copy()
+        fund["available_date"] = fund["report_date"] + pd.Timedelta(days=fundamental_lag_days)
+        base = pd.merge_asof(
+            base, fund.sort_values("available_date"),
+            left_on="date", right_on="available_date", by="stock_id",
+            direction="backward", allow_exact_matches=False  # strictly after report_date + lag
+        ).drop(columns=["available_date"])
+    else:
+        for c in ["report_date"] + FUNDAMENTAL_COLUMNS:
+            base[c] = None
+
+    if not macro.empty:
+        base = pd.merge_asof(base, macro, on="date", direction="backward")
+    else:
+        for c in MACRO_COLUMNS:
+            base[c] = None
+
+    return base.sort_values(["stock_id", "date"], kind="stable").reset_index(drop=True)
+
+
+def iter_feature_matrix(tickers=None, start=None, end=None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                        fundamental_lag_days: int = DEFAULT_FUNDAMENTAL_LAG_DAYS, engine=None):
+    """
+    Generator chunk feature matrix. Satu chunk selalu berisi histori LENGKAP saham-sahamnya
+    (batas chunk hanya di pergantian stock_id), jadi fitur per saham tidak terpotong.
+    """
+    engine = engine or get_db_engine()
+    sql, params = _base_query(tickers, start, end)
+    columns = ["stock_id", "ticker", "date"] + PRICE_COLUMNS + INDICATOR_COLUMNS
+
+    # Dua koneksi: satu memegang server-side cursor, satu untuk query pendukung per chunk
+    with engine.connect() as side_conn:
+        macro = _load_macro(side_conn, end)
+
+        with engine.connect() as stream_conn:
+            batch = min(10_000, chunk_rows)
+            result = stream_conn.execution_options(stream_results=True, max_row_buffer=batch).execute(text(sql), params)
+
+            pending = []
+            for rows in result.partitions(batch):
+                pending.extend(rows)
+                if len(pending) < chunk_rows:
+                    continue
+
+                # Tahan baris saham terakhir (mungkin masih berlanjut di partisi berikutnya)
+                last_sid = pending[-1][0]
+                cut = len(pending)
+                while cut > 0 and pending[cut - 1][0] == last_sid:
+                    cut -= 1
+                if cut == 0:
+                    continue
+
+                emit, pending = pending[:cut], pending[cut:]
+                yield _build_chunk(side_conn, emit, columns, macro, end, fundamental_lag_days)
+
+            if pending:
+                yield _build_chunk(side_conn, pending, columns, macro, end, fundamental_lag_days)
+
+
+def _build_chunk(conn, rows, columns, macro, end, fundamental_lag_days) -> pd.DataFrame:
+    base = pd.DataFrame(rows, columns=columns)
+    stock_ids = [int(s) for s in base["stock_id"].unique()]
+    sent, fund = _load_side_tables(conn, stock_ids, end)
+    return _assemble(base, sent, fund, macro, fundamental_lag_days)
+
+
+def write_feature_matrix(path: str, **kwargs) -> int:
+    """Tulis feature matrix ke satu file Parquet chunk demi chunk (memori tetap terbatas)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer, schema, total = None, None, 0
+    try:
+        for chunk in iter_feature_matrix(**kwargs):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                writer = pq.ParquetWriter(path, schema)
+            else:
+                table = table.cast(schema)
+            writer.write_table(table)
+            total += len(chunk)
+            print(f"  [MATRIX] {total} rows written")
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Point-in-time Feature Matrix Builder")
+    parser.add_argument("--ticker", action="append", help="Filter ticker (boleh berulang)")
+    parser.add_argument("--start", help="Tanggal awal (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Tanggal akhir (YYYY-MM-DD)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--fundamental-lag-days", type=int, default=DEFAULT_FUNDAMENTAL_LAG_DAYS,
+                        help="Hari dari akhir periode (report_date) sampai laporan dianggap publik")
+    parser.add_argument("--output", default=os.path.join(PROJECT_ROOT, "data", "processed", "feature_matrix.parquet"))
+    args = parser.parse_args()
+
+    total = write_feature_matrix(
+        args.output,
+        tickers=args.ticker,
+        start=pd.Timestamp(args.start).date() if args.start else None,
+        end=pd.Timestamp(args.end).date() if args.end else None,
+        chunk_rows=args.chunk_rows,
+        fundamental_lag_days=args.fundamental_lag_days,
+    )
+    print(f"[MATRIX] Done: {total} rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
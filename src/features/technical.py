@@ -2,34 +2,64 @@ import pandas as pd
 import numpy as np
 import os
 import argparse
+from functools import partial
 from sqlalchemy import text
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
 
-from src.database.connection import engine
+from src.config import get_settings
+from src.database.bulk import bulk_upsert, frame_to_rows
+from src.database.connection import get_db_engine, statement, set_backend
+from src.database.write_buffer import TABLE_SPECS
+from src.storage.parquet_mirror import mirror_frame
+from src.storage import price_tail
+from src.pipeline.procpool import run_cpu
 
 
 # TECHNICAL
+# Periode SMA terikat nama kolom (sma_20 / sma_50); periode lain dari features.technical
 SMA_20 = 20
 SMA_50 = 50
 
-RSI_PERIOD = 14
-
-MACD_FAST = 12
-MACD_SLOW = 26
-MACD_SIGNAL = 9
-
-BOLLINGER_PERIOD = 20
-BOLLINGER_STD = 2
-
-VOLATILITY_PERIOD = 20
-VOLUME_SMA_PERIOD = 20
+INDICATOR_COLUMNS = [
+    "rsi", "macd", "macd_signal", "sma_20", "sma_50", "ema_20",
+    "bb_upper", "bb_lower", "bb_middle", "daily_return", "volatility_20",
+    "volume_sma_20", "volume_ratio", "atr_14", "stoch_rsi",
+]
+
+INDICATOR_UPSERT_SQL = """
+    INSERT INTO technical_indicators (
+        stock_id, date, rsi, macd, macd_signal,
+        sma_20, sma_50, ema_20, bb_upper, bb_lower, bb_middle,
+        daily_return, volatility_20, volume_sma_20, volume_ratio,
+        atr_14, stoch_rsi
+    ) VALUES (
+        :sid, :d, :rsi, :macd, :macd_signal,
+        :sma20, :sma50, :ema20, :bb_u, :bb_l, :bb_m,
+        :ret, :vol, :vol_sma, :vol_ratio, :atr, :stoch
+    ) ON CONFLICT (stock_id, date) DO UPDATE SET
+        rsi = EXCLUDED.rsi, macd = EXCLUDED.macd,
+        macd_signal = EXCLUDED.macd_signal, sma_20 = EXCLUDED.sma_20,
+        sma_50 = EXCLUDED.sma_50, ema_20 = EXCLUDED.ema_20,
+        bb_upper = EXCLUDED.bb_upper, bb_lower = EXCLUDED.bb_lower,
+        bb_middle = EXCLUDED.bb_middle, daily_return = EXCLUDED.daily_return,
+        volatility_20 = EXCLUDED.volatility_20, volume_sma_20 = EXCLUDED.volume_sma_20,
+        volume_ratio = EXCLUDED.volume_ratio, atr_14 = EXCLUDED.atr_14,
+        stoch_rsi = EXCLUDED.stoch_rsi, updated_at = NOW()
+"""
+
+PRICE_HISTORY_SQL = """
+    SELECT date, close, volume, high, low
+    FROM technical_prices
+    WHERE stock_id = :sid
+    ORDER BY date"""
 
 #CALCULATION
 
 def calculate_indicators(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
+    p = get_settings().technical
 
     close = df["close"]
     volume = df["volume"]
@@ -46,38 +76,38 @@ def calculate_indicators(df: pd.DataFrame) -> pd.DataFrame:
     gain = delta.clip(lower=0)
     loss = -delta.clip(upper=0)
 
-    avg_gain = gain.ewm(alpha=1/RSI_PERIOD, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1/RSI_PERIOD, adjust=False).mean()
+    avg_gain = gain.ewm(alpha=1/p.rsi_period, adjust=False).mean()
+    avg_loss = loss.ewm(alpha=1/p.rsi_period, adjust=False).mean()
 
     rs = avg_gain / avg_loss
     df["rsi"] = 100 - (100 / (1 + rs))
 
     # MACD
-    ema_fast = close.ewm(span=MACD_FAST, adjust=False).mean()
-    ema_slow = close.ewm(span=MACD_SLOW, adjust=False).mean()
+    ema_fast = close.ewm(span=p.macd_fast, adjust=False).mean()
+    ema_slow = close.ewm(span=p.macd_slow, adjust=False).mean()
 
     df["macd"] = ema_fast - ema_slow
-    df["macd_signal"] = df["macd"].ewm(span=MACD_SIGNAL, adjust=False).mean()
+    df["macd_signal"] = df["macd"].ewm(span=p.macd_signal, adjust=False).mean()
 
     #Bollinger Bands
-    bb_mid = close.rolling(BOLLINGER_PERIOD, min_periods=BOLLINGER_PERIOD).mean()
-    bb_std = close.rolling(BOLLINGER_PERIOD, min_periods=BOLLINGER_PERIOD).std()
+    bb_mid = close.rolling(p.bollinger_period, min_periods=p.bollinger_period).mean()
+    bb_std = close.rolling(p.bollinger_period, min_periods=p.bollinger_period).std()
 
     df["bb_middle"] = bb_mid
-    df["bb_upper"] = bb_mid + (bb_std * BOLLINGER_STD)
-    df["bb_lower"] = bb_mid - (bb_std * BOLLINGER_STD)
+    df["bb_upper"] = bb_mid + (bb_std * p.bollinger_std)
+    df["bb_lower"] = bb_mid - (bb_std * p.bollinger_std)
 
     # Returns & Volatility
     df["daily_return"] = close.pct_change()
     df["volatility_20"] = df["daily_return"].rolling(
-        VOLATILITY_PERIOD,
-        min_periods=VOLATILITY_PERIOD
+        p.volatility_period,
+        min_periods=p.volatility_period
     ).std()
 
     # Volume
     df["volume_sma_20"] = volume.rolling(
-        VOLUME_SMA_PERIOD,
-        min_periods=VOLUME_SMA_PERIOD
+        p.volume_sma_period,
+        min_periods=p.volume_sma_period
     ).mean()
     df["volume_ratio"] = volume / df["volume_sma_20"]
 
@@ -102,12 +132,25 @@ def calculate_indicators(df: pd.DataFrame) -> pd.DataFrame:
 
     return df
 
-def update_indicators_for_ticker(ticker: str) -> bool:
+def load_price_history(stock_id: int, limit: int | None = None) -> pd.DataFrame:
+    """limit bar terakhir (None = seluruh histori) dari technical_prices, urut tanggal."""
+    sql = PRICE_HISTORY_SQL if limit is None else f"SELECT * FROM ({PRICE_HISTORY_SQL} DESC LIMIT :n) t ORDER BY date"
+    with get_db_engine().connect() as conn:
+        prices = conn.execute(text(sql), {"sid": stock_id, "n": limit}).fetchall()
+    return pd.DataFrame(prices, columns=["date"] + price_tail.TAIL_COLUMNS).set_index("date")
+
+
+def update_indicators_for_ticker(ticker: str, buffer=None) -> bool:
     print(f"\n[TECH] Processing {ticker}")
 
-    with engine.connect() as conn:
+    with get_db_engine().connect() as conn:
+        # Penanda recompute ada jika histori harga baru ditulis ulang (corporate action)
         stock = conn.execute(
-            text("SELECT id FROM stocks WHERE ticker = :t"),
+            text("""
+                SELECT s.id, r.since, r.requested_at
+                FROM stocks s LEFT JOIN indicator_recompute r ON r.stock_id = s.id
+                WHERE s.ticker = :t
+            """),
             {"t": ticker}
         ).fetchone()
 
@@ -115,26 +158,17 @@ def update_indicators_for_ticker(ticker: str) -> bool:
             print(f"[WARN] {ticker} not found")
             return False
 
-        stock_id = stock[0]
+        stock_id, recompute_since, requested_at = stock
 
-        prices = conn.execute(
-            text("""
-                SELECT date, close, volume, high, low
-                FROM technical_prices
-                WHERE stock_id = :sid
-                ORDER BY date
-            """),
-            {"sid": stock_id}
-        ).fetchall()
+    # Harga dari hand-off stage prices + tail lokal; DB hanya jika cache dingin / recompute
+    df = price_tail.history(ticker, partial(load_price_history, stock_id), full=recompute_since is not None)
 
-    if len(prices) < SMA_50 + 10:
-        print(f"[SKIP] Not enough data ({len(prices)})")
+    if len(df) < SMA_50 + 10:
+        print(f"[SKIP] Not enough data ({len(df)})")
         return False
 
-    df = pd.DataFrame(prices, columns=["date", "close", "volume", "high", "low"])
-    df.set_index("date", inplace=True)
-
-    df = calculate_indicators(df)
+    # CPU murni: di worker process jika pool aktif, baris hasil ditulis dari proses ini
+    df = run_cpu(calculate_indicators, df)
 
     saved, skipped = 0, 0
     
@@ -157,40 +191,53 @@ def update_indicators_for_ticker(ticker: str) -> bool:
                 "stoch": float(r["stoch_rsi"]) if not pd.isna(r["stoch_rsi"]) else None,
             })
 
-        if params:
+        if params and recompute_since is not None:
+            saved = _recompute_history(ticker, stock_id, df, recompute_since, requested_at)
+        elif params:
             # Hanya proses 30 hari terakhir agar cepat (daily update)
             params_to_save = params[-30:] 
             
-            with engine.begin() as conn:
-                conn.execute(
-                    text("""
-                        INSERT INTO technical_indicators (
-                            stock_id, date, rsi, macd, macd_signal,
-                            sma_20, sma_50, ema_20, bb_upper, bb_lower, bb_middle,
-                            daily_return, volatility_20, volume_sma_20, volume_ratio,
-                            atr_14, stoch_rsi
-                        ) VALUES (
-                            :sid, :d, :rsi, :macd, :macd_signal,
-                            :sma20, :sma50, :ema20, :bb_u, :bb_l, :bb_m,
-                            :ret, :vol, :vol_sma, :vol_ratio, :atr, :stoch
-                        ) ON CONFLICT (stock_id, date) DO UPDATE SET
-                            rsi = EXCLUDED.rsi, macd = EXCLUDED.macd,
-                            macd_signal = EXCLUDED.macd_signal, sma_20 = EXCLUDED.sma_20,
-                            sma_50 = EXCLUDED.sma_50, ema_20 = EXCLUDED.ema_20,
-                            bb_upper = EXCLUDED.bb_upper, bb_lower = EXCLUDED.bb_lower,
-                            bb_middle = EXCLUDED.bb_middle, daily_return = EXCLUDED.daily_return,
-                            volatility_20 = EXCLUDED.volatility_20, volume_sma_20 = EXCLUDED.volume_sma_20,
-                            volume_ratio = EXCLUDED.volume_ratio, atr_14 = EXCLUDED.atr_14,
-                            stoch_rsi = EXCLUDED.stoch_rsi, updated_at = CURRENT_TIMESTAMP
-                    """),
-                    params_to_save
-                )
-                saved = len(params_to_save)
+            valid = df.dropna(subset=["rsi", "sma_50"]).tail(len(params_to_save)).reset_index()
+
+            if buffer is not None:
+                # Write-behind: ditulis (dan di-mirror) saat buffer di-flush (threshold / akhir shard)
+                rows = frame_to_rows(valid.assign(stock_id=stock_id), ["stock_id", "date"] + INDICATOR_COLUMNS)
+                buffer.add("technical_indicators", rows)
+            else:
+                with get_db_engine().begin() as conn:
+                    conn.execute(statement("indicator_upsert", INDICATOR_UPSERT_SQL), params_to_save)
+                mirror_frame("technical_indicators", valid.assign(ticker=ticker))
+            saved = len(params_to_save)
 
     print(f"[OK] {ticker}: saved={saved}, skipped={skipped}")
     return True
 
 
+def _recompute_history(ticker: str, stock_id: int, df: pd.DataFrame, since, requested_at) -> int:
+    """
+    Histori harga ditulis ulang: timpa SEMUA indikator sejak `since` (bukan hanya 30 hari
+    terakhir) dan hapus penandanya dalam satu transaksi. Langsung ke DB, tidak lewat buffer,
+    supaya penanda tidak terhapus sebelum barisnya benar-benar tertulis.
+    """
+    valid = df.dropna(subset=["rsi", "sma_50"])
+    valid = valid[valid.index >= since].reset_index()
+    spec = TABLE_SPECS["technical_indicators"]
+    rows = frame_to_rows(valid.assign(stock_id=stock_id), ["stock_id", "date"] + INDICATOR_COLUMNS)
+
+    with get_db_engine().begin() as conn:
+        saved = bulk_upsert(conn, "technical_indicators", rows, conflict_cols=spec["conflict_cols"],
+                            update_cols=spec["update_cols"], extra_set=spec["extra_set"])
+        # requested_at: penanda yang dibuat ulang selama recompute ini berjalan tidak ikut terhapus
+        conn.execute(
+            text("DELETE FROM indicator_recompute WHERE stock_id = :sid AND requested_at = :ts"),
+            {"sid": stock_id, "ts": requested_at}
+        )
+
+    mirror_frame("technical_indicators", valid.assign(ticker=ticker))
+    print(f"[RECOMPUTE] {ticker}: {saved} indicator rows since {since}")
+    return saved
+
+
 # MAIN
 def main():
     parser = argparse.ArgumentParser(description="Technical Indicator Engine")
@@ -199,8 +246,15 @@ def main():
         type=str,
         help="Run indicator only for specific ticker (e.g. BBCA)"
     )
+    parser.add_argument(
+        "--backend",
+        choices=["postgres", "duckdb"],
+        help="Override database.backend (duckdb: recompute lokal, lalu python -m src.database.sync)"
+    )
 
     args = parser.parse_args()
+    if args.backend:
+        set_backend(args.backend)
 
     print("\n" + "=" * 50)
     print("TECHNICAL INDICATORS ENGINE")
@@ -209,7 +263,7 @@ def main():
     if args.ticker:
         update_indicators_for_ticker(args.ticker.upper())
         return
-    with engine.connect() as conn:
+    with get_db_engine().connect() as conn:
         tickers = conn.execute(
             text("SELECT ticker FROM stocks ORDER BY ticker")
         ).fetchall()
@@ -1,20 +1,33 @@
-import torch
+import threading
+import time
 
-# Optimasi untuk 2-core (GitHub Actions). 
-# Membatasi thread mencegah CPU "berantem" (contention).
-torch.set_num_threads(1)
+from src.monitoring.metrics import RUN_METRICS
+from src.pipeline import procpool
 
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from scipy.special import softmax
-import numpy as np
+# torch/transformers diimport saat model pertama kali dimuat (bukan saat modul diimport),
+# supaya collector & tool offline (simulator) bisa diimport tanpa stack inferensi
+torch = None
 
 # Model Checkpoint (Indonesian RoBERTa Sentiment)
 MODEL_NAME = "w11wo/indonesian-roberta-base-sentiment-classifier"
 
+
+def _load_backend():
+    global torch
+    if torch is None:
+        import torch as _torch
+        # Optimasi untuk 2-core (GitHub Actions). 
+        # Membatasi thread mencegah CPU "berantem" (contention).
+        _torch.set_num_threads(1)
+        torch = _torch
+
+
 class SentimentEngine:
     def __init__(self):
         print(f"[AI] Loading IndoBERT Model: {MODEL_NAME}...")
         try:
+            _load_backend()
+            from transformers import AutoTokenizer, AutoModelForSequenceClassification
             self.tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
             self.model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
             self.model.eval() # Mode evaluasi (Read-only)
@@ -36,6 +49,14 @@ class SentimentEngine:
         if not self.model or not texts:
             return [0.0] * len(texts)
 
+        if procpool.active():
+            # Proses induk dengan pool: batch dijalankan worker (bobot model shared via fork)
+            start = time.perf_counter()
+            scores = procpool.run_cpu(_predict_in_worker, texts)
+            RUN_METRICS.observe_inference(len(texts), time.perf_counter() - start)
+            return scores
+
+        start = time.perf_counter()
         # Tokenisasi masif dengan padding otomatis
         encoded_input = self.tokenizer(
             texts, 
@@ -50,24 +71,42 @@ class SentimentEngine:
             output = self.model(**encoded_input)
         
         # Hitung Probabilitas
+        from scipy.special import softmax
         logits = output.logits.numpy()
         probs = softmax(logits, axis=1) # [Baris, 3 Kolom]
         
         # Mapping: 0=Positive, 1=Neutral, 2=Negative
         # Rumus: Skor = Prob_Pos - Prob_Neg
         results = probs[:, 0] - probs[:, 2]
+        RUN_METRICS.observe_inference(len(texts), time.perf_counter() - start)
         
         return [float(s) for s in results]
 
 # Global Instance
 _engine = None
+_engine_lock = threading.Lock()
 
 def get_engine():
     global _engine
-    if _engine is None:
-        _engine = SentimentEngine()
+    # Lock: stage sentimen saham & makro bisa memanggil ini bersamaan (scheduler DAG)
+    with _engine_lock:
+        if _engine is None:
+            _engine = SentimentEngine()
     return _engine
 
+
+def _predict_in_worker(texts: list[str]) -> list[float]:
+    # Di worker hasil fork, _engine sudah berisi model yang dimuat induk sebelum fork
+    return get_engine().predict_batch(texts)
+
+
+def set_engine(engine):
+    """Pasang engine pengganti (mis. engine simulasi); return engine sebelumnya."""
+    global _engine
+    with _engine_lock:
+        previous, _engine = _engine, engine
+    return previous
+
 if __name__ == "__main__":
     # Test
     eng = get_engine()
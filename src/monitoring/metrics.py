@@ -0,0 +1,266 @@
+"""
+Instrumentasi run harian: counter per (stage, ticker) + per provider eksternal.
+
+Scope aktif disimpan per thread: DagScheduler membuka scope untuk setiap stage
+('prices:BBCA.JK' -> stage=prices, ticker=BBCA.JK), jadi request Yahoo/RSS, round trip DB,
+baris, dan batch inferensi yang terjadi di thread stage itu otomatis teratribusi ke sana.
+Di luar stage, semuanya masuk ke scope ('main', '*').
+
+Di akhir run: write_json() (detail per ticker) dan write_prometheus() (agregat per stage /
+provider, format textfile collector node_exporter).
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+MAIN_SCOPE = ("main", "*")
+PROM_PREFIX = "stock_miner"
+
+# Batas bucket histogram ukuran batch inferensi (jumlah headline per panggilan)
+INFERENCE_BUCKETS = [1, 2, 5, 10, 20, 50, 100]
+
+_local = threading.local()
+
+
+def split_scope(name: str) -> tuple[str, str]:
+    kind, sep, ticker = name.partition(":")
+    return (kind, ticker) if sep and ticker else (name, "*")
+
+
+def _new_counters() -> dict:
+    return {
+        "calls": 0, "errors": 0, "wall_s": 0.0,
+        "requests": 0, "request_errors": 0, "request_s": 0.0, "request_bytes": 0,
+        "db_round_trips": 0, "rows": 0, "rows_written": 0,
+        "inference_batches": 0, "inference_texts": 0, "inference_s": 0.0,
+        "history_rewrites": 0, "price_tail_hits": 0, "price_tail_db_reads": 0,
+    }
+
+
+class RunMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self._t0 = time.perf_counter()
+            self._scopes = {}
+            self._providers = {}
+            self._batch_sizes = []
+
+    def current(self) -> tuple[str, str]:
+        return getattr(_local, "scope", MAIN_SCOPE)
+
+    def incr(self, name: str, amount=1, scope: tuple[str, str] | None = None):
+        key = scope or self.current()
+        with self._lock:
+            counters = self._scopes.setdefault(key, _new_counters())
+            counters[name] += amount
+
+    @contextmanager
+    def scope(self, name: str):
+        """Atribusi semua metrik di thread ini ke stage `name` selama blok berjalan."""
+        key = split_scope(name)
+        previous = self._enter(key)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.incr("errors", scope=key)
+            raise
+        finally:
+            self.incr("calls", scope=key)
+            self.incr("wall_s", time.perf_counter() - start, scope=key)
+            self._leave(previous)
+
+    @contextmanager
+    def attach(self, key: tuple[str, str]):
+        """Lanjutkan atribusi ke scope `key` (hasil current()) di thread pembantu, tanpa menghitung call."""
+        previous = self._enter(key)
+        try:
+            yield
+        finally:
+            self._leave(previous)
+
+    def _enter(self, key: tuple[str, str]):
+        previous = getattr(_local, "scope", None)
+        _local.scope = key
+        self._active[threading.get_ident()] = key
+        return previous
+
+    def _leave(self, previous):
+        if previous is None:
+            del _local.scope
+            self._active.pop(threading.get_ident(), None)
+        else:
+            _local.scope = previous
+            self._active[threading.get_ident()] = previous
+
+    def active_scopes(self) -> dict[int, tuple[str, str]]:
+        """{thread ident: scope} untuk thread yang sedang di dalam scope (dibaca sampling profiler)."""
+        return dict(self._active)
+
+    @contextmanager
+    def request(self, provider: str):
+        """
+        Ukur satu request eksternal. Caller boleh mengisi req["bytes"] jika ukuran payload
+        diketahui (mis. body RSS; yfinance tidak mengekspos ukuran response), dan
+        req["error"] / req["empty"] untuk kegagalan yang tidak berupa exception.
+        """
+        req = {"bytes": 0}
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield req
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            failed = failed or req.get("error", False)
+            key = self.current()
+            with self._lock:
+                p = self._providers.setdefault(
+                    provider, {"requests": 0, "errors": 0, "empty": 0, "seconds": 0.0, "bytes": 0, "max_s": 0.0}
+                )
+                p["requests"] += 1
+                p["errors"] += int(failed)
+                p["empty"] += int(bool(req.get("empty")))
+                p["seconds"] += elapsed
+                p["bytes"] += req["bytes"]
+                p["max_s"] = max(p["max_s"], elapsed)
+                c = self._scopes.setdefault(key, _new_counters())
+                c["requests"] += 1
+                c["request_errors"] += int(failed)
+                c["request_s"] += elapsed
+                c["request_bytes"] += req["bytes"]
+
+    def observe_inference(self, batch_size: int, seconds: float):
+        key = self.current()
+        with self._lock:
+            self._batch_sizes.append(batch_size)
+            c = self._scopes.setdefault(key, _new_counters())
+            c["inference_batches"] += 1
+            c["inference_texts"] += batch_size
+            c["inference_s"] += seconds
+
+    # REPORT
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            scopes = {k: dict(v) for k, v in self._scopes.items()}
+            providers = {k: dict(v) for k, v in self._providers.items()}
+            sizes = list(self._batch_sizes)
+
+        stages, tickers = {}, {}
+        for (stage, ticker), counters in scopes.items():
+            agg = stages.setdefault(stage, _new_counters())
+            for k, v in counters.items():
+                agg[k] += v
+            if ticker != "*":
+                tickers.setdefault(ticker, {})[stage] = _rounded(counters)
+
+        for p in providers.values():
+            p["avg_ms"] = round(p["seconds"] / p["requests"] * 1000, 2) if p["requests"] else 0.0
+            p["seconds"] = round(p["seconds"], 3)
+            p["max_s"] = round(p["max_s"], 3)
+
+        histogram = {f"le_{b}": sum(1 for s in sizes if s <= b) for b in INFERENCE_BUCKETS}
+        histogram["le_inf"] = len(sizes)
+        return {
+            "started_at": self.started_at.isoformat(),
+            "wall_s": round(time.perf_counter() - self._t0, 3),
+            "stages": {s: _rounded(c) for s, c in sorted(stages.items())},
+            "providers": providers,
+            "inference": {
+                "batches": len(sizes),
+                "texts": sum(sizes),
+                "mean_batch": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+                "batch_size_histogram": histogram,
+            },
+            "tickers": dict(sorted(tickers.items())),
+        }
+
+    def write_json(self, path: str, extra: dict | None = None) -> dict:
+        report = {**(extra or {}), **self.snapshot()}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        return report
+
+    def write_prometheus(self, path: str, labels: dict | None = None):
+        """Textfile collector: hanya agregat per stage/provider (ticker = kardinalitas terlalu tinggi)."""
+        snap = self.snapshot()
+        base = dict(labels or {})
+        lines = []
+
+        def metric(name, mtype, help_text, samples):
+            lines.append(f"# HELP {PROM_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROM_PREFIX}_{name} {mtype}")
+            for sample_labels, value in samples:
+                lbl = ",".join(f'{k}="{v}"' for k, v in {**base, **sample_labels}.items())
+                lines.append(f"{PROM_PREFIX}_{name}{{{lbl}}} {value}")
+
+        stages = snap["stages"]
+        metric("run_wall_seconds", "gauge", "Wall time of the mining run", [({}, snap["wall_s"])])
+        metric("stage_seconds_total", "counter", "Summed stage wall time",
+               [({"stage": s}, c["wall_s"]) for s, c in stages.items()])
+        metric("stage_calls_total", "counter", "Stage executions",
+               [({"stage": s}, c["calls"]) for s, c in stages.items()])
+        metric("stage_errors_total", "counter", "Failed stage executions",
+               [({"stage": s}, c["errors"]) for s, c in stages.items()])
+        metric("stage_db_round_trips_total", "counter", "DB round trips per stage",
+               [({"stage": s}, c["db_round_trips"]) for s, c in stages.items()])
+        metric("stage_rows_total", "counter", "Rows produced per stage",
+               [({"stage": s}, c["rows"]) for s, c in stages.items()])
+        metric("stage_rows_written_total", "counter", "Rows written to the DB per stage",
+               [({"stage": s}, c["rows_written"]) for s, c in stages.items()])
+        metric("stage_history_rewrites_total", "counter", "Tickers whose price history was rewritten (corporate actions)",
+               [({"stage": s}, c["history_rewrites"]) for s, c in stages.items()])
+        metric("stage_price_tail_hits_total", "counter", "Indicator inputs served from the price hand-off + local tail",
+               [({"stage": s}, c["price_tail_hits"]) for s, c in stages.items()])
+        metric("stage_price_tail_db_reads_total", "counter", "Indicator inputs read back from technical_prices",
+               [({"stage": s}, c["price_tail_db_reads"]) for s, c in stages.items()])
+
+        providers = snap["providers"]
+        metric("provider_requests_total", "counter", "External requests",
+               [({"provider": p}, v["requests"]) for p, v in providers.items()])
+        metric("provider_errors_total", "counter", "Failed external requests",
+               [({"provider": p}, v["errors"]) for p, v in providers.items()])
+        metric("provider_empty_responses_total", "counter", "Requests that returned no data",
+               [({"provider": p}, v["empty"]) for p, v in providers.items()])
+        metric("provider_request_seconds_total", "counter", "Summed external request latency",
+               [({"provider": p}, v["seconds"]) for p, v in providers.items()])
+        metric("provider_bytes_total", "counter", "Response bytes (where measurable)",
+               [({"provider": p}, v["bytes"]) for p, v in providers.items()])
+
+        inf = snap["inference"]
+        lines.append(f"# HELP {PROM_PREFIX}_inference_batch_size Headlines per inference call")
+        lines.append(f"# TYPE {PROM_PREFIX}_inference_batch_size histogram")
+        for key, count in inf["batch_size_histogram"].items():
+            le = "+Inf" if key == "le_inf" else key[3:]
+            lbl = ",".join(f'{k}="{v}"' for k, v in {**base, "le": le}.items())
+            lines.append(f"{PROM_PREFIX}_inference_batch_size_bucket{{{lbl}}} {count}")
+        lbl = ",".join(f'{k}="{v}"' for k, v in base.items())
+        lines.append(f"{PROM_PREFIX}_inference_batch_size_sum{{{lbl}}} {inf['texts']}")
+        lines.append(f"{PROM_PREFIX}_inference_batch_size_count{{{lbl}}} {inf['batches']}")
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Tulis ke file sementara lalu rename: collector tidak pernah membaca file setengah jadi
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+
+
+def _rounded(counters: dict) -> dict:
+    return {k: round(v, 4) if isinstance(v, float) else v for k, v in counters.items()}
+
+
+RUN_METRICS = RunMetrics()
@@ -0,0 +1,245 @@
+"""
+Mode profiling run harian (mine_daily --profile): sampling stack + tracemalloc per stage/ticker.
+
+Tanpa instrumentasi di kode collector:
+  - thread sampler membaca sys._current_frames() setiap profiling.interval_ms dan memberi
+    setiap stack akar scope thread-nya (RUN_METRICS.active_scopes(): 'prices', 'indicators', ...),
+    jadi flamegraph langsung terbelah per stage. Thread pool yang sedang idle (di luar scope)
+    tidak dihitung; thread utama di luar stage masuk ke 'main'.
+  - sampel bersifat wall-clock: waktu menunggu Yahoo/RSS/DB ikut terlihat (frame socket / pool),
+    bukan hanya CPU. Pekerjaan di worker process (performance.process_workers) tampak sebagai
+    menunggu hasil di proses ini. Profiler dimulai SETELAH pool di-fork (lihat
+    pipeline.procpool): worker tidak mewarisi thread sampler maupun tracemalloc.
+  - tracemalloc (profiling.memory): memori ter-trace dibaca di setiap sampel (murah) -> peak dan
+    pertumbuhan per (stage, ticker) selama scope aktif. Stage yang berjalan bersamaan saling
+    memengaruhi angka ini: perlakukan sebagai petunjuk, bukan akuntansi per byte. Top-N alokasi
+    (file:line) dari satu snapshot di akhir run, setelah sampler berhenti: take_snapshot()
+    memakan detik, terlalu mahal untuk diambil di tengah run.
+
+Output di paths.logs:
+  profile_<mode>_b<batch>.collapsed  "stage;frame;...;frame count" (flamegraph.pl, speedscope, inferno)
+  profile_<mode>_b<batch>.json       top-N fungsi (self / total), sampel + memori per stage dan
+                                     ticker, top-N alokasi, overhead sampler
+
+Biaya: sampler memegang GIL ~puluhan mikrodetik per sampel (sampler_overhead_pct di laporan,
+~2-3% pada interval 10ms). tracemalloc memperlambat setiap alokasi Python dan merupakan
+komponen termahal; profiling.memory: false menyisakan sampling stack saja.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from src.config import get_settings
+from src.monitoring.metrics import RUN_METRICS, MAIN_SCOPE
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+
+MAX_DEPTH = 128
+
+# Dibuang dari top alokasi. Disaring setelah statistics() dan bukan lewat
+# Snapshot.filter_traces(), yang meloop setiap trace di Python (detik untuk ~300k blok)
+_ALLOC_NOISE = (tracemalloc.__file__, "<frozen importlib", "<unknown>")
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(PROJECT_ROOT + os.sep):
+        return os.path.relpath(filename, PROJECT_ROOT)
+    _, sep, rest = filename.rpartition("site-packages" + os.sep)
+    return rest if sep else os.path.basename(filename)
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.01, memory: bool = True, memory_frames: int = 1, top_n: int = 25):
+        self.interval = interval
+        self.memory = memory
+        self.memory_frames = memory_frames
+        self.top_n = top_n
+        self._labels = {}
+        self._stacks = Counter()   # (stage, frame, ..., frame) -> sampel
+        self._scopes = Counter()   # (stage, ticker) -> sampel
+        self._mem = {}             # (stage, ticker) -> [memori saat sampel pertama, peak]
+        self._end_stats = None
+        self._traced_peak = 0
+        self._samples = 0
+        self._sampler_s = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._owns_tracemalloc = False
+        self._started = 0.0
+        self._wall_s = 0.0
+
+    # SAMPLING
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.memory_frames)
+            self._owns_tracemalloc = True
+        self._main_ident = threading.main_thread().ident
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        print(f"[PROFILE] Sampling every {self.interval * 1000:.0f}ms"
+              f"{' + tracemalloc' if self.memory else ''}")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._wall_s = time.perf_counter() - self._started
+        if self.memory and tracemalloc.is_tracing():
+            self._traced_peak = max(self._traced_peak, tracemalloc.get_traced_memory()[1])
+            self._end_stats = self._top_allocations()
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter()
+            self._sample(own)
+            self._sampler_s += time.perf_counter() - start
+
+    def _sample(self, own: int):
+        scopes = RUN_METRICS.active_scopes()
+        traced = tracemalloc.get_traced_memory()[0] if self.memory else None
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            key = scopes.get(ident)
+            if key is None:
+                if ident != self._main_ident:
+                    continue  # worker pool yang sedang idle
+                key = MAIN_SCOPE
+            self._stacks[(key[0],) + self._stack(frame)] += 1
+            self._scopes[key] += 1
+            if traced is not None:
+                mem = self._mem.setdefault(key, [traced, traced])
+                mem[1] = max(mem[1], traced)
+        self._samples += 1
+        if traced is not None:
+            self._traced_peak = max(self._traced_peak, traced)
+
+    def _stack(self, frame) -> tuple:
+        labels = []
+        while frame is not None and len(labels) < MAX_DEPTH:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+                self._labels[code] = label
+            labels.append(label)
+            frame = frame.f_back
+        labels.reverse()
+        return tuple(labels)
+
+    def _top_allocations(self) -> list[dict]:
+        stats = tracemalloc.take_snapshot().statistics("lineno")
+        frames = [(s, s.traceback[0]) for s in stats]
+        return [
+            {"where": f"{_short_path(f.filename)}:{f.lineno}", "kb": round(s.size / 1024, 1), "blocks": s.count}
+            for s, f in frames if not f.filename.startswith(_ALLOC_NOISE)
+        ][:self.top_n]
+
+    # REPORT
+
+    def collapsed(self) -> list[str]:
+        return [f"{';'.join(stack)} {count}" for stack, count in sorted(self._stacks.items())]
+
+    def report(self) -> dict:
+        own, total = Counter(), Counter()
+        by_stage = {}
+        for stack, count in self._stacks.items():
+            stage, frames = stack[0], stack[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            by_stage.setdefault(stage, Counter())[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+
+        samples = sum(self._stacks.values())
+
+        def top(counter: Counter, n: int, of: int = samples) -> list[dict]:
+            return [
+                {"function": label, "samples": c, "pct": round(100 * c / of, 2) if of else 0.0}
+                for label, c in counter.most_common(n)
+            ]
+
+        stages, tickers = {}, {}
+        for (stage, ticker), count in self._scopes.items():
+            agg = stages.setdefault(stage, {"samples": 0, "est_s": 0.0, "peak_kb": 0.0, "growth_kb": 0.0})
+            agg["samples"] += count
+            agg["est_s"] = round(agg["samples"] * self.interval, 3)
+            entry = {"samples": count, "est_s": round(count * self.interval, 3)}
+            if (stage, ticker) in self._mem:
+                first, peak = self._mem[(stage, ticker)]
+                entry["peak_kb"] = round(peak / 1024, 1)
+                entry["growth_kb"] = round((peak - first) / 1024, 1)
+                agg["peak_kb"] = max(agg["peak_kb"], entry["peak_kb"])
+                agg["growth_kb"] = max(agg["growth_kb"], entry["growth_kb"])
+            if ticker != "*":
+                tickers.setdefault(ticker, {})[stage] = entry
+
+        return {
+            "wall_s": round(self._wall_s, 3),
+            "interval_ms": self.interval * 1000,
+            "ticks": self._samples,
+            "samples": samples,
+            "sampler_s": round(self._sampler_s, 3),
+            "sampler_overhead_pct": round(100 * self._sampler_s / self._wall_s, 2) if self._wall_s else 0.0,
+            "top_self": top(own, self.top_n),
+            "top_total": top(total, self.top_n),
+            "stages": {
+                stage: {**stages[stage], "top_self": top(by_stage.get(stage, Counter()), 5, stages[stage]["samples"])}
+                for stage in sorted(stages)
+            },
+            "tickers": dict(sorted(tickers.items())),
+            "memory": {
+                "enabled": self.memory,
+                "traced_peak_kb": round(self._traced_peak / 1024, 1),
+                "top_at_end": self._end_stats or [],
+            } if self.memory else {"enabled": False},
+        }
+
+    def write(self, path: str) -> dict:
+        """path tanpa ekstensi -> <path>.collapsed + <path>.json."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(f"{path}.collapsed", "w") as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        report = self.report()
+        with open(f"{path}.json", "w") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def print_report(self, report: dict | None = None, n: int = 10):
+        report = report or self.report()
+        print(f"\n[PROFILE] {report['samples']} samples over {report['wall_s']}s "
+              f"| sampler overhead {report['sampler_overhead_pct']}%")
+        print(f"{'stage':<20} {'samples':>8} {'est_s':>8} {'peak_kb':>10}")
+        for stage, s in report["stages"].items():
+            print(f"{stage:<20} {s['samples']:>8} {s['est_s']:>8} {s['peak_kb']:>10}")
+        print(f"\n{'self %':>7}  function")
+        for row in report["top_self"][:n]:
+            print(f"{row['pct']:>7}  {row['function']}")
+        if report["memory"]["enabled"]:
+            print(f"\n[PROFILE] tracemalloc peak {report['memory']['traced_peak_kb']} KB; "
+                  f"top allocations still held at end of run:")
+            for row in report["memory"]["top_at_end"][:n]:
+                print(f"{row['kb']:>10} KB  {row['where']}")
+
+
+def profiler_from_settings() -> SamplingProfiler:
+    cfg = get_settings().profiling
+    return SamplingProfiler(
+        interval=cfg.interval_ms / 1000,
+        memory=cfg.memory,
+        memory_frames=cfg.memory_frames,
+        top_n=cfg.top_n,
+    )
@@ -0,0 +1,302 @@
+"""
+Scheduler DAG untuk run harian.
+
+Setiap stage mendeklarasikan dependensi dan kelas resource-nya:
+  network -> I/O ke Yahoo / Google News (boleh paralel lebar)
+  cpu     -> inferensi model / komputasi berat (dibatasi jumlah core)
+  db      -> baca/tulis Postgres (dibatasi ukuran pool koneksi)
+
+Stage dijalankan di thread pool sesuai kelasnya begitu semua dependensinya selesai
+(sinyal completion dari future, bukan sleep). Stage independen otomatis overlap.
+
+Dua jenis dependensi:
+  requires -> stage hanya jalan jika dependensi SUKSES (gagal -> stage di-skip)
+  after    -> hanya urutan; stage tetap jalan walau dependensi gagal
+
+DAG boleh tumbuh selama berjalan: run(feed=...) memanggil feed(dag) di thread scheduler setiap
+kali stage selesai; feed boleh add() stage baru (mis. ticker yang baru di-claim dari work_queue
+saat slot network kosong, lihat idle()). Run selesai saat tidak ada stage berjalan dan feed
+tidak menambah stage lagi.
+
+Setelah run, report() memberi durasi, waktu tunggu antrean resource, utilisasi per
+kelas, dan critical path (rantai stage yang menentukan durasi total run).
+"""
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.monitoring.metrics import RUN_METRICS
+
+RESOURCE_CLASSES = ("network", "cpu", "db")
+DEFAULT_POOL_SIZES = {"network": 4, "cpu": 1, "db": 2}
+
+
+class Stage:
+    def __init__(self, name: str, fn, requires=(), after=(), resource: str = "network",
+                 critical: bool = True):
+        if resource not in RESOURCE_CLASSES:
+            raise ValueError(f"Unknown resource class '{resource}' for stage '{name}'")
+        self.name = name
+        self.fn = fn
+        self.requires = list(requires)
+        self.after = list(after)
+        self.resource = resource
+        self.critical = critical  # gagal -> run dianggap gagal (stage per-ticker: False)
+
+        self.status = "pending"  # pending | running | ok | failed | skipped
+        self.error = None
+        self.result = None  # nilai return fn (mis. jumlah baris)
+        self.ready_at = None
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def deps(self) -> list[str]:
+        return self.requires + self.after
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    @property
+    def wait(self) -> float:
+        """Waktu antre di pool resource setelah semua dependensi selesai."""
+        if self.ready_at is None or self.started_at is None:
+            return 0.0
+        return self.started_at - self.ready_at
+
+
+class DagScheduler:
+    def __init__(self, pool_sizes: dict | None = None, logger=None):
+        self.pool_sizes = dict(DEFAULT_POOL_SIZES)
+        self.pool_sizes.update(pool_sizes or {})
+        self.stages: dict[str, Stage] = {}
+        self.log = logger.info if logger else print
+        self._busy = {r: 0 for r in RESOURCE_CLASSES}  # stage antre / berjalan per kelas
+        self._t0 = None
+        self._t_end = None
+
+    def add(self, name: str, fn, requires=(), after=(), resource: str = "network",
+            critical: bool = True) -> str:
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage '{name}'")
+        self.stages[name] = Stage(name, fn, requires, after, resource, critical)
+        return name
+
+    def busy(self, resource: str) -> int:
+        return self._busy[resource]
+
+    def idle(self, resource: str) -> int:
+        """Slot worker kelas ini yang tidak terisi stage (antre atau berjalan)."""
+        return max(0, int(self.pool_sizes.get(resource, 1)) - self._busy[resource])
+
+    def _validate(self):
+        for s in self.stages.values():
+            for d in s.deps:
+                if d not in self.stages:
+                    raise ValueError(f"Stage '{s.name}' depends on unknown stage '{d}'")
+
+        # Kahn: pastikan tidak ada siklus
+        indeg = {n: len(s.deps) for n, s in self.stages.items()}
+        dependents = self._dependents()
+        ready = [n for n, k in indeg.items() if k == 0]
+        seen = 0
+        while ready:
+            n = ready.pop()
+            seen += 1
+            for m in dependents[n]:
+                indeg[m] -= 1
+                if indeg[m] == 0:
+                    ready.append(m)
+        if seen != len(self.stages):
+            cyclic = [n for n, k in indeg.items() if k > 0]
+            raise ValueError(f"Dependency cycle between stages: {cyclic[:10]}")
+
+    def _dependents(self) -> dict[str, list[str]]:
+        out = {n: [] for n in self.stages}
+        for s in self.stages.values():
+            for d in s.deps:
+                out[d].append(s.name)
+        return out
+
+    def _execute(self, stage: Stage):
+        stage.started_at = time.perf_counter()
+        stage.status = "running"
+        try:
+            # Scope metrik per thread: request/round trip/inferensi di stage ini teratribusi ke sini
+            with RUN_METRICS.scope(stage.name):
+                stage.result = stage.fn()
+                if isinstance(stage.result, int) and not isinstance(stage.result, bool):
+                    RUN_METRICS.incr("rows", stage.result)
+            stage.status = "ok"
+        except Exception as e:
+            stage.status = "failed"
+            stage.error = f"{type(e).__name__}: {e}"
+            self.log(f"[DAG] Stage {stage.name} failed: {stage.error}")
+        finally:
+            stage.finished_at = time.perf_counter()
+
+    def run(self, feed=None) -> dict[str, Stage]:
+        """feed(dag): dipanggil di awal dan setelah setiap stage selesai; boleh add() stage baru."""
+        self._validate()
+        dependents = self._dependents()
+        remaining = {n: len(s.deps) for n, s in self.stages.items()}
+        blocked = set()  # stage dengan dependensi 'requires' yang gagal/skip
+        done_q = queue.Queue()
+        in_flight = 0
+
+        pools = {
+            r: ThreadPoolExecutor(max_workers=max(1, int(self.pool_sizes.get(r, 1))), thread_name_prefix=f"dag-{r}")
+            for r in RESOURCE_CLASSES
+        }
+        self._t0 = time.perf_counter()
+
+        def submit(stage: Stage):
+            nonlocal in_flight
+            stage.ready_at = time.perf_counter()
+            in_flight += 1
+            self._busy[stage.resource] += 1
+            future = pools[stage.resource].submit(self._execute, stage)
+            future.add_done_callback(lambda _f, name=stage.name: done_q.put(name))
+
+        def settle(name: str):
+            """Stage selesai (jalan atau skip): lepaskan dependent yang kini siap."""
+            settled = [name]
+            while settled:
+                cur = self.stages[settled.pop()]
+                for m in dependents[cur.name]:
+                    if cur.status != "ok" and cur.name in self.stages[m].requires:
+                        blocked.add(m)
+                    remaining[m] -= 1
+                    if remaining[m] > 0:
+                        continue
+                    dep = self.stages[m]
+                    if m in blocked:
+                        dep.status = "skipped"
+                        settled.append(m)
+                    else:
+                        submit(dep)
+
+        def grow() -> bool:
+            """Daftarkan stage yang ditambahkan feed; dependensi yang sudah selesai langsung dihitung."""
+            added = [s for n, s in self.stages.items() if n not in remaining]
+            for s in added:
+                for d in s.deps:
+                    if d not in self.stages:
+                        raise ValueError(f"Stage '{s.name}' depends on unknown stage '{d}'")
+                dependents[s.name] = []
+                remaining[s.name] = 0
+                for d in s.deps:
+                    dep = self.stages[d]
+                    if dep.status in ("ok", "failed", "skipped"):
+                        if dep.status != "ok" and d in s.requires:
+                            blocked.add(s.name)
+                    else:
+                        dependents[d].append(s.name)
+                        remaining[s.name] += 1
+            for s in added:
+                if remaining[s.name] == 0:
+                    if s.name in blocked:
+                        s.status = "skipped"
+                        settle(s.name)
+                    else:
+                        submit(s)
+            return bool(added)
+
+        try:
+            # Urutan submit mengikuti urutan add() -> prioritas FIFO di dalam satu pool
+            for n, s in self.stages.items():
+                if remaining[n] == 0:
+                    submit(s)
+
+            while True:
+                grew = False
+                if feed is not None:
+                    feed(self)
+                    grew = grow()
+                if not in_flight:
+                    if grew:
+                        continue  # semua stage baru langsung skip: beri feed kesempatan lagi
+                    break
+                name = done_q.get()
+                in_flight -= 1
+                self._busy[self.stages[name].resource] -= 1
+                settle(name)
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+            self._t_end = time.perf_counter()
+
+        return self.stages
+
+    # REPORT
+
+    def critical_path(self) -> list[Stage]:
+        """
+        Rantai stage yang benar-benar menentukan selesainya run: mulai dari stage yang
+        selesai paling akhir, mundur ke dependensi yang selesai paling akhir.
+        """
+        executed = [s for s in self.stages.values() if s.finished_at is not None]
+        if not executed:
+            return []
+        cur = max(executed, key=lambda s: s.finished_at)
+        path = [cur]
+        while True:
+            preds = [self.stages[d] for d in cur.deps if self.stages[d].finished_at is not None]
+            if not preds:
+                break
+            cur = max(preds, key=lambda s: s.finished_at)
+            path.append(cur)
+        return list(reversed(path))
+
+    def report(self) -> dict:
+        wall = (self._t_end or time.perf_counter()) - (self._t0 or time.perf_counter())
+        counts = {}
+        for s in self.stages.values():
+            counts[s.status] = counts.get(s.status, 0) + 1
+
+        resources = {}
+        for r in RESOURCE_CLASSES:
+            members = [s for s in self.stages.values() if s.resource == r and s.finished_at is not None]
+            busy = sum(s.duration for s in members)
+            capacity = wall * self.pool_sizes.get(r, 1)
+            resources[r] = {
+                "workers": self.pool_sizes.get(r, 1),
+                "stages": len(members),
+                "busy_s": round(busy, 3),
+                "queue_wait_s": round(sum(s.wait for s in members), 3),
+                "utilization": round(busy / capacity, 3) if capacity > 0 else 0.0,
+            }
+
+        path = self.critical_path()
+        return {
+            "wall_s": round(wall, 3),
+            "status_counts": counts,
+            "resources": resources,
+            "critical_path": [
+                {
+                    "stage": s.name, "resource": s.resource, "status": s.status,
+                    "start_s": round(s.started_at - self._t0, 3),
+                    "duration_s": round(s.duration, 3),
+                    "queue_wait_s": round(s.wait, 3),
+                }
+                for s in path
+            ],
+            "critical_path_s": round(sum(s.duration + s.wait for s in path), 3),
+            "failed": {s.name: s.error for s in self.stages.values() if s.status == "failed"},
+            "skipped": [s.name for s in self.stages.values() if s.status == "skipped"],
+        }
+
+    def print_report(self, report: dict | None = None):
+        report = report or self.report()
+        self.log(f"[DAG] Wall time {report['wall_s']}s | {report['status_counts']}")
+        for r, m in report["resources"].items():
+            if m["stages"]:
+                self.log(f"[DAG]   {r:<8} workers={m['workers']} stages={m['stages']} "
+                         f"busy={m['busy_s']}s wait={m['queue_wait_s']}s util={m['utilization']:.0%}")
+        self.log(f"[DAG] Critical path ({report['critical_path_s']}s):")
+        for step in report["critical_path"]:
+            self.log(f"[DAG]   +{step['start_s']:>8.2f}s {step['stage']:<32} {step['resource']:<8} "
+                     f"{step['duration_s']:.2f}s (queued {step['queue_wait_s']:.2f}s) {step['status']}")
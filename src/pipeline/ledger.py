@@ -0,0 +1,135 @@
+"""
+Run ledger: status setiap (run_date, ticker, stage) yang sudah dieksekusi.
+
+Ledger ditulis SETELAH DAG satu batch selesai (termasuk flush write buffer) -- atau, di mode
+antrean, per checkpoint setelah flush -- jadi baris 'ok' berarti datanya sudah durable di DB. Runner yang crash di tengah batch hanya
+kehilangan batch itu; --resume melewati semua yang sudah 'ok' untuk hari yang sama dan
+--retry-failed hanya menjalankan ulang yang 'failed'/'skipped'.
+"""
+from sqlalchemy import text
+
+from src.database.bulk import bulk_upsert
+
+GLOBAL_TICKER = "*"
+
+# Stage unit yang dicatat ledger (nama stage DAG: '<jenis>:<ticker>' atau nama global)
+TICKER_STAGES = ["prices", "indicators", "sentiment", "fundamentals"]
+GLOBAL_STAGES = ["macro_prices", "macro_sentiment", "stock_metadata"]
+
+# Stage yang harus ikut diulang jika dependensinya diulang (data input-nya berubah)
+DOWNSTREAM = {"prices": ["indicators"]}
+
+FRESH, RESUME, RETRY_FAILED = "fresh", "resume", "retry-failed"
+
+
+def split_stage(name: str) -> tuple[str, str] | None:
+    """'prices:BBCA.JK' -> ('BBCA.JK', 'prices'); 'macro_prices' -> ('*', 'macro_prices')."""
+    if name in GLOBAL_STAGES:
+        return GLOBAL_TICKER, name
+    kind, _, ticker = name.partition(":")
+    if ticker and kind in TICKER_STAGES:
+        return ticker, kind
+    return None
+
+
+class RunLedger:
+    def __init__(self, engine, run_date):
+        self.engine = engine
+        self.run_date = run_date
+
+    def load(self, tickers: list[str] | None = None) -> dict[tuple[str, str], str]:
+        sql = "SELECT ticker, stage, status FROM run_ledger WHERE run_date = :d"
+        params = {"d": self.run_date}
+        if tickers is not None:
+            sql += " AND ticker = ANY(:tickers)"
+            params["tickers"] = list(tickers)
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(sql), params).fetchall()
+        return {(t, s): status for t, s, status in rows}
+
+    def plan(self, tickers: list[str], strategy: str = FRESH, schedule=None) -> dict[str, list[str]]:
+        """
+        {ticker: [stage yang perlu dijalankan]} untuk ticker (dan '*' untuk stage global).
+        Ticker tanpa stage tersisa tidak muncul di hasil.
+
+        schedule (TierSchedule, opsional): stage per-ticker yang belum jatuh tempo untuk
+        tier-nya dibuang. Tidak berlaku untuk retry-failed (yang gagal selalu diulang).
+        """
+        state = {} if strategy == FRESH else self.load(tickers)
+        last_ok = {}
+        if schedule is not None and strategy != RETRY_FAILED:
+            last_ok = schedule.last_success(self.engine, [t for t in tickers if t != GLOBAL_TICKER], self.run_date)
+        plan = {}
+        for ticker in tickers:
+            kinds = GLOBAL_STAGES if ticker == GLOBAL_TICKER else TICKER_STAGES
+            if strategy == FRESH:
+                todo = list(kinds)
+            elif strategy == RESUME:
+                todo = [k for k in kinds if state.get((ticker, k)) != "ok"]
+            elif strategy == RETRY_FAILED:
+                todo = [k for k in kinds if state.get((ticker, k)) in ("failed", "skipped")]
+            else:
+                raise ValueError(f"Unknown ledger strategy '{strategy}'")
+
+            if schedule is not None and strategy != RETRY_FAILED and ticker != GLOBAL_TICKER:
+                todo = [k for k in todo if schedule.due(ticker, k, last_ok.get((ticker, k)), self.run_date)]
+
+            for k in list(todo):
+                for down in DOWNSTREAM.get(k, []):
+                    if down in kinds and down not in todo:
+                        todo.append(down)
+            if todo:
+                plan[ticker] = [k for k in kinds if k in todo]
+        return plan
+
+    def record_dag(self, dag) -> int:
+        """Catat hasil stage unit dari satu DAG yang sudah selesai dijalankan."""
+        flush_failed = [
+            s.name for s in dag.stages.values()
+            if s.name.startswith("flush_") and s.status != "ok"
+        ]
+        return self.record_stages(dag.stages.values(), flush_failed)
+
+    def record_stages(self, stages, flush_failed: list[str] | None = None) -> int:
+        """
+        Catat stage unit tertentu (checkpoint mode antrean: stage ticker yang sudah selesai,
+        setelah buffer di-flush). flush_failed: nama flush yang gagal -> stage ticker 'ok' belum durable.
+        """
+        rows = []
+        for stage in stages:
+            key = split_stage(stage.name)
+            if key is None or stage.status in ("pending", "running"):
+                continue
+            ticker, kind = key
+            status, error = stage.status, stage.error
+            # Stage per-ticker menulis lewat write buffer: belum durable kalau flush gagal
+            if status == "ok" and ticker != GLOBAL_TICKER and flush_failed:
+                status, error = "failed", f"write buffer flush failed ({', '.join(flush_failed)})"
+            result = stage.result
+            rows.append({
+                "run_date": self.run_date, "ticker": ticker, "stage": kind, "status": status,
+                "duration": round(stage.duration, 3),
+                "rows": result if isinstance(result, int) and not isinstance(result, bool) else None,
+                "error": error,
+            })
+        if not rows:
+            return 0
+        with self.engine.begin() as conn:
+            bulk_upsert(
+                conn, "run_ledger", rows,
+                conflict_cols=["run_date", "ticker", "stage"],
+                update_cols=["status", "duration", "rows", "error"],
+                extra_set="attempts = run_ledger.attempts + 1, updated_at = NOW()",
+            )
+        return len(rows)
+
+    def summary(self) -> dict:
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT stage, status, COUNT(*) FROM run_ledger WHERE run_date = :d GROUP BY stage, status"),
+                {"d": self.run_date}
+            ).fetchall()
+        out = {}
+        for stage, status, n in rows:
+            out.setdefault(stage, {})[status] = n
+        return out
@@ -0,0 +1,105 @@
+"""
+Process pool (fork) untuk kerja CPU: inferensi IndoBERT dan calculate_indicators.
+
+Model dimuat SEKALI di proses induk, lalu worker di-fork: bobot model (tensor torch) dibagi
+copy-on-write -- N worker tidak berarti N salinan model di RAM. Setiap worker tetap
+torch.set_num_threads(1), jadi N worker = N core terpakai penuh.
+
+Pemakaian (satu pool per proses, dipasang global):
+    with ProcessPool(4, preload=[get_engine]):
+        ...  # thread stage DAG memanggil run_cpu(fn, *args) -> dieksekusi di worker
+
+Urutan penting: pool harus dibuat SEBELUM thread lain / koneksi DB dibuka (fork hanya
+menyalin thread pemanggil; lock yang sedang dipegang thread lain ikut tersalin terkunci).
+Tanpa pool aktif (atau di dalam worker) run_cpu() menjalankan fungsi langsung.
+"""
+import gc
+import multiprocessing
+import tracemalloc
+
+_pool = None
+
+
+def _child_init():
+    # Di worker: jangan meneruskan run_cpu ke pool lagi (pool milik induk)
+    global _pool
+    _pool = None
+    # tracemalloc aktif di induk saat fork (mis. PYTHONTRACEMALLOC) memperlambat setiap
+    # alokasi di worker; hasilnya tidak pernah dibaca
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def active() -> bool:
+    return _pool is not None
+
+
+def run_cpu(fn, *args, **kwargs):
+    """Jalankan fn di worker pool jika aktif (blocking; aman dipanggil dari banyak thread)."""
+    if _pool is None:
+        return fn(*args, **kwargs)
+    return _pool.apply_async(fn, args, kwargs).get()
+
+
+class ProcessPool:
+    def __init__(self, workers: int, preload=()):
+        self.workers = workers
+        self.preload = list(preload)
+        self.pool = None
+        self.pids = []
+
+    def start(self) -> "ProcessPool":
+        global _pool
+        if "fork" not in multiprocessing.get_all_start_methods():
+            print("[PROCPOOL] fork not available on this platform, running CPU work in-process")
+            return self
+        for load in self.preload:
+            load()
+        # Objek yang sudah ada dipindah ke generasi permanen: GC worker tidak menulis ke
+        # header objek induk, sehingga halaman memori itu tetap shared (tidak ter-copy)
+        gc.freeze()
+        self.pool = multiprocessing.get_context("fork").Pool(self.workers, initializer=_child_init)
+        self.pids = sorted(p.pid for p in multiprocessing.active_children())
+        _pool = self.pool
+        print(f"[PROCPOOL] {self.workers} fork worker(s) ready (pids {self.pids})")
+        return self
+
+    def stop(self):
+        global _pool
+        if self.pool is None:
+            return
+        _pool = None
+        self.pool.close()
+        self.pool.join()
+        self.pool = None
+        gc.unfreeze()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.pool is not None:
+            self.pool.terminate()
+        self.stop()
+
+
+def memory_breakdown(pids: list[int]) -> dict[int, dict]:
+    """Per proses: rss / pss / private (MB) dari /proc/<pid>/smaps_rollup (Linux)."""
+    out = {}
+    for pid in pids:
+        fields = {}
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    key, _, rest = line.partition(":")
+                    if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean", "Shared_Dirty"):
+                        fields[key] = int(rest.split()[0]) / 1024
+        except OSError:
+            continue
+        out[pid] = {
+            "rss_mb": round(fields.get("Rss", 0), 1),
+            "pss_mb": round(fields.get("Pss", 0), 1),
+            "private_mb": round(fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0), 1),
+            "shared_mb": round(fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0), 1),
+        }
+    return out
@@ -0,0 +1,129 @@
+"""
+Kalender sesi bursa IDX: Senin-Jumat dikurangi hari libur di config/idx_holidays.yaml.
+
+Indeks tanggal sesi dihitung sekali (array terurut + dict tanggal -> posisi), jadi semua
+query (is_session, sesi yang hilang sejak tanggal X, geser N sesi) cukup lookup / bisect.
+
+Dipakai untuk:
+  - mine_daily: lewati stage saham di hari non-sesi (cron jalan Senin-Jumat apa adanya)
+  - prices: hitung sesi yang benar-benar belum tersimpan per ticker dan ukur window
+    download sesuai itu; sesi yang tidak dikembalikan provider = gap data, bukan libur
+  - bar_starts(): jam bar intraday per sesi (provider palsu intraday)
+
+Tahun di luar file libur jatuh ke Senin-Jumat (warning sekali), supaya kalender yang
+belum diperbarui tidak pernah menghentikan pipeline.
+"""
+import bisect
+import os
+from datetime import date, datetime, time, timedelta
+
+import pandas as pd
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+
+HOLIDAYS_PATH = os.path.join(PROJECT_ROOT, "config", "idx_holidays.yaml")
+# Rentang indeks di luar tahun yang tercantum (histori lama / beberapa tahun ke depan)
+INDEX_START = date(2000, 1, 1)
+INDEX_YEARS_AHEAD = 2
+
+EXCHANGE_TZ = "Asia/Jakarta"
+# Jam sesi reguler (WIB). Disederhanakan: Jumat sebenarnya istirahat lebih panjang
+SESSION_HOURS = [(time(9, 0), time(12, 0)), (time(13, 30), time(16, 0))]
+
+_calendar = None
+
+
+def load_holidays(path: str = HOLIDAYS_PATH) -> dict[int, set[date]]:
+    if not os.path.exists(path):
+        return {}
+    import yaml
+    with open(path, "r") as f:
+        raw = yaml.safe_load(f) or {}
+    return {int(year): {pd.Timestamp(d).date() for d in (days or [])} for year, days in raw.items()}
+
+
+class TradingCalendar:
+    def __init__(self, holidays: dict[int, set[date]], start: date = INDEX_START, end: date | None = None):
+        self.covered_years = set(holidays)
+        all_holidays = set().union(*holidays.values()) if holidays else set()
+        end = end or date(max(self.covered_years | {date.today().year}) + INDEX_YEARS_AHEAD, 12, 31)
+        self.sessions = [d.date() for d in pd.bdate_range(start, end) if d.date() not in all_holidays]
+        self._index = {d: i for i, d in enumerate(self.sessions)}
+        self._warned = set()
+
+    def _check_coverage(self, d: date):
+        if d.year not in self.covered_years and d.year not in self._warned and d >= INDEX_START:
+            self._warned.add(d.year)
+            print(f"[CALENDAR] No IDX holidays configured for {d.year}, assuming Monday-Friday sessions")
+
+    def is_session(self, d: date) -> bool:
+        self._check_coverage(d)
+        return d in self._index
+
+    def last_session(self, d: date) -> date | None:
+        """Sesi terakhir pada atau sebelum d."""
+        i = bisect.bisect_right(self.sessions, d)
+        return self.sessions[i - 1] if i else None
+
+    def last_closed_session(self, now: datetime) -> date | None:
+        """Sesi terakhir yang sudah tutup pada `now` (WIB): hari ini hanya setelah jam tutup sesi."""
+        now = pd.Timestamp(now).tz_convert(EXCHANGE_TZ) if pd.Timestamp(now).tzinfo else pd.Timestamp(now)
+        today = now.date()
+        if now.time() >= SESSION_HOURS[-1][1]:
+            return self.last_session(today)
+        return self.last_session(today - timedelta(days=1))
+
+    def shift(self, d: date, n: int) -> date:
+        """Sesi ke-n dari d (n negatif = mundur). d non-sesi dihitung dari sesi sebelumnya."""
+        base = self._index.get(d)
+        if base is None:
+            base = bisect.bisect_right(self.sessions, d) - 1
+        return self.sessions[max(0, min(len(self.sessions) - 1, base + n))]
+
+    def sessions_between(self, start: date, end: date) -> list[date]:
+        """Sesi pada [start, end]."""
+        self._check_coverage(end)
+        lo = bisect.bisect_left(self.sessions, start)
+        hi = bisect.bisect_right(self.sessions, end)
+        return self.sessions[lo:hi]
+
+    def missing_sessions(self, last_stored: date | None, through: date) -> list[date]:
+        """Sesi setelah last_stored sampai through (inklusif) -- yang seharusnya sudah ada di DB."""
+        if last_stored is None:
+            return []
+        return self.sessions_between(last_stored + timedelta(days=1), through)
+
+
+def bar_starts(d: date, interval_min: int) -> pd.DatetimeIndex:
+    """Waktu mulai bar intraday (tz WIB) untuk satu hari sesi."""
+    starts = []
+    for open_t, close_t in SESSION_HOURS:
+        t = pd.Timestamp(datetime.combine(d, open_t))
+        end = pd.Timestamp(datetime.combine(d, close_t))
+        while t < end:
+            starts.append(t)
+            t += pd.Timedelta(minutes=interval_min)
+    return pd.DatetimeIndex(starts, name="Datetime").tz_localize(EXCHANGE_TZ)
+
+
+def get_calendar() -> TradingCalendar:
+    global _calendar
+    if _calendar is None:
+        _calendar = TradingCalendar(load_holidays())
+    return _calendar
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser("IDX Trading Calendar")
+    parser.add_argument("--year", type=int, default=date.today().year)
+    args = parser.parse_args()
+
+    cal = get_calendar()
+    days = cal.sessions_between(date(args.year, 1, 1), date(args.year, 12, 31))
+    weekdays = len(pd.bdate_range(date(args.year, 1, 1), date(args.year, 12, 31)))
+    print(f"{args.year}: {len(days)} sessions, {weekdays - len(days)} weekday holidays"
+          f"{'' if args.year in cal.covered_years else ' (not configured)'}")
+    print(f"today {date.today()} is_session={cal.is_session(date.today())} last_session={cal.last_session(date.today())}")
@@ -0,0 +1,164 @@
+"""
+Universe ticker bertingkat (tier) berdasarkan likuiditas, dan jadwal refresh per tier.
+
+refresh_universe() (dijalankan job --init, atau CLI di bawah):
+  1. sinkronkan daftar ticker (tickers.json) ke tabel ticker_universe
+  2. hitung median nilai transaksi harian (close * volume) N hari bursa terakhir dari
+     technical_prices, lalu tetapkan tier dari ambang di settings.yaml (universe.tiers)
+
+TierSchedule dipakai RunLedger.plan(): stage yang belum jatuh tempo untuk tier-nya
+(berdasarkan tanggal 'ok' terakhir di run_ledger) tidak masuk plan hari ini.
+Ticker tanpa tier (baru / belum punya histori) diperlakukan sebagai DEFAULT_TIER.
+
+Contoh:
+  python -m src.pipeline.universe --refresh
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from src.config import get_settings
+from src.database.bulk import bulk_upsert
+
+DEFAULT_TIER = 1
+
+LIQUIDITY_SQL = """
+    SELECT s.ticker,
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY r.close * r.volume),
+           AVG(r.volume),
+           COUNT(*) FILTER (WHERE r.volume > 0)
+    FROM (
+        SELECT stock_id, close, volume,
+               row_number() OVER (PARTITION BY stock_id ORDER BY date DESC) AS rn
+        FROM technical_prices
+        WHERE date >= :since
+    ) r
+    JOIN stocks s ON s.id = r.stock_id
+    WHERE r.rn <= :n AND s.ticker = ANY(:tickers)
+    GROUP BY s.ticker
+"""
+
+LAST_OK_SQL = """
+    SELECT ticker, stage, MAX(run_date)
+    FROM run_ledger
+    WHERE status = 'ok' AND run_date >= :since AND run_date < :d AND ticker = ANY(:tickers)
+    GROUP BY ticker, stage
+"""
+
+
+def assign_tier(median_value: float | None, thresholds: dict[int, float]) -> int | None:
+    if median_value is None:
+        return None
+    for tier in sorted(thresholds):
+        if median_value >= thresholds[tier]:
+            return tier
+    return max(thresholds) + 1
+
+
+def sync_universe(engine, tickers_info: list[dict]) -> int:
+    """Tambah ticker baru / perbarui nama; tier & status aktif yang sudah ada tidak disentuh."""
+    rows = [{"ticker": t["ticker"], "name": t.get("name")} for t in tickers_info]
+    with engine.begin() as conn:
+        return bulk_upsert(conn, "ticker_universe", rows, conflict_cols=["ticker"], update_cols=["name"])
+
+
+def compute_tiers(engine) -> dict[str, int]:
+    cfg = get_settings().universe
+    n = cfg.lookback_days
+    with engine.connect() as conn:
+        tickers = [r[0] for r in conn.execute(text("SELECT ticker FROM ticker_universe")).fetchall()]
+        # Kalender ~2x window: cukup untuk N hari bursa + libur, dan memangkas partisi lama
+        stats = conn.execute(
+            text(LIQUIDITY_SQL),
+            {"since": date.today() - timedelta(days=n * 2 + 10), "n": n, "tickers": tickers}
+        ).fetchall()
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    for ticker, median_value, avg_volume, active_days in stats:
+        median_value = float(median_value) if median_value is not None else None
+        rows.append({
+            "ticker": ticker,
+            "tier": assign_tier(median_value, cfg.tiers),
+            "median_traded_value": median_value,
+            "avg_volume": float(avg_volume) if avg_volume is not None else None,
+            "active_days": int(active_days),
+            "tier_updated_at": now,
+        })
+    with engine.begin() as conn:
+        bulk_upsert(conn, "ticker_universe", rows, conflict_cols=["ticker"],
+                    update_cols=["tier", "median_traded_value", "avg_volume", "active_days", "tier_updated_at"])
+
+    counts = {}
+    for r in sorted(rows, key=lambda r: r["tier"]):
+        counts[f"tier_{r['tier']}"] = counts.get(f"tier_{r['tier']}", 0) + 1
+    counts["unranked"] = len(tickers) - len(rows)  # belum punya histori harga
+    return counts
+
+
+def refresh_universe(engine, tickers_info: list[dict]) -> dict:
+    synced = sync_universe(engine, tickers_info)
+    counts = compute_tiers(engine)
+    print(f"[UNIVERSE] {synced} tickers synced | {counts}")
+    return counts
+
+
+def load_universe(engine) -> dict[str, dict]:
+    """{ticker: {"tier", "is_active"}} dari ticker_universe."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT ticker, tier, is_active FROM ticker_universe")).fetchall()
+    return {t: {"tier": tier, "is_active": active} for t, tier, active in rows}
+
+
+class TierSchedule:
+    def __init__(self, tiers: dict[str, int | None], schedules: dict[int, dict[str, int]]):
+        self.tiers = tiers
+        self.schedules = schedules
+
+    @classmethod
+    def from_settings(cls, universe: dict[str, dict]) -> "TierSchedule":
+        return cls({t: u["tier"] for t, u in universe.items()}, get_settings().universe.schedules)
+
+    def tier(self, ticker: str) -> int:
+        tier = self.tiers.get(ticker) or DEFAULT_TIER
+        # Tier di luar jadwal (mis. ambang ditambah tanpa jadwal) -> jadwal tier terendah
+        return tier if tier in self.schedules else max(self.schedules)
+
+    def interval(self, ticker: str, stage: str) -> int:
+        return self.schedules[self.tier(ticker)].get(stage, 1)
+
+    def max_interval(self) -> int:
+        return max((d for stages in self.schedules.values() for d in stages.values()), default=1)
+
+    def last_success(self, engine, tickers: list[str], run_date) -> dict[tuple[str, str], date]:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text(LAST_OK_SQL),
+                {"since": run_date - timedelta(days=self.max_interval()), "d": run_date, "tickers": list(tickers)}
+            ).fetchall()
+        return {(t, s): d for t, s, d in rows}
+
+    def due(self, ticker: str, stage: str, last_ok: date | None, run_date) -> bool:
+        interval = self.interval(ticker, stage)
+        return interval <= 1 or last_ok is None or (run_date - last_ok).days >= interval
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.config import get_tickers
+    from src.database.connection import get_db_engine
+
+    parser = argparse.ArgumentParser("Ticker Universe")
+    parser.add_argument("--refresh", action="store_true", help="Sinkronkan tickers.json dan hitung ulang tier")
+    args = parser.parse_args()
+
+    engine = get_db_engine()
+    if args.refresh:
+        refresh_universe(engine, get_tickers("indonesia"))
+    with engine.connect() as conn:
+        for tier, n, med in conn.execute(text(
+            "SELECT tier, COUNT(*), percentile_cont(0.5) WITHIN GROUP (ORDER BY median_traded_value) "
+            "FROM ticker_universe WHERE is_active GROUP BY tier ORDER BY tier NULLS LAST"
+        )).fetchall():
+            print(f"  tier {tier}: {n} tickers (median traded value {med or 0:,.0f})")
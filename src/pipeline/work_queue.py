@@ -0,0 +1,237 @@
+"""
+Antrean kerja berbasis tabel work_queue untuk load balancing antar runner shard.
+
+- seed(): setiap runner boleh memanggil (idempotent, ON CONFLICT DO NOTHING). Setiap
+  ticker diberi est_cost = median durasi beberapa run terakhirnya.
+- Session: semua shard satu run berbagi session_id (GitHub run id + attempt), dicap saat seed
+  dan saat claim. seed(fresh=True) (strategi FRESH) mengembalikan baris run_date ini milik
+  session LAIN ke 'pending', jadi rerun di hari yang sama benar-benar mengerjakan ulang; shard
+  sesama session tidak saling reset. requeue(release_claims=True) (--resume / --retry-failed)
+  melepas claim runner yang crash tanpa menunggu lease-nya habis.
+- claim(): ambil N ticker termahal yang belum dikerjakan dengan
+  SELECT ... FOR UPDATE SKIP LOCKED -> runner tidak saling menunggu / dobel ambil.
+  Urutan termahal-dulu (LPT) membuat semua runner selesai hampir bersamaan.
+- Lease: ticker yang di-claim punya lease_until; runner yang crash berhenti
+  memperpanjang lease, dan ticker-nya bisa di-claim ulang runner lain.
+"""
+import os
+import socket
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from src.database.bulk import bulk_upsert
+
+DEFAULT_LEASE_SECONDS = 900
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_COST_HISTORY = 5
+
+CLAIM_SQL = """
+    UPDATE work_queue q
+    SET status = 'claimed',
+        claimed_by = :worker,
+        session_id = :session,
+        lease_until = now() + make_interval(secs => CAST(:lease AS double precision)),
+        attempts = q.attempts + 1,
+        started_at = now()
+    FROM (
+        SELECT run_date, ticker FROM work_queue
+        WHERE run_date = :d
+          AND attempts < :max_attempts
+          AND (status = 'pending' OR (status = 'claimed' AND lease_until < now()))
+        ORDER BY est_cost DESC, ticker
+        LIMIT :n
+        FOR UPDATE SKIP LOCKED
+    ) c
+    WHERE q.run_date = c.run_date AND q.ticker = c.ticker
+    RETURNING q.ticker, q.est_cost, q.attempts
+"""
+
+# FRESH: baris hari ini dari session sebelumnya (done / failed / lease lama) dikerjakan ulang
+RESET_SQL = """
+    UPDATE work_queue
+    SET status = 'pending', attempts = 0, claimed_by = NULL, lease_until = NULL, error = NULL,
+        duration = NULL, started_at = NULL, finished_at = NULL, session_id = :session
+    WHERE run_date = :d AND ticker = ANY(:tickers) AND session_id IS DISTINCT FROM :session
+"""
+
+# Claim yang lease-nya habis atau milik session lain (runner run sebelumnya yang crash)
+RELEASE_SQL = """
+    UPDATE work_queue
+    SET status = 'pending', attempts = 0, claimed_by = NULL, lease_until = NULL
+    WHERE run_date = :d AND status = 'claimed'
+      AND (lease_until < now() OR session_id IS DISTINCT FROM :session)
+"""
+
+# Lease habis dan jatah attempt sudah terpakai -> jangan di-claim lagi selamanya
+REAP_SQL = """
+    UPDATE work_queue
+    SET status = 'failed', error = 'lease expired after max attempts', finished_at = now()
+    WHERE run_date = :d AND status = 'claimed' AND lease_until < now() AND attempts >= :max_attempts
+"""
+
+COST_HISTORY_SQL = """
+    SELECT ticker, percentile_cont(0.5) WITHIN GROUP (ORDER BY duration)
+    FROM (
+        SELECT ticker, duration,
+               row_number() OVER (PARTITION BY ticker ORDER BY run_date DESC) AS rn
+        FROM work_queue
+        WHERE status = 'done' AND duration IS NOT NULL AND run_date < :d
+          AND ticker = ANY(:tickers)
+    ) h
+    WHERE rn <= :n
+    GROUP BY ticker
+"""
+
+
+def default_worker_id(suffix: str = "") -> str:
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    return f"{worker}-{suffix}" if suffix else worker
+
+
+def default_session_id() -> str:
+    """Satu id untuk semua shard matrix GitHub Actions; di luar CI setiap proses = session sendiri."""
+    run_id = os.getenv("GITHUB_RUN_ID")
+    if run_id:
+        return f"gh-{run_id}-{os.getenv('GITHUB_RUN_ATTEMPT', '1')}"
+    return default_worker_id()
+
+
+class WorkQueue:
+    def __init__(self, engine, run_date, worker_id: str | None = None, session_id: str | None = None,
+                 lease_seconds: int = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 cost_history: int = DEFAULT_COST_HISTORY):
+        self.engine = engine
+        self.run_date = run_date
+        self.worker_id = worker_id or default_worker_id()
+        self.session_id = session_id or default_session_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.cost_history = cost_history
+
+    def estimate_costs(self, tickers: list[str]) -> dict[str, float]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(COST_HISTORY_SQL),
+                {"d": self.run_date, "tickers": list(tickers), "n": self.cost_history}
+            ).fetchall()
+        known = {t: float(c) for t, c in rows}
+        # Ticker tanpa histori dianggap mahal: dikerjakan awal, bukan jadi ekor di akhir run
+        fallback = max(known.values()) if known else 1.0
+        return {t: known.get(t, fallback) for t in tickers}
+
+    def seed(self, tickers: list[str], fresh: bool = False) -> int:
+        """
+        Masukkan ticker hari ini ke antrean (ticker yang sudah ada tidak disentuh).
+        fresh: baris hari ini dari session lain direset ke 'pending' dulu (return tetap jumlah ticker).
+        """
+        costs = self.estimate_costs(tickers)
+        rows = [{"run_date": self.run_date, "ticker": t, "est_cost": costs[t], "session_id": self.session_id}
+                for t in tickers]
+        with self.engine.begin() as conn:
+            if fresh:
+                reset = conn.execute(
+                    text(RESET_SQL), {"d": self.run_date, "tickers": list(tickers), "session": self.session_id}
+                ).rowcount
+                if reset:
+                    print(f"[QUEUE] Reset {reset} ticker(s) from an earlier session to pending (fresh run)")
+            bulk_upsert(conn, "work_queue", rows, conflict_cols=["run_date", "ticker"])
+        return len(rows)
+
+    def claim(self, n: int) -> list[str]:
+        params = {"d": self.run_date, "max_attempts": self.max_attempts}
+        with self.engine.begin() as conn:
+            conn.execute(text(REAP_SQL), params)
+            rows = conn.execute(
+                text(CLAIM_SQL),
+                {**params, "worker": self.worker_id, "session": self.session_id,
+                 "lease": self.lease_seconds, "n": n}
+            ).fetchall()
+        for ticker, _, attempts in rows:
+            if attempts > 1:
+                print(f"[QUEUE] Re-claimed {ticker} (attempt {attempts}, previous lease expired)")
+        return [r[0] for r in sorted(rows, key=lambda r: -r[1])]
+
+    def renew(self, tickers: list[str]):
+        if not tickers:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("""
+                    UPDATE work_queue
+                    SET lease_until = now() + make_interval(secs => CAST(:lease AS double precision))
+                    WHERE run_date = :d AND ticker = ANY(:tickers) AND claimed_by = :worker AND status = 'claimed'
+                """),
+                {"d": self.run_date, "tickers": list(tickers), "worker": self.worker_id, "lease": self.lease_seconds}
+            )
+
+    @contextmanager
+    def leased(self, tickers):
+        """
+        Perpanjang lease di background selama blok berjalan (heartbeat tiap lease/3).
+        tickers dibaca ulang setiap heartbeat: boleh set yang terus berubah (mode antrean dinamis).
+        """
+        stop = threading.Event()
+
+        def keeper():
+            while not stop.wait(self.lease_seconds / 3):
+                try:
+                    self.renew(list(tickers))
+                except Exception as e:
+                    print(f"[QUEUE] Lease renewal failed: {e}")
+
+        thread = threading.Thread(target=keeper, name="work-queue-lease", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, outcomes: dict[str, tuple]):
+        """outcomes: {ticker: (status 'done'|'failed', duration_s, error)}"""
+        if not outcomes:
+            return
+        params = [
+            {"d": self.run_date, "t": t, "worker": self.worker_id, "s": status, "dur": duration, "e": error}
+            for t, (status, duration, error) in outcomes.items()
+        ]
+        with self.engine.begin() as conn:
+            # claimed_by: jangan menimpa ticker yang lease-nya sudah diambil alih runner lain
+            conn.execute(
+                text("""
+                    UPDATE work_queue
+                    SET status = :s, duration = :dur, error = :e, finished_at = now(), lease_until = NULL
+                    WHERE run_date = :d AND ticker = :t AND claimed_by = :worker
+                """),
+                params
+            )
+
+    def requeue(self, statuses=("failed",), release_claims: bool = False) -> int:
+        """
+        Kembalikan ticker berstatus tertentu ke 'pending' (attempt direset), mis. untuk --retry-failed.
+        release_claims: lepaskan juga claim yang lease-nya habis atau milik session lain.
+        """
+        n = 0
+        with self.engine.begin() as conn:
+            if statuses:
+                n += conn.execute(
+                    text("""
+                        UPDATE work_queue
+                        SET status = 'pending', attempts = 0, claimed_by = NULL, lease_until = NULL, error = NULL
+                        WHERE run_date = :d AND status = ANY(:statuses)
+                    """),
+                    {"d": self.run_date, "statuses": list(statuses)}
+                ).rowcount
+            if release_claims:
+                n += conn.execute(text(RELEASE_SQL), {"d": self.run_date, "session": self.session_id}).rowcount
+        return n
+
+    def progress(self) -> dict:
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT status, COUNT(*) FROM work_queue WHERE run_date = :d GROUP BY status"),
+                {"d": self.run_date}
+            ).fetchall()
+        return {s: n for s, n in rows}
@@ -2,20 +2,40 @@ import os
 import sys
 import logging
 import argparse
+import json
+import time
+from contextlib import nullcontext
 from datetime import datetime
+from functools import partial
 import pytz
 
 # Tambahkan project root ke sys.path agar bisa import src
 sys.path.append(os.getcwd())
 
-from src.collectors.prices import load_tickers, fetch_and_store
+from src.config import get_settings, override
+from src.collectors.prices import load_tickers, fetch_and_store, register_stocks, price_windows
 from src.collectors.macro import collect_macro
 from src.collectors.sentiment import collect_sentiment
 from src.collectors.macro_sentiment import collect_macro_sentiment
 from src.collectors.fundamental import FundamentalCollector
+from src.collectors.metadata import enrich_metadata
+from src.collectors.ratelimit import controller_stats
+from src.collectors.intraday import watermarks as intraday_watermarks, fetch_intraday
 from src.features.technical import update_indicators_for_ticker
-from src.database.connection import engine
-from src.database.schema import init_tables
+from src.database.connection import get_db_engine, describe_config, pool_metrics, is_duckdb, set_backend
+from src.database.schema import migrate
+from src.database.write_buffer import buffer_from_settings
+from src.database.snapshot import refresh_snapshot
+from src.storage.parquet_mirror import compact as compact_mirror
+from src.pipeline.dag import DagScheduler
+from src.monitoring.metrics import RUN_METRICS
+from src.monitoring.profiler import profiler_from_settings
+from src.pipeline.ledger import RunLedger, GLOBAL_TICKER, GLOBAL_STAGES, FRESH, RESUME, RETRY_FAILED
+from src.pipeline.universe import refresh_universe, load_universe, TierSchedule
+from src.pipeline.procpool import ProcessPool
+from src.pipeline.trading_calendar import get_calendar
+from src.modeling.indobert import get_engine as get_sentiment_engine
+from src.pipeline.work_queue import WorkQueue, default_worker_id
 
 # Setup Logging
 logging.basicConfig(
@@ -25,68 +45,475 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def run_daily_mining(mode="all", batch_idx=0, total_batches=1, run_init=False):
+
+def dag_pool_sizes() -> dict:
+    perf = get_settings().performance
+    return {
+        "network": perf.workers,
+        # Dengan process pool, thread cpu hanya menunggu worker -> satu thread per worker
+        "cpu": max(perf.cpu_workers, perf.process_workers),
+        "db": perf.db_workers,
+    }
+
+
+def start_process_pool() -> ProcessPool | None:
+    """Fork worker CPU (model dimuat dulu di induk). Harus sebelum engine DB / thread dibuat."""
+    workers = get_settings().performance.process_workers
+    if workers < 2:
+        return None
+    return ProcessPool(workers, preload=[get_sentiment_engine]).start()
+
+
+def build_daily_dag(plan: dict[str, list[str]], buffer, windows: dict | None = None) -> DagScheduler:
+    """
+    DAG satu batch, hanya berisi stage yang ada di plan ({ticker|'*': [jenis stage]}):
+    windows: hasil price_windows() -- ticker tanpa sesi hilang tidak di-fetch harganya,
+    sisanya diunduh mulai dari sesi hilang pertama (plus overlap).
+
+      macro_prices (network), macro_sentiment (cpu),
+      stock_metadata (network, enrichment sektor/industri)                 <- plan['*']
+      stocks_registry (db, satu INSERT multi-row SEBELUM stage per-ticker paralel)
+        |-> prices:T (network) --after--> indicators:T (db, hand-off harga in-process)
+        |-> sentiment:T (cpu)
+        |-> fundamentals:T (network)
+      ... semua --after--> flush_all (db) -> snapshot (db, ticker yang berubah saja)
+    """
+    dag = DagScheduler(dag_pool_sizes(), logger=logger)
+
+    for kind in plan.get(GLOBAL_TICKER, []):
+        if kind == "macro_prices":
+            dag.add("macro_prices", collect_macro, resource="network")
+        elif kind == "macro_sentiment":
+            dag.add("macro_sentiment", collect_macro_sentiment, resource="cpu")
+        elif kind == "stock_metadata":
+            dag.add("stock_metadata", enrich_metadata, resource="network", critical=False)
+
+    tickers = [t for t in plan if t != GLOBAL_TICKER]
+    if not tickers:
+        return dag
+
+    registry = dag.add("stocks_registry", partial(register_stocks, tickers), resource="db")
+    ticker_stages = add_ticker_stages(dag, plan, buffer, windows, registry, FundamentalCollector())
+    flush_all = dag.add("flush_all", buffer.flush, requires=[registry], after=ticker_stages, resource="db")
+    dag.add("snapshot", partial(refresh_changed, dag, tickers), requires=[flush_all], resource="db", critical=False)
+    return dag
+
+
+def add_ticker_stages(dag: DagScheduler, plan: dict[str, list[str]], buffer, windows: dict | None,
+                      registry: str, fundamental_collector) -> list[str]:
+    """Stage per-ticker dari plan (prices -> indicators, sentiment, fundamentals); return nama stage."""
+    tickers = [t for t in plan if t != GLOBAL_TICKER]
+    # Harga semua ticker di-submit duluan (FIFO per pool) agar indikator cepat terbuka
+    windows = windows or {}
+    price_stages = {
+        t: dag.add(f"prices:{t}", partial(fetch_and_store, t, buffer=buffer,
+                                          start=windows.get(t, {}).get("start")),
+                   requires=[registry], resource="network", critical=False)
+        for t in tickers if "prices" in plan[t] and windows.get(t, {}).get("missing") != 0
+    }
+
+    ticker_stages = list(price_stages.values())
+    for t in tickers:
+        if "indicators" in plan[t]:
+            # Harga diserahkan in-process (storage.price_tail), tidak menunggu flush ke DB.
+            # 'after': ticker yang gagal tarik harga tetap dihitung ulang dari histori yang ada
+            ticker_stages.append(dag.add(
+                f"indicators:{t}", partial(update_indicators_for_ticker, t, buffer=buffer),
+                requires=[registry], after=[price_stages[t]] if t in price_stages else [],
+                resource="db", critical=False))
+        if "sentiment" in plan[t]:
+            ticker_stages.append(dag.add(
+                f"sentiment:{t}", partial(collect_sentiment, target_ticker=t, buffer=buffer),
+                requires=[registry], resource="cpu", critical=False))
+        if "fundamentals" in plan[t]:
+            ticker_stages.append(dag.add(
+                f"fundamentals:{t}", partial(fundamental_collector.collect_quarterly, t, buffer=buffer),
+                requires=[registry], resource="network", critical=False))
+    return ticker_stages
+
+
+def stages_by_ticker(dag: DagScheduler, tickers: list[str]) -> dict[str, list]:
+    """{ticker: [Stage '<jenis>:<ticker>']}."""
+    return {t: [s for n, s in dag.stages.items() if n.endswith(f":{t}")] for t in tickers}
+
+
+def refresh_changed(dag: DagScheduler, tickers: list[str]) -> int:
+    """Refresh stock_latest_snapshot untuk ticker yang punya minimal satu stage 'ok' di batch ini."""
+    return refresh_stages(stages_by_ticker(dag, tickers))
+
+
+def refresh_stages(by_ticker: dict[str, list]) -> int:
+    changed = [t for t, stages in by_ticker.items() if any(s.status == "ok" for s in stages)]
+    return refresh_snapshot(get_db_engine(), changed)
+
+
+def build_intraday_dag(tickers: list[str], buffer) -> DagScheduler:
+    """
+    Mode intraday: satu stage network per (interval, ticker) mulai dari watermark-nya,
+    lalu satu flush. Tidak dicatat di run_ledger (watermark sudah membuat run idempoten).
+    """
+    dag = DagScheduler(dag_pool_sizes(), logger=logger)
+    stages = []
+    for interval in get_settings().intraday.intervals:
+        # Satu query watermark per interval per batch
+        for t, (sid, wm) in intraday_watermarks(tickers, interval).items():
+            stages.append(dag.add(
+                f"intraday_{interval}:{t}", partial(fetch_intraday, t, sid, interval, wm, buffer=buffer),
+                resource="network", critical=False))
+    dag.add("flush_all", buffer.flush, after=stages, resource="db")
+    return dag
+
+
+def ticker_outcomes(by_ticker: dict[str, list], flush_error: str | None = None) -> dict[str, tuple]:
+    """{ticker: (status, total durasi stage, error)} dari stage '<jenis>:<ticker>' (stages_by_ticker)."""
+    outcomes = {}
+    for t, stages in by_ticker.items():
+        errors = [f"{s.name}: {s.error}" for s in stages if s.status == "failed"]
+        errors += [f"{s.name}: skipped" for s in stages if s.status == "skipped"]
+        if flush_error and stages:
+            errors.append(flush_error)
+        outcomes[t] = (
+            "failed" if errors else "done",
+            # Tanpa stage (semua sudah selesai di ledger) -> bukan sampel biaya yang valid
+            round(sum(s.duration for s in stages), 3) if stages else None,
+            "; ".join(errors) or None,
+        )
+    return outcomes
+
+
+class QueueFeed:
+    """
+    feed() untuk DagScheduler di mode --queue: SATU DAG dan satu write buffer per runner.
+
+    - Claim: setiap kali slot network kosong, ticker berikutnya di-claim dari work_queue dan
+      stage-nya ditambahkan ke DAG yang sedang berjalan (tidak ada jeda menunggu ticker paling
+      lambat satu claim). Ticker yang sedang dikerjakan dibatasi max_held agar runner tidak
+      menimbun antrean yang bisa dikerjakan runner lain.
+    - Checkpoint (stage db, satu per satu): flush buffer, catat ledger, complete antrean, dan
+      refresh snapshot untuk ticker yang semua stage-nya sudah selesai -- saat >= checkpoint_size
+      ticker menunggu atau checkpoint terakhir sudah >= checkpoint_age detik, dan sekali di akhir.
+      Beberapa commit per run, bukan satu per claim. Runner yang crash kehilangan ticker yang belum
+      di-checkpoint; lease-nya habis dan ticker itu di-claim ulang.
+    """
+
+    def __init__(self, queue: WorkQueue, ledger: RunLedger, buffer, run_date, registry: str,
+                 strategy=FRESH, schedule=None, claim_size: int = 4, max_held: int = 8,
+                 checkpoint_size: int | None = None, checkpoint_age: float | None = None):
+        self.queue = queue
+        self.ledger = ledger
+        self.buffer = buffer
+        self.run_date = run_date
+        self.registry = registry
+        self.strategy = strategy
+        self.schedule = schedule
+        self.claim_size = claim_size
+        self.max_held = max_held
+        self.checkpoint_size = checkpoint_size or get_settings().run_ledger.checkpoint_size
+        # Default: umur maksimum buffer (write_buffer.max_age_seconds)
+        self.checkpoint_age = buffer.max_age if checkpoint_age is None else checkpoint_age
+        self.fundamentals = FundamentalCollector()
+        self.held = set()      # di-claim, belum di-checkpoint (lease diperpanjang)
+        self.active = {}       # ticker -> nama stage-nya (belum semua selesai)
+        self.finished = {}     # ticker -> stage, semua selesai, menunggu checkpoint
+        self.drained = False
+        self.checkpoints = 0
+        self._running = None   # (nama stage checkpoint, ticker-nya)
+        self._last = time.monotonic()
+
+    def __call__(self, dag: DagScheduler):
+        self._settle_checkpoint(dag)
+        for t, names in list(self.active.items()):
+            stages = [dag.stages[n] for n in names]
+            if all(s.status in ("ok", "failed", "skipped") for s in stages):
+                self.finished[t] = stages
+                del self.active[t]
+        if not self.drained:
+            self._claim(dag)
+        if self.finished and self._running is None and (
+            len(self.finished) >= self.checkpoint_size
+            or time.monotonic() - self._last >= self.checkpoint_age
+            or (self.drained and not self.active)
+        ):
+            self._add_checkpoint(dag)
+
+    def _claim(self, dag: DagScheduler):
+        while not self.drained:
+            room = min(dag.idle("network"), self.max_held - len(self.active), self.claim_size)
+            if room <= 0:
+                return
+            tickers = self.queue.claim(room)
+            if not tickers:
+                self.drained = True
+                return
+            self.held.update(tickers)
+            plan = self.ledger.plan(tickers, self.strategy, schedule=self.schedule)
+            windows = price_windows([t for t in plan if "prices" in plan[t]], self.run_date)
+            names = add_ticker_stages(dag, plan, self.buffer, windows, self.registry, self.fundamentals)
+            for t in tickers:
+                self.active[t] = [n for n in names if n.endswith(f":{t}")]
+            if names:
+                return  # idle() baru berubah setelah stage ini dijadwalkan
+
+    def _add_checkpoint(self, dag: DagScheduler):
+        by_ticker, self.finished = self.finished, {}
+        self.checkpoints += 1
+        name = dag.add(f"checkpoint_{self.checkpoints}", partial(self._checkpoint, by_ticker), resource="db")
+        self._running = (name, list(by_ticker))
+
+    def _settle_checkpoint(self, dag: DagScheduler):
+        if self._running is None:
+            return
+        name, tickers = self._running
+        if dag.stages[name].status in ("ok", "failed", "skipped"):
+            self.held.difference_update(tickers)
+            self._running = None
+            self._last = time.monotonic()
+
+    def _checkpoint(self, by_ticker: dict[str, list]) -> int:
+        flush_error = None
+        try:
+            self.buffer.flush()
+        except Exception as e:
+            flush_error = f"write buffer flush failed ({type(e).__name__}: {e})"
+        self.ledger.record_stages([s for stages in by_ticker.values() for s in stages],
+                                  [f"checkpoint_{self.checkpoints}"] if flush_error else None)
+        self.queue.complete(ticker_outcomes(by_ticker, flush_error))
+        if flush_error:
+            # Stage checkpoint critical: run gagal, baris tetap di buffer untuk flush berikutnya
+            raise RuntimeError(flush_error)
+        try:
+            refresh_stages(by_ticker)
+        except Exception as e:
+            logger.warning(f"[SNAPSHOT] Refresh failed at checkpoint {self.checkpoints}: {e}")
+        logger.info(f"[QUEUE] Checkpoint {self.checkpoints}: {len(by_ticker)} ticker(s) completed")
+        return len(by_ticker)
+
+
+def run_queue_dag(queue: WorkQueue, ledger: RunLedger, buffer, run_date, tickers_info: list[dict],
+                  strategy=FRESH, schedule=None, include_macro: bool = False) -> DagScheduler:
+    """Mode --queue: satu DAG per runner yang terus meng-claim ticker (QueueFeed) sampai antrean habis."""
+    dag = build_daily_dag(ledger.plan([GLOBAL_TICKER], strategy) if include_macro else {}, buffer)
+    # Satu INSERT multi-row untuk seluruh universe (idempoten), bukan per claim
+    registry = dag.add("stocks_registry", partial(register_stocks, [t["ticker"] for t in tickers_info]),
+                       resource="db")
+
+    pools = dag.pool_sizes
+    claim_size = get_settings().work_queue.claim_size or pools["network"]
+    feed = QueueFeed(
+        queue, ledger, buffer, run_date, registry, strategy=strategy, schedule=schedule,
+        claim_size=claim_size,
+        max_held=2 * max(claim_size, pools["network"]),
+    )
+    logger.info(f"[QUEUE] claim {claim_size} per free network slot, hold <= {feed.max_held}, "
+                f"checkpoint every {feed.checkpoint_size} tickers / {feed.checkpoint_age:.0f}s")
+    with queue.leased(feed.held):
+        dag.run(feed=feed)
+    # Stage global (makro) tidak lewat checkpoint
+    ledger.record_stages([s for n, s in dag.stages.items() if n in GLOBAL_STAGES])
+    return dag
+
+
+def static_shard(tickers_info: list[dict], batch_idx: int, total_batches: int) -> list[str]:
+    if total_batches > 1:
+        # Bagi total saham ke dalam beberapa batch
+        # Contoh: 31 saham, 2 batch -> Batch 0 (16 saham), Batch 1 (15 saham)
+        import math
+        chunk_size = math.ceil(len(tickers_info) / total_batches)
+        start_idx = batch_idx * chunk_size
+        end_idx = start_idx + chunk_size
+        tickers_info = tickers_info[start_idx:end_idx]
+        logger.info(f"Sharding Active: Processing {len(tickers_info)} tickers (Range: {start_idx}-{end_idx})")
+    return [t["ticker"] for t in tickers_info]
+
+
+def logs_dir() -> str:
+    path = os.path.join(os.getcwd(), (get_settings().raw.get("paths") or {}).get("logs", "data/logs"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_run_report(report: dict, mode: str, batch_idx: int):
+    path = os.path.join(logs_dir(), f"dag_{mode}_b{batch_idx}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"[DAG] Report saved to {path}")
+
+
+def run_daily_mining(mode="all", batch_idx=0, total_batches=1, run_init=False, use_queue=False,
+                     strategy=FRESH, universe: list[dict] | None = None, processes: int | None = None,
+                     force_session: bool = False, profile: bool = False):
+    """
+    universe: daftar {"ticker", "name"} pengganti tickers.json (mis. universe sintetis simulator).
+    processes: jumlah fork worker CPU (override performance.process_workers; <2 = in-process).
+    force_session: jalankan stage saham walau run_date bukan hari bursa IDX.
+    profile: sampling profiler + tracemalloc per stage/ticker -> profile_<mode>_b<batch>.{collapsed,json}.
+    """
     jakarta_tz = pytz.timezone('Asia/Jakarta')
     now_jakarta = datetime.now(jakarta_tz)
-    logger.info(f"=== DAILY MINING SESSION ({mode.upper()}) | Batch {batch_idx+1}/{total_batches} ===")
-    
+    run_date = now_jakarta.date()
+    logger.info(f"=== DAILY MINING SESSION ({mode.upper()}) | Batch {batch_idx+1}/{total_batches} | {strategy} ===")
+    describe_config()
+    RUN_METRICS.reset()
+
+    # Cron jalan Senin-Jumat; di hari libur bursa tidak ada bar baru untuk saham IDX.
+    # Makro (pasar global) tetap jalan.
+    stock_mode = mode in ["all", "stocks"]
+    intraday_mode = mode == "intraday"
+    if (stock_mode or intraday_mode) and not force_session and not get_calendar().is_session(run_date):
+        logger.info(f"[CALENDAR] {run_date} is not an IDX session, stock stages skipped")
+        stock_mode = intraday_mode = False
+
+    cpu_pool = profiler = None
     try:
-        # 0. Verifikasi/Inisialisasi Tabel (Hanya jika --init dipanggil)
+        if processes is not None:
+            override("performance.process_workers", processes)
+        cfg = get_settings()
+        cpu_pool = start_process_pool()
+        # Setelah fork: thread sampler dan tracemalloc tidak boleh ikut tersalin ke worker
+        if profile:
+            profiler = profiler_from_settings()
+            profiler.start()
+        engine = get_db_engine()
+        if use_queue and is_duckdb(engine):
+            # Claim FOR UPDATE SKIP LOCKED antar runner: DuckDB adalah file lokal satu proses
+            raise ValueError("--queue requires the Postgres backend")
+
+        # 0. Schema: SETIAP runner memanggil migrate(), bukan hanya job --init. Job workflow
+        # start paralel tanpa urutan; migrate() idempoten dan diserialkan advisory lock, jadi
+        # runner pertama yang mengambil lock memigrasi dan sisanya melihat plan kosong
+        # (satu introspeksi). Menunggu shared lock saja tidak menjamin urutan.
         if run_init:
             logger.info("[INIT] Melakukan verifikasi struktur database (DDL)...")
-            init_tables(engine)
-        
-        # 1. Koleksi Data Makro
-        if mode in ["all", "macro"]:
-            logger.info("[STEP 1] Collecting Macroeconomic Data & Global Sentiment...")
-            collect_macro()
-            collect_macro_sentiment()
-        
-        # 2. Koleksi Data Per Saham
-        if mode in ["all", "stocks"]:
-            if mode == "stocks":
-                logger.info("[WAIT] Memberi waktu 30 detik agar Macro Miner menyelesaikan urusan schema...")
-                import time
-                time.sleep(30)
-            
-            logger.info("[STEP 2] Collecting Ticker Specific Data...")
-            all_tickers_info = load_tickers("indonesia")
-            
-            # --- SHARDING LOGIC ---
-            if total_batches > 1:
-                # Bagi total saham ke dalam beberapa batch
-                # Contoh: 31 saham, 2 batch -> Batch 0 (16 saham), Batch 1 (15 saham)
-                import math
-                chunk_size = math.ceil(len(all_tickers_info) / total_batches)
-                start_idx = batch_idx * chunk_size
-                end_idx = start_idx + chunk_size
-                tickers_to_process = all_tickers_info[start_idx:end_idx]
-                logger.info(f"Sharding Active: Processing {len(tickers_to_process)} tickers (Range: {start_idx}-{end_idx})")
+        migrate(engine)
+
+        tickers_info = universe if universe is not None else load_tickers("indonesia")
+
+        # Universe bertingkat: tier likuiditas dihitung ulang oleh job --init; runner saham
+        # memakai tier terakhir yang tersimpan (job berjalan paralel -> bisa tier kemarin)
+        schedule = None
+        if cfg.universe.enabled:
+            if run_init:
+                refresh_universe(engine, tickers_info)
+            if stock_mode:
+                known = load_universe(engine)
+                tickers_info = [t for t in tickers_info if known.get(t["ticker"], {}).get("is_active", True)]
+                schedule = TierSchedule.from_settings(known)
+
+        ledger = RunLedger(engine, run_date)
+        # Write-behind: semua collector menulis ke buffer, di-flush per tabel dalam
+        # satu transaksi (threshold atau stage flush) -> beberapa commit per run, bukan ratusan
+        buffer = buffer_from_settings()
+
+        # Sumber ticker: work_queue (dinamis, satu DAG yang terus meng-claim) atau slice statis per checkpoint
+        queue = None
+        if stock_mode and use_queue:
+            queue = WorkQueue(
+                engine, run_date,
+                worker_id=default_worker_id(f"b{batch_idx}"),
+                lease_seconds=cfg.work_queue.lease_seconds,
+                max_attempts=cfg.work_queue.max_attempts,
+                cost_history=cfg.work_queue.cost_history_runs,
+            )
+            if strategy != FRESH:
+                # Claim runner yang crash (lease belum habis / session lain) dilepas: --resume
+                # tepat setelah crash tidak boleh mendapati antrean "habis" dengan ticker yatim
+                statuses = ("failed",) if strategy == RETRY_FAILED else ()
+                logger.info(f"[QUEUE] Requeued {queue.requeue(statuses, release_claims=True)} ticker(s)")
+            # FRESH: rerun hari yang sama mengerjakan ulang antrean (bukan mendapati semuanya 'done')
+            seeded = queue.seed([t["ticker"] for t in tickers_info], fresh=strategy == FRESH)
+            logger.info(f"[QUEUE] {queue.worker_id} | session {queue.session_id} | run_date {run_date} | {seeded} tickers")
+            next_batch = lambda: []
+        elif intraday_mode:
+            # Hanya tier paling likuid (tier dari ticker_universe; ticker tanpa tier tidak ikut)
+            intraday = cfg.intraday
+            known = load_universe(engine) if intraday.enabled else {}
+            eligible = [t for t in tickers_info
+                        if known.get(t["ticker"], {}).get("is_active", True)
+                        and known.get(t["ticker"], {}).get("tier") in intraday.tiers]
+            if not intraday.enabled:
+                logger.info("[INTRADAY] Disabled in settings (intraday.enabled)")
+            shard = static_shard(eligible, batch_idx, total_batches)
+            logger.info(f"[INTRADAY] {len(shard)} ticker(s) in tiers {intraday.tiers} | intervals {intraday.intervals}")
+            size = cfg.run_ledger.checkpoint_size
+            chunks = iter([shard[i:i + size] for i in range(0, len(shard), size)])
+            next_batch = lambda: next(chunks, [])
+        elif stock_mode:
+            shard = static_shard(tickers_info, batch_idx, total_batches)
+            size = cfg.run_ledger.checkpoint_size
+            chunks = iter([shard[i:i + size] for i in range(0, len(shard), size)])
+            next_batch = lambda: next(chunks, [])
+        else:
+            next_batch = lambda: []
+
+        dags = []
+        include_macro = mode in ["all", "macro"]
+        if queue:
+            dags.append(run_queue_dag(queue, ledger, buffer, run_date, tickers_info,
+                                      strategy, schedule, include_macro))
+            include_macro = False
+
+        # Slice statis: satu DAG per batch; ledger dicatat setelah batch (termasuk flush) selesai = checkpoint
+        while True:
+            tickers = next_batch()
+            if not tickers and not include_macro:
+                break
+
+            if intraday_mode:
+                dag = build_intraday_dag(tickers, buffer)
             else:
-                tickers_to_process = all_tickers_info
-            
-            fundamental_collector = FundamentalCollector(engine)
-            
-            for i, t_info in enumerate(tickers_to_process, 1):
-                ticker = t_info["ticker"]
-                try:
-                    logger.info(f"[{i}/{len(tickers_to_process)}] --- Processing {ticker} ---")
-                    
-                    # A. Tarik Harga Terakhir
-                    fetch_and_store(ticker, period="7d")
-                    
-                    # B. Hitung Indikator Teknikal
-                    update_indicators_for_ticker(ticker)
-                    
-                    # C. Tarik Sentimen Berita
-                    collect_sentiment(target_ticker=ticker)
-                    
-                    # D. Cek Fundamental (Quarterly)
-                    fundamental_collector.collect_quarterly(ticker)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing ticker {ticker}: {str(e)}")
-                    continue
+                plan = ledger.plan(tickers + ([GLOBAL_TICKER] if include_macro else []), strategy, schedule=schedule)
+                include_macro = False
+                # Satu query per batch: sesi yang belum tersimpan per ticker -> window download
+                windows = price_windows([t for t in plan if t != GLOBAL_TICKER and "prices" in plan[t]], run_date)
+                current = [t for t, w in windows.items() if w["missing"] == 0]
+                if current:
+                    logger.info(f"[CALENDAR] {len(current)} ticker(s) already have all sessions through {run_date}, price fetch skipped")
+                dag = build_daily_dag(plan, buffer, windows)
+                done = [t for t in tickers if t not in plan]
+                if done:
+                    logger.info(f"[LEDGER] {len(done)} ticker(s) already complete or not due for {run_date}, skipped")
+
+            if dag.stages:
+                logger.info(f"[DAG] {len(dag.stages)} stages | pools {dag.pool_sizes}")
+                dag.run()
+                ledger.record_dag(dag)
+                dags.append(dag)
+
+        # Gabungkan file Parquet kecil hasil append harian (hanya partisi yang sudah menumpuk)
+        compact_mirror()
+
+        reports = []
+        for dag in dags:
+            reports.append(dag.report())
+            dag.print_report(reports[-1])
+        write_run_report(reports[0] if len(reports) == 1 else {"batches": reports}, mode, batch_idx)
+
+        # Metrik per stage/ticker (JSON) + agregat untuk Prometheus textfile collector
+        metrics_path = os.path.join(logs_dir(), f"metrics_{mode}_b{batch_idx}")
+        RUN_METRICS.write_json(f"{metrics_path}.json", extra={
+            "run": {"mode": mode, "batch": batch_idx, "run_date": str(run_date), "strategy": strategy},
+            "db_pool": pool_metrics(),
+            "write_buffer": buffer.stats(),
+            "rate_limit": controller_stats(),
+        })
+        RUN_METRICS.write_prometheus(f"{metrics_path}.prom", labels={"mode": mode, "batch": batch_idx})
+        logger.info(f"[METRICS] Saved {metrics_path}.json / .prom")
+
+        if queue:
+            logger.info(f"[QUEUE] Drained | {queue.progress()}")
+        logger.info(f"[LEDGER] {run_date} | {ledger.summary()}")
+        logger.info(f"[WRITE-BUFFER] {buffer.stats()}")
+        logger.info(f"[DB-POOL] {pool_metrics()}")
+        logger.info(f"[RATE] {controller_stats()}")
+
+        # Stage per-ticker boleh gagal (dicatat di ledger); stage inti gagal -> job gagal
+        failed_core = [
+            s.name for dag in dags for s in dag.stages.values()
+            if s.critical and s.status in ("failed", "skipped")
+        ]
+        if failed_core:
+            logger.critical(f"=== MINING SESSION FAILED ({mode}): {failed_core} ===")
+            sys.exit(1)
 
         logger.info(f"=== {mode.upper()} MINING SESSION COMPLETED ===")
 
@@ -96,26 +523,59 @@ def run_daily_mining(mode="all", batch_idx=0, total_batches=1, run_init=False):
         logger.critical(f"=== MINING SESSION CRASHED ({mode}) ===")
         print(error_msg)
         sys.exit(1)
+    finally:
+        if cpu_pool is not None:
+            cpu_pool.stop()
+        if profiler is not None:
+            # Juga untuk run yang crash / gagal: justru itu yang perlu diprofil
+            profiler.stop()
+            profile_path = os.path.join(logs_dir(), f"profile_{mode}_b{batch_idx}")
+            profiler.print_report(profiler.write(profile_path))
+            logger.info(f"[PROFILE] Saved {profile_path}.collapsed / .json")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Stock Forecasting Daily Miner with Sharding Support")
-    parser.add_argument("--mode", default="all", choices=["all", "macro", "stocks"], help="Mining mode")
+    parser.add_argument("--mode", default="all", choices=["all", "macro", "stocks", "intraday"],
+                        help="Mining mode (intraday: bar 15m/60m untuk tier paling likuid)")
     parser.add_argument("--batch", type=int, default=0, help="Batch index (0-based)")
     parser.add_argument("--total-batches", type=int, default=1, help="Total number of batches")
     parser.add_argument("--init", action="store_true", help="Inisialisasi/Heal database schema (DDL)")
-    
+    parser.add_argument("--queue", action="store_true",
+                        help="Ambil ticker dari work_queue (load balancing dinamis) alih-alih slice statis")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Fork N worker CPU untuk inferensi & indikator (override performance.process_workers)")
+    parser.add_argument("--force", action="store_true",
+                        help="Jalankan stage saham walau hari ini bukan hari bursa IDX")
+    parser.add_argument("--backend", choices=["postgres", "duckdb"],
+                        help="Override database.backend (duckdb: file lokal, sinkron via src.database.sync)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Sampling profiler + tracemalloc per stage/ticker (collapsed stacks + top-N di paths.logs)")
+    recovery = parser.add_mutually_exclusive_group()
+    recovery.add_argument("--resume", action="store_true",
+                          help="Lewati stage yang sudah sukses hari ini (run_ledger)")
+    recovery.add_argument("--retry-failed", action="store_true",
+                          help="Jalankan ulang hanya stage yang gagal hari ini (run_ledger)")
+
     args, unknown = parser.parse_known_args() # Use parse_known_args to avoid issues with extra flags
-    
+
     # Handle the case where someone might use -m instead of --mode if we chose to
     # but for now we'll stick to clear arguments.
-    
+
     # Force flush output for GitHub Actions Logs
     sys.stdout.reconfigure(line_buffering=True)
     sys.stderr.reconfigure(line_buffering=True)
-    
+
+    if args.backend:
+        set_backend(args.backend)
+
     run_daily_mining(
-        mode=args.mode, 
-        batch_idx=args.batch, 
+        mode=args.mode,
+        batch_idx=args.batch,
         total_batches=args.total_batches,
-        run_init=args.init
+        run_init=args.init,
+        use_queue=args.queue,
+        strategy=RESUME if args.resume else RETRY_FAILED if args.retry_failed else FRESH,
+        processes=args.processes,
+        force_session=args.force,
+        profile=args.profile,
     )
@@ -0,0 +1,301 @@
+"""
+Mirror kolumnar (Parquet, Hive-partitioned) dari data yang dipanen.
+
+Layout:
+  <paths.data_raw>/mirror/table=<tabel>/year=<yyyy>/ticker=<TICKER>/part-*.parquet
+  (macro_economic tidak punya ticker -> hanya table/year)
+
+Setiap run menambahkan delta sebagai file baru (append-only). Reader men-deduplikasi
+berdasarkan key tabel (baris dengan _ingested_at terbaru menang), dan compact()
+menggabungkan file kecil per partisi secara berkala.
+
+Hanya baris yang sudah ter-commit ke DB yang di-mirror: jalur write buffer menulis mirror
+setelah flush per tabel commit (database.write_buffer), jalur tulis langsung setelah transaksinya.
+
+Lokasi: di CI, runner hanya menulis delta run ini lalu meng-upload-nya sebagai artifact; job
+mirror di .github/workflows/mining.yml menggabungkan delta semua runner ke mirror kanonik,
+mengkompaksi, dan mempublikasikannya sebagai asset mirror.tar.gz di release GitHub
+'parquet-mirror' (Actions cache hanya mempercepat restore). Baca offline:
+  gh release download parquet-mirror -p mirror.tar.gz && tar -xzf mirror.tar.gz -C data/raw
+  python -m src.storage.parquet_mirror --read technical_prices --ticker BBCA.JK
+Asset release dibatasi 2 GB per file; jika mirror melewatinya, pindahkan publish ke object storage.
+"""
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from src.config import get_settings
+from src.database.schema import SCHEMA
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = ds = pq = None
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+
+DEFAULT_DATA_RAW = "data/raw"
+
+# Key logis per tabel (stock_id diganti ticker: id DB tidak portabel antar database)
+MIRROR_KEYS = {
+    "technical_prices": ["ticker", "date"],
+    "technical_indicators": ["ticker", "date"],
+    "news_sentiment": ["ticker", "date"],
+    "macro_economic": ["date"],
+    "fundamental_quarterly": ["ticker", "year", "quarter"],
+}
+
+# Tabel yang diisi beberapa collector secara parsial (harga makro + sentimen makro):
+# dedup menggabungkan nilai non-null terakhir per kolom, sama seperti upsert COALESCE di DB
+COALESCE_TABLES = {"macro_economic"}
+
+# Kolom tanggal yang menentukan partisi year=
+YEAR_COLUMN = {
+    "fundamental_quarterly": "report_date",
+}
+
+_warned = False
+_forced = None  # set_enabled(): override settings (benchmark / simulator)
+
+
+def mirror_root() -> str:
+    data_raw = (get_settings().raw.get("paths") or {}).get("data_raw", DEFAULT_DATA_RAW)
+    return os.path.join(PROJECT_ROOT, data_raw, "mirror")
+
+
+def set_enabled(enabled: bool | None):
+    """Paksa mirror on/off untuk proses ini; None = kembali mengikuti settings.yaml."""
+    global _forced
+    _forced = enabled
+
+
+def is_enabled() -> bool:
+    global _warned
+    if _forced is False:
+        return False
+    if _forced is None and not get_settings().mirror.enabled:
+        return False
+    if pa is None:
+        if not _warned:
+            print("[MIRROR] pyarrow not installed, Parquet mirror disabled")
+            _warned = True
+        return False
+    return True
+
+
+def _arrow_type(sql_type: str):
+    t = sql_type.upper()
+    if t.startswith("DOUBLE") or t.startswith("REAL"):
+        return pa.float64()
+    if t in ("BIGINT", "INTEGER", "SMALLINT", "SERIAL"):
+        return pa.int64()
+    if t == "DATE":
+        return pa.date32()
+    if t.startswith("TIMESTAMP"):
+        return pa.timestamp("us", tz="UTC")
+    if t == "BOOLEAN":
+        return pa.bool_()
+    return pa.string()
+
+
+def arrow_schema(table: str):
+    """Schema Arrow diturunkan dari SCHEMA DB, supaya tipe konsisten antar file."""
+    fields = [pa.field("ticker", pa.string())] if "ticker" in MIRROR_KEYS[table] else []
+    for name, dtype, _ in SCHEMA[table]["columns"]:
+        if name in ("id", "stock_id", "ticker") or name.endswith("_at"):
+            continue
+        fields.append(pa.field(name, _arrow_type(dtype)))
+    if "year" not in [f.name for f in fields]:
+        fields.append(pa.field("year", pa.int64()))
+    fields.append(pa.field("_ingested_at", pa.timestamp("us", tz="UTC")))
+    return pa.schema(fields)
+
+
+def _file_schema(table: str):
+    """Schema di dalam file: kolom partisi (year/ticker) hanya ada di path direktori."""
+    schema = arrow_schema(table)
+    for name in ("ticker", "year"):
+        if name in schema.names:
+            schema = schema.remove(schema.get_field_index(name))
+    return schema
+
+
+def _partitioning(table: str):
+    fields = [pa.field("year", pa.int64())]
+    if "ticker" in MIRROR_KEYS[table]:
+        fields.append(pa.field("ticker", pa.string()))
+    return ds.partitioning(pa.schema(fields), flavor="hive")
+
+
+def _table_dir(table: str) -> str:
+    return os.path.join(mirror_root(), f"table={table}")
+
+
+# WRITE
+
+def mirror_frame(table: str, df: pd.DataFrame) -> int:
+    """
+    Append delta ke mirror. df minimal punya key tabel (ticker/date/...). Kolom yang tidak
+    ada diisi null; kolom ekstra diabaikan. Gagal mirror tidak boleh menggagalkan collector.
+    """
+    if df is None or df.empty or not is_enabled():
+        return 0
+    try:
+        schema = arrow_schema(table)
+        out = df.copy()
+        for field in schema:
+            if field.name not in out.columns:
+                out[field.name] = None
+        out["_ingested_at"] = pd.Timestamp(datetime.now(timezone.utc))
+
+        year_col = YEAR_COLUMN.get(table, "date")
+        out["year"] = pd.to_datetime(out[year_col]).dt.year.astype("int64")
+        for col in ("date", "report_date"):
+            if col in out:
+                out[col] = pd.to_datetime(out[col]).dt.date
+
+        arrow_table = pa.Table.from_pandas(out[schema.names], schema=schema, preserve_index=False)
+        ds.write_dataset(
+            arrow_table,
+            _table_dir(table),
+            format="parquet",
+            partitioning=_partitioning(table),
+            basename_template=f"part-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        return len(out)
+    except Exception as e:
+        print(f"[MIRROR] Failed to mirror {table}: {e}")
+        return 0
+
+
+def mirror_rows(table: str, rows: list[dict]) -> int:
+    return mirror_frame(table, pd.DataFrame(rows)) if rows else 0
+
+
+# READ
+
+def _dedupe(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    keys = [k for k in MIRROR_KEYS[table] if k in df.columns]
+    if not keys or "_ingested_at" not in df.columns:
+        return df
+    if table in COALESCE_TABLES:
+        return (
+            df.sort_values("_ingested_at")
+              .groupby(keys, as_index=False, sort=True)
+              .last()
+        )
+    return (
+        df.sort_values("_ingested_at")
+          .drop_duplicates(subset=keys, keep="last")
+          .sort_values(keys)
+          .reset_index(drop=True)
+    )
+
+
+def read_mirror(table: str, columns: list[str] | None = None, tickers: list[str] | None = None,
+                start=None, end=None, filter_expr=None) -> pd.DataFrame:
+    """
+    Baca mirror dengan predicate pushdown (partisi year/ticker dipangkas sebelum file dibuka,
+    filter tanggal diteruskan ke statistik row-group) dan column projection.
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required to read the Parquet mirror")
+    path = _table_dir(table)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=columns or [])
+
+    dataset = ds.dataset(path, format="parquet", partitioning=_partitioning(table),
+                         schema=arrow_schema(table))
+
+    date_col = YEAR_COLUMN.get(table, "date")
+    expr = None
+
+    def _and(e):
+        nonlocal expr
+        expr = e if expr is None else expr & e
+
+    if tickers and "ticker" in MIRROR_KEYS[table]:
+        _and(ds.field("ticker").isin(list(tickers)))
+    if start is not None:
+        start = pd.Timestamp(start).date()
+        _and(ds.field("year") >= start.year)
+        _and(ds.field(date_col) >= start)
+    if end is not None:
+        end = pd.Timestamp(end).date()
+        _and(ds.field("year") <= end.year)
+        _and(ds.field(date_col) <= end)
+    if filter_expr is not None:
+        _and(filter_expr)
+
+    # Key + _ingested_at selalu ikut dibaca untuk dedup, lalu dibuang jika tidak diminta
+    wanted = None
+    if columns:
+        wanted = list(dict.fromkeys(list(columns) + MIRROR_KEYS[table] + ["_ingested_at"]))
+
+    df = dataset.to_table(columns=wanted, filter=expr).to_pandas()
+    df = _dedupe(df, table)
+    if columns:
+        df = df[list(columns)]
+    return df
+
+
+# COMPACTION
+
+def compact(table: str | None = None, min_files: int | None = None) -> int:
+    """
+    Gabungkan file kecil di setiap partisi daun yang punya >= min_files file menjadi satu
+    file (sudah dedup). File baru ditulis dulu, baru file lama dihapus.
+    Return jumlah partisi yang dikompaksi.
+    """
+    if not is_enabled():
+        return 0
+    if min_files is None:
+        min_files = get_settings().mirror.compact_min_files
+
+    tables = [table] if table else list(MIRROR_KEYS)
+    compacted = 0
+    for t in tables:
+        root = _table_dir(t)
+        if not os.path.exists(root):
+            continue
+        schema = _file_schema(t)
+        for dirpath, _, filenames in os.walk(root):
+            parts = sorted(f for f in filenames if f.endswith(".parquet"))
+            if len(parts) < min_files:
+                continue
+            files = [os.path.join(dirpath, f) for f in parts]
+            df = ds.dataset(files, format="parquet", schema=schema).to_table().to_pandas()
+            df = _dedupe(df, t)
+
+            target = os.path.join(dirpath, f"part-compacted-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+            pq.write_table(pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False), target)
+            for f in files:
+                os.remove(f)
+            compacted += 1
+
+    if compacted:
+        print(f"[MIRROR] Compacted {compacted} partition(s)")
+    return compacted
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser("Parquet Mirror")
+    parser.add_argument("--compact", action="store_true", help="Kompaksi semua partisi")
+    parser.add_argument("--min-files", type=int, default=2)
+    parser.add_argument("--read", help="Nama tabel untuk dibaca (preview)")
+    parser.add_argument("--ticker", action="append", help="Filter ticker (boleh berulang)")
+    parser.add_argument("--start", help="Tanggal awal (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    if args.compact:
+        compact(min_files=args.min_files)
+    if args.read:
+        print(read_mirror(args.read, tickers=args.ticker, start=args.start).tail(20))
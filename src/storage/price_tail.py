@@ -0,0 +1,145 @@
+"""
+Hand-off harga in-process dari stage prices ke stage indicators.
+
+Sebelumnya indicators:T membaca ulang seluruh histori harga ticker dari DB tepat setelah
+prices:T menulisnya. Sekarang:
+
+  - fetch_and_store() menyerahkan frame yang baru diunduh lewat offer()
+  - update_indicators_for_ticker() memanggil history(): frame itu digabung dengan tail
+    N bar terakhir (price_tail.bars) yang disimpan run sebelumnya di
+    <paths.data_raw>/cache/price_tail/<TICKER>.parquet, lalu tail baru ditulis balik
+
+Indikator harian hanya menyimpan 30 baris terakhir; N bar (default 250) cukup untuk warm-up
+SMA-50 dan konvergensi EMA/RSI/MACD (selisih relatif terhadap perhitungan dari histori
+penuh < 1e-6).
+
+Fallback ke DB (N bar terakhir technical_prices, digabung dengan frame hand-off yang mungkin
+belum di-flush) jika tidak ada hand-off (stage prices gagal / dilewati), tail belum ada
+(cache dingin, runner baru), atau tail tidak bersambung / tidak cocok dengan overlap frame
+baru (histori ditulis ulang di tempat lain). Tanpa pyarrow tail tidak disimpan ke disk:
+setiap ticker memakai fallback DB.
+
+Runner CI selalu baru: .github/workflows/mining.yml mem-persist direktori tail lewat
+actions/cache per runner saham (restore fallback ke runner lain), jadi run harian mulai hangat.
+"""
+import os
+import threading
+
+import pandas as pd
+
+from src.config import get_settings
+from src.monitoring.metrics import RUN_METRICS
+
+try:
+    import pyarrow  # noqa: F401  (engine DataFrame.to_parquet)
+except ImportError:  # optional dependency
+    pyarrow = None
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(CURRENT_DIR))
+
+# Kolom yang dibutuhkan calculate_indicators (urutan sama dengan query DB)
+TAIL_COLUMNS = ["close", "volume", "high", "low"]
+
+_handoff = {}
+_lock = threading.Lock()
+
+
+def tail_dir() -> str:
+    data_raw = (get_settings().raw.get("paths") or {}).get("data_raw", "data/raw")
+    return os.path.join(PROJECT_ROOT, data_raw, "cache", "price_tail")
+
+
+def _path(ticker: str) -> str:
+    return os.path.join(tail_dir(), f"{ticker}.parquet")
+
+
+def _frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Index date, kolom TAIL_COLUMNS float (BIGINT volume / Decimal -> float), urut tanggal."""
+    return df[TAIL_COLUMNS].astype(float).sort_index()
+
+
+def offer(ticker: str, rows: list[dict]):
+    """Serahkan baris harga yang baru diunduh (format _price_row) ke stage indicators."""
+    if not rows or not get_settings().price_tail.enabled:
+        return
+    frame = _frame(pd.DataFrame(rows).set_index("date"))
+    with _lock:
+        _handoff[ticker] = frame
+
+
+def invalidate(ticker: str):
+    """Histori ditulis ulang (corporate action): buang hand-off dan tail di disk."""
+    with _lock:
+        _handoff.pop(ticker, None)
+    try:
+        os.remove(_path(ticker))
+    except OSError:
+        pass
+
+
+def load_tail(ticker: str) -> pd.DataFrame | None:
+    if pyarrow is None:
+        return None
+    try:
+        return pd.read_parquet(_path(ticker))
+    except (OSError, ValueError):
+        return None
+
+
+def save_tail(ticker: str, df: pd.DataFrame):
+    if pyarrow is None or df.empty:
+        return
+    path = _path(ticker)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    df.tail(get_settings().price_tail.bars).to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+def merge(base: pd.DataFrame | None, fresh: pd.DataFrame | None) -> pd.DataFrame:
+    """Baris base sebelum tanggal pertama fresh + seluruh fresh (fresh menang di overlap)."""
+    if fresh is None or fresh.empty:
+        return base if base is not None else pd.DataFrame(columns=TAIL_COLUMNS)
+    if base is None or base.empty:
+        return fresh
+    return pd.concat([base[base.index < fresh.index[0]], fresh])
+
+
+def continues(tail: pd.DataFrame | None, fresh: pd.DataFrame) -> bool:
+    """Tail bersambung dengan fresh (ada overlap) dan close di tanggal overlap sama."""
+    if tail is None or tail.empty or tail.index[-1] < fresh.index[0]:
+        return False
+    common = tail.index.intersection(fresh.index)
+    if common.empty:
+        return False
+    old, new = tail.loc[common, "close"], fresh.loc[common, "close"]
+    deviation = ((new - old).abs() / old.abs().where(old != 0)).max()
+    return not deviation > get_settings().corporate_actions.tolerance
+
+
+def history(ticker: str, load_db, full: bool = False) -> pd.DataFrame:
+    """
+    Harga untuk perhitungan indikator: hand-off + tail lokal, atau load_db(limit) + hand-off.
+    load_db(limit) mengembalikan frame TAIL_COLUMNS ber-index date (limit None = semua).
+    full=True (recompute setelah histori ditulis ulang): selalu seluruh histori dari DB.
+    """
+    cfg = get_settings().price_tail
+    with _lock:
+        fresh = _handoff.pop(ticker, None)
+
+    if not cfg.enabled:
+        return merge(_frame(load_db(None)), fresh)
+
+    df = None
+    if fresh is not None and not full:
+        tail = load_tail(ticker)
+        if continues(tail, fresh):
+            df = merge(tail, fresh)
+            RUN_METRICS.incr("price_tail_hits")
+    if df is None:
+        df = merge(_frame(load_db(None if full else cfg.bars)), fresh)
+        RUN_METRICS.incr("price_tail_db_reads")
+
+    save_tail(ticker, df)
+    return df if full else df.tail(cfg.bars)